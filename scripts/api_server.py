@@ -0,0 +1,317 @@
+import argparse
+import asyncio
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+import tornado.web
+
+from backends import BACKENDS, load_backend
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+PORT = 8000
+MAX_BATCH = 8          # Máximo de imagens por passada do modelo
+MAX_WAIT_MS = 10.0     # Espera máxima do primeiro pedido por companheiros de lote (ms)
+MAX_BODY_BYTES = 64 * 1024 * 1024
+LATENCY_WINDOW = 10000  # Pedidos considerados nos percentis de latência
+PERCENTILES = (50, 90, 95, 99)
+
+
+# =============================================
+# MÉTRICAS
+# =============================================
+
+class ServerMetrics:
+    """Latências (janela deslizante) e histograma dos tamanhos de lote."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self.inicio = time.time()
+        self.pedidos = 0
+        self.erros = 0
+        self.latencias = {"total": deque(maxlen=window), "fila": deque(maxlen=window),
+                          "inferencia": deque(maxlen=window)}
+        self.lotes = Counter()
+
+    def observa(self, estagio, segundos):
+        self.latencias[estagio].append(segundos * 1000)
+
+    def resumo(self, profundidade_fila=0):
+        percentis = {}
+        for estagio, valores in self.latencias.items():
+            if valores:
+                p = np.percentile(np.fromiter(valores, np.float64), PERCENTILES)
+                percentis[estagio] = {f"p{q}": round(float(v), 2) for q, v in zip(PERCENTILES, p)}
+        total_lotes = sum(self.lotes.values())
+        return {
+            "uptime_s": round(time.time() - self.inicio, 1),
+            "pedidos": self.pedidos,
+            "erros": self.erros,
+            "fila": profundidade_fila,
+            "latencia_ms": percentis,
+            "lotes": total_lotes,
+            "tamanho_medio_lote": round(sum(k * v for k, v in self.lotes.items()) / total_lotes, 2) if total_lotes else 0,
+            "histograma_lotes": {str(k): v for k, v in sorted(self.lotes.items())},
+        }
+
+
+# =============================================
+# MICRO-LOTES ENTRE CLIENTES CONCORRENTES
+# =============================================
+
+class MicroBatcher:
+    """
+    Agrupa pedidos de imagem única em uma passada do modelo.
+
+    O primeiro pedido da fila espera até ``max_wait_ms`` por outros; o lote sai antes
+    se atingir ``max_batch``. A inferência roda em uma thread dedicada, mantendo o
+    laço de eventos livre para receber os próximos pedidos enquanto o lote é processado.
+    Cada pedido pode ter a sua confiança: o lote roda com a menor delas e o resultado
+    de cada pedido é filtrado depois.
+
+    Args:
+        backend (InferenceBackend): Backend carregado por ``load_backend``.
+        max_batch (int): Máximo de imagens por lote.
+        max_wait_ms (float): Espera máxima para completar um lote (ms).
+        metrics (ServerMetrics): Onde registrar latências e tamanhos de lote.
+    """
+
+    def __init__(self, backend, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, metrics=None):
+        if max_batch < 1:
+            raise ValueError("max_batch deve ser maior ou igual a 1")
+        self.backend = backend
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.metrics = metrics or ServerMetrics()
+        self._fila = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(1, thread_name_prefix="inferencia")
+        self._tarefa = None
+
+    @property
+    def depth(self):
+        return self._fila.qsize()
+
+    def start(self):
+        self._tarefa = asyncio.get_running_loop().create_task(self._laco())
+
+    async def detect(self, frame, conf=None):
+        """Enfileira um frame BGR e aguarda as suas ``Detections``."""
+        futuro = asyncio.get_running_loop().create_future()
+        await self._fila.put((frame, conf if conf is not None else self.backend.params["conf"],
+                              time.perf_counter(), futuro))
+        return await futuro
+
+    async def _coleta(self):
+        lote = [await self._fila.get()]
+        prazo = time.perf_counter() + self.max_wait
+        while len(lote) < self.max_batch:
+            restante = prazo - time.perf_counter()
+            if restante <= 0:
+                break
+            try:
+                lote.append(await asyncio.wait_for(self._fila.get(), restante))
+            except asyncio.TimeoutError:
+                break
+        # O que já chegou enquanto o lote anterior rodava entra sem esperar
+        while len(lote) < self.max_batch and not self._fila.empty():
+            lote.append(self._fila.get_nowait())
+        return lote
+
+    async def _laco(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            lote = await self._coleta()
+            inicio = time.perf_counter()
+            for _, _, chegada, _ in lote:
+                self.metrics.observa("fila", inicio - chegada)
+            conf = min(c for _, c, _, _ in lote)
+            try:
+                resultados = await loop.run_in_executor(
+                    self._executor, lambda: self.backend.detect([f for f, _, _, _ in lote], conf=conf))
+            except Exception as e:
+                if len(lote) == 1:
+                    self._responde(lote[0], erro=e)
+                    continue
+                # Um pedido ruim não derruba os demais: refaz o lote item a item
+                for item in lote:
+                    try:
+                        detections = await loop.run_in_executor(
+                            self._executor, lambda: self.backend.detect([item[0]], conf=item[1]))
+                    except Exception as erro:
+                        self._responde(item, erro=erro)
+                    else:
+                        self._responde(item, detections[0])
+                continue
+            self.metrics.observa("inferencia", time.perf_counter() - inicio)
+            self.metrics.lotes[len(lote)] += 1
+            for item, detections in zip(lote, resultados):
+                self._responde(item, detections)
+
+    @staticmethod
+    def _responde(item, detections=None, erro=None):
+        _, conf, _, futuro = item
+        if futuro.done():  # O cliente pode ter desconectado
+            return
+        if erro is not None:
+            futuro.set_exception(erro)
+        else:
+            futuro.set_result(detections.filter_conf(conf))
+
+
+# =============================================
+# ROTAS HTTP
+# =============================================
+
+class BaseHandler(tornado.web.RequestHandler):
+    def initialize(self, batcher):
+        self.batcher = batcher
+
+    def write_json(self, payload, status=200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/json")
+        self.finish(json.dumps(payload))
+
+    def write_error(self, status_code, **kwargs):
+        erro = kwargs.get("exc_info", (None, None))[1]
+        mensagem = erro.log_message if isinstance(erro, tornado.web.HTTPError) and erro.log_message else self._reason
+        self.write_json({"erro": mensagem}, status_code)
+
+
+class DetectHandler(BaseHandler, ABC):
+    """Base das rotas de detecção: decodifica, enfileira no micro-lote e responde em JSON."""
+
+    @abstractmethod
+    def decode(self):
+        """Frame BGR do corpo do pedido (``HTTPError`` 400 se inválido)."""
+
+    async def post(self):
+        inicio = time.perf_counter()
+        metrics = self.batcher.metrics
+        metrics.pedidos += 1
+        try:
+            frame = self.decode()
+            conf = self.get_query_argument("conf", None)
+            try:
+                conf = float(conf) if conf is not None else None
+            except ValueError:
+                raise tornado.web.HTTPError(400, "conf deve ser um número")
+            detections = await self.batcher.detect(frame, conf)
+        except Exception:
+            metrics.erros += 1
+            raise
+        metrics.observa("total", time.perf_counter() - inicio)
+
+        resposta = {
+            "width": int(frame.shape[1]),
+            "height": int(frame.shape[0]),
+            "detections": detections.to_records(self.batcher.backend.names),
+            "latency_ms": round((time.perf_counter() - inicio) * 1000, 2),
+        }
+        for campo in ("frame_index", "timestamp"):
+            valor = self.get_query_argument(campo, None)
+            if valor is not None:
+                resposta[campo] = valor
+        self.write_json(resposta)
+
+
+class ImageHandler(DetectHandler):
+    """POST /v1/detect/image — imagem codificada (JPEG/PNG) no corpo ou no campo multipart ``image``."""
+
+    def decode(self):
+        arquivos = self.request.files.get("image")
+        dados = arquivos[0]["body"] if arquivos else self.request.body
+        if not dados:
+            raise tornado.web.HTTPError(400, "corpo vazio: envie a imagem codificada")
+        frame = cv2.imdecode(np.frombuffer(dados, np.uint8), cv2.IMREAD_COLOR)
+        if frame is None or frame.size == 0:
+            raise tornado.web.HTTPError(400, "imagem ilegível")
+        return frame
+
+
+class FrameHandler(DetectHandler):
+    """POST /v1/detect/frame?width=W&height=H — frame BGR cru (uint8, H x W x 3), como sai de um decodificador."""
+
+    def decode(self):
+        try:
+            width = int(self.get_query_argument("width"))
+            height = int(self.get_query_argument("height"))
+        except ValueError:
+            raise tornado.web.HTTPError(400, "width e height devem ser inteiros")
+        if width <= 0 or height <= 0:
+            raise tornado.web.HTTPError(400, "width e height devem ser positivos")
+        if len(self.request.body) != width * height * 3:
+            raise tornado.web.HTTPError(400, f"esperados {width * height * 3} bytes (BGR {width}x{height}), "
+                                             f"recebidos {len(self.request.body)}")
+        return np.frombuffer(self.request.body, np.uint8).reshape(height, width, 3)
+
+
+class MetricsHandler(BaseHandler):
+    """GET /metrics — percentis de latência e histograma dos tamanhos de lote."""
+
+    def get(self):
+        self.write_json(self.batcher.metrics.resumo(self.batcher.depth))
+
+
+class HealthHandler(BaseHandler):
+    """GET /health — backend carregado e configuração do micro-lote."""
+
+    def get(self):
+        backend = self.batcher.backend
+        self.write_json({
+            "status": "ok",
+            "backend": backend.name,
+            "weights": backend.weights,
+            "classes": [backend.names[i] for i in sorted(backend.names)],
+            "max_batch": self.batcher.max_batch,
+            "max_wait_ms": self.batcher.max_wait * 1000,
+        })
+
+
+def make_app(batcher):
+    rotas = {"batcher": batcher}
+    return tornado.web.Application([
+        (r"/v1/detect/image", ImageHandler, rotas),
+        (r"/v1/detect/frame", FrameHandler, rotas),
+        (r"/metrics", MetricsHandler, rotas),
+        (r"/health", HealthHandler, rotas),
+    ])
+
+
+# =============================================
+# EXECUÇÃO DIRETA DO SCRIPT
+# =============================================
+
+async def serve(args):
+    # Mesmo carregamento do app (configs/inference.yaml), com as sobrescritas da linha de comando
+    backend = load_backend(args.backend, weights=args.weights, conf=args.conf, imgsz=args.imgsz)
+    batcher = MicroBatcher(backend, args.max_batch, args.max_wait_ms)
+    batcher.start()
+    make_app(batcher).listen(args.port, args.host, max_body_size=MAX_BODY_BYTES)
+    print(f"🚀 API em http://{args.host}:{args.port} | backend: {backend.name} | "
+          f"lote máx.: {args.max_batch} | espera máx.: {args.max_wait_ms} ms")
+    await asyncio.Event().wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP de detecção com micro-lotes entre clientes concorrentes.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--backend", default=None, choices=BACKENDS, help="Padrão: configs/inference.yaml")
+    parser.add_argument("--weights", default=None)
+    parser.add_argument("--conf", type=float, default=None)
+    parser.add_argument("--imgsz", type=int, default=None)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH, help="Máximo de imagens por passada do modelo")
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS,
+                        help="Espera máxima por companheiros de lote (ms)")
+    args = parser.parse_args()
+    asyncio.run(serve(args))
+
+
+if __name__ == "__main__":
+    main()
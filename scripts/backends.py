@@ -0,0 +1,127 @@
+import os
+
+import yaml
+
+from detections import Detections
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+INFERENCE_CONFIG = "../configs/inference.yaml"  # Backend, pesos e parâmetros de inferência
+BACKENDS = ("torch", "onnx", "openvino")
+BACKEND_ENV = "DETECTOR_BACKEND"                 # Variável de ambiente que sobrescreve o backend do arquivo
+
+DEFAULTS = {
+    "backend": "torch",
+    "weights": {"torch": "runs/detect/train/weights/best.pt"},
+    "conf": 0.25,
+    "iou": 0.7,
+    "imgsz": 640,
+    "device": "cpu",
+}
+
+
+def load_config(path=INFERENCE_CONFIG):
+    """Lê a configuração de inferência, completando com os valores padrão."""
+    config = dict(DEFAULTS)
+    if os.path.exists(path):
+        with open(path) as f:
+            config.update(yaml.safe_load(f) or {})
+    if os.environ.get(BACKEND_ENV):
+        config["backend"] = os.environ[BACKEND_ENV]
+    return config
+
+
+# =============================================
+# ABSTRAÇÃO DO BACKEND DE INFERÊNCIA
+# =============================================
+
+class InferenceBackend:
+    """
+    Detector em um runtime específico (PyTorch, ONNX Runtime ou OpenVINO).
+
+    Todos os runtimes são carregados pelo ``YOLO`` da Ultralytics, que escolhe o
+    executor a partir do artefato (``.pt``, ``.onnx`` ou pasta ``_openvino_model``).
+    A saída de ``detect`` é sempre ``Detections``, independente do backend.
+
+    Args:
+        name (str): Nome do backend (um de ``BACKENDS``).
+        weights (str): Caminho do artefato do modelo.
+        conf (float): Confiança mínima.
+        iou (float): IoU do NMS.
+        imgsz (int): Resolução de entrada.
+        device (str): Dispositivo de inferência.
+    """
+
+    def __init__(self, name, weights, conf=0.25, iou=0.7, imgsz=640, device="cpu"):
+        if name not in BACKENDS:
+            raise ValueError(f"Backend desconhecido: {name} (opções: {', '.join(BACKENDS)})")
+        if not os.path.exists(weights):
+            raise FileNotFoundError(f"Artefato do backend '{name}' não encontrado: {weights}")
+
+        from ultralytics import YOLO
+
+        self.name = name
+        self.weights = weights
+        self.params = {"conf": conf, "iou": iou, "imgsz": imgsz, "device": device}
+        self.model = YOLO(weights, task="detect")
+
+    @property
+    def names(self):
+        return self.model.names
+
+    def predict(self, frames, **kwargs):
+        """Inferência em lote retornando os ``Results`` da Ultralytics (mesma interface de ``YOLO.predict``)."""
+        params = {**self.params, **kwargs, "verbose": False}
+        return self.model.predict(frames, **params)
+
+    def detect(self, frames, **kwargs):
+        """Inferência em lote retornando uma lista de ``Detections`` (uma por frame)."""
+        return [Detections.from_result(r) for r in self.predict(frames, **kwargs)]
+
+    def __call__(self, frames, **kwargs):
+        return self.predict(frames, **kwargs)
+
+
+def load_backend(name=None, config_path=INFERENCE_CONFIG, weights=None, tiling=None, cascade=None, **overrides):
+    """
+    Cria o backend configurado em ``configs/inference.yaml``.
+
+    Args:
+        name (str | None): Backend a usar (padrão: o do arquivo ou de ``DETECTOR_BACKEND``).
+        config_path (str): Caminho do arquivo de configuração.
+        weights (str | None): Caminho do artefato, sobrescrevendo o do arquivo.
+        tiling (dict | bool | None): Seção de inferência em blocos (padrão: a do arquivo);
+            ``False`` força a inferência no frame inteiro.
+        cascade (dict | bool | None): Seção da cascata de modelos (padrão: a do arquivo);
+            ``False`` usa só o modelo completo.
+        **overrides: conf, iou, imgsz ou device (valores None são ignorados).
+
+    Returns:
+        InferenceBackend | CascadeBackend | TiledBackend: O backend, precedido do modelo
+        rápido se a cascata estiver ativada e envolvido em ``TiledBackend`` se a inferência
+        em blocos estiver ativada (cada bloco passa pela cascata).
+    """
+    config = load_config(config_path)
+    name = name or config["backend"]
+    if weights is None:
+        weights = (config.get("weights") or {}).get(name)
+        if weights is None:
+            raise ValueError(f"Nenhum artefato configurado para o backend '{name}' em {config_path}")
+
+    params = {k: config[k] for k in ("conf", "iou", "imgsz", "device")}
+    params.update({k: v for k, v in overrides.items() if v is not None})
+    backend = InferenceBackend(name, weights, **params)
+
+    if cascade is None:
+        cascade = config.get("cascade")
+    if cascade:
+        from cascade import from_config as cascade_from_config
+        backend = cascade_from_config(backend, cascade)
+    if tiling is None:
+        tiling = config.get("tiling")
+    if tiling:
+        from tiling import from_config
+        return from_config(backend, tiling)
+    return backend
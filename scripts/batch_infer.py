@@ -0,0 +1,391 @@
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import instrumentation
+import sinks
+from backends import BACKENDS, load_config
+from cascade import cli_cascade
+from tiling import cli_tiling
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".avi", ".mkv")
+IMAGES_PER_TASK = 64    # Imagens por tarefa enviada a um processo
+IMAGE_BATCH = 8         # Imagens por chamada de model.predict dentro da tarefa
+MANIFEST_NAME = "_manifest.jsonl"  # Registro das entradas já concluídas (permite retomar)
+
+# Modelo (e cache) carregados uma única vez por processo trabalhador
+_MODEL = None
+_OPTIONS = None
+_CACHE = None
+_INSTR = instrumentation.NULL_INSTRUMENTATION   # Métricas da tarefa em andamento
+
+
+# =============================================
+# COLETA DAS ENTRADAS
+# =============================================
+
+def collect_inputs(sources, list_file=None):
+    """
+    Expande diretórios (recursivamente), globs e listas de arquivos em caminhos absolutos.
+
+    Returns:
+        tuple[list[str], list[str]]: Imagens e vídeos encontrados, ordenados e sem repetição.
+    """
+    caminhos = list(sources)
+    if list_file:
+        with open(list_file) as f:
+            caminhos.extend(linha.strip() for linha in f if linha.strip())
+
+    arquivos = set()
+    for caminho in caminhos:
+        if os.path.isdir(caminho):
+            for raiz, _, nomes in os.walk(caminho):
+                arquivos.update(os.path.join(raiz, n) for n in nomes)
+        elif glob.has_magic(caminho):
+            arquivos.update(glob.glob(caminho, recursive=True))
+        elif os.path.isfile(caminho):
+            arquivos.add(caminho)
+        else:
+            print(f"⚠️  Entrada ignorada (não encontrada): {caminho}")
+
+    arquivos = sorted(os.path.abspath(a) for a in arquivos)
+    imagens = [a for a in arquivos if a.lower().endswith(IMAGE_EXTENSIONS)]
+    videos = [a for a in arquivos if a.lower().endswith(VIDEO_EXTENSIONS)]
+    return imagens, videos
+
+
+def file_key(path):
+    """Identifica a versão de um arquivo (caminho, tamanho e data de modificação)."""
+    st = os.stat(path)
+    return f"{path}|{st.st_size}|{st.st_mtime_ns}"
+
+
+def output_stem(path):
+    """Nome de saída único e estável para um arquivo de entrada."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return f"{stem}-{hashlib.sha1(path.encode()).hexdigest()[:8]}"
+
+
+# =============================================
+# MANIFESTO PARA RETOMADA
+# =============================================
+
+def load_manifest(output_dir):
+    """Chaves dos arquivos concluídos com sucesso em execuções anteriores."""
+    concluidos = set()
+    caminho = os.path.join(output_dir, MANIFEST_NAME)
+    if not os.path.exists(caminho):
+        return concluidos
+    with open(caminho) as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                continue  # Linha truncada por uma execução interrompida
+            if registro.get("status") == "ok":
+                concluidos.add(registro["key"])
+    return concluidos
+
+
+# =============================================
+# TRABALHADORES
+# =============================================
+
+def _init_worker(backend, weights, options, threads):
+    """Carrega o modelo uma vez por processo."""
+    global _MODEL, _OPTIONS, _CACHE
+    if threads and backend == "torch":
+        import torch
+        torch.set_num_threads(threads)
+    from backends import load_backend
+    _MODEL = load_backend(backend, weights=weights, tiling=options["tiling"], cascade=options["cascade"],
+                          **options["predict"])
+    if options["metrics"]:
+        _MODEL = instrumentation.InstrumentedBackend(_MODEL, _INSTR)
+    _OPTIONS = options
+    if options["cache_dir"]:
+        import result_cache
+        _CACHE = result_cache.DetectionCache(options["cache_dir"])
+
+
+def _detect(imagens, hashes):
+    """Detecção em lote, passando pelo cache quando habilitado."""
+    if _CACHE is None:
+        return _MODEL.detect(imagens)
+    import result_cache
+    return result_cache.detect_images(_CACHE, _MODEL, imagens, hashes, _MODEL.params["conf"])[0]
+
+
+def _process_images(paths, output_dir, task_id):
+    import cv2
+    import numpy as np
+
+    import result_cache
+    from detections import draw_detections
+
+    resultados = []
+    media_dir = os.path.join(output_dir, "media")
+    # Um arquivo de detecções por tarefa, publicado só quando a tarefa termina. O nome vem do id
+    # da tarefa (execução + índice): uma retomada nunca substitui o arquivo de uma tarefa anterior
+    destino = os.path.join(output_dir, "detections", f"{task_id}{sinks.EXTENSIONS[_OPTIONS['format']]}")
+    if os.path.exists(destino):
+        raise FileExistsError(f"Arquivo de detecções já existe: {destino}")
+    with sinks.open_sink(destino, _MODEL.names, _OPTIONS["format"]) as sink:
+        for i in range(0, len(paths), IMAGE_BATCH):
+            lote = paths[i:i + IMAGE_BATCH]
+            dados = []
+            for p in lote:
+                with open(p, "rb") as f:
+                    dados.append(f.read())
+            with _INSTR.timer("decode", len(lote)):
+                imagens = [cv2.imdecode(np.frombuffer(b, np.uint8), cv2.IMREAD_COLOR) for b in dados]
+                # O hash só serve de chave do cache
+                validas = [(p, img, result_cache.hash_bytes(b) if _CACHE is not None else None)
+                           for p, img, b in zip(lote, imagens, dados) if img is not None]
+            with _INSTR.timer("inference", len(validas)):
+                lote_detections = _detect([img for _, img, _ in validas], [h for _, _, h in validas]) if validas else []
+
+            for (path, img, _), detections in zip(validas, lote_detections):
+                with _INSTR.timer("write"):
+                    sink.write(detections, source=path)
+                if _OPTIONS["save_media"]:
+                    with _INSTR.timer("plot"):
+                        anotada = draw_detections(img, detections, _MODEL.names)
+                    with _INSTR.timer("encode"):
+                        cv2.imwrite(os.path.join(media_dir, f"{output_stem(path)}.jpg"), anotada)
+                _INSTR.tick("imagens")
+                resultados.append({"key": file_key(path), "source": path, "status": "ok",
+                                   "detections": len(detections), "output": destino})
+
+            for path in set(lote) - {p for p, _, _ in validas}:
+                resultados.append({"key": file_key(path), "source": path, "status": "error", "error": "imagem ilegível"})
+    return resultados
+
+
+def _process_video(path, output_dir):
+    from counting import VehicleCounter
+    from tracker import IoUKalmanTracker
+    from video_engine import VideoEngine
+    from video_io import probe_video
+
+    stem = output_stem(path)
+    destino = os.path.join(output_dir, "detections", f"{stem}{sinks.EXTENSIONS[_OPTIONS['format']]}")
+    video_out = os.path.join(output_dir, "media", f"{stem}.mp4") if _OPTIONS["save_media"] else None
+
+    tracker = counter = None
+    if _OPTIONS["track"]:
+        tracker = IoUKalmanTracker(len(_MODEL.names))
+        counter = VehicleCounter.from_config(_MODEL.names, _OPTIONS["counting"])
+
+    with sinks.open_sink(destino, _MODEL.names, _OPTIONS["format"]) as sink:
+        grava_registro = sinks.frame_writer(sink, fps=probe_video(path).fps, source=path)
+        if _CACHE is not None:
+            import result_cache
+            stats, _ = result_cache.run_video(_CACHE, _MODEL, path, video_out, _MODEL.params["conf"],
+                                              stride=_OPTIONS["stride"], motion_threshold=_OPTIONS["motion"],
+                                              frame_callback=grava_registro, tracker=tracker, counter=counter,
+                                              instrumentation=_INSTR)
+        else:
+            engine = VideoEngine(
+                _MODEL,
+                stride=_OPTIONS["stride"],
+                motion_threshold=_OPTIONS["motion"],
+                frame_callback=grava_registro,
+                tracker=tracker,
+                counter=counter,
+                instrumentation=_INSTR,
+            )
+            stats = engine.run(path, video_out)
+        stats = stats.resumo()
+
+    registro = {"key": file_key(path), "source": path, "status": "ok", "frames": stats["frames"],
+                "inferencias": stats["inferencias"], "inferencias_puladas": stats["inferencias_puladas"],
+                "output": destino}
+    if counter is not None:
+        registro["contagens"] = counter.snapshot()
+    return [registro]
+
+
+def run_task(kind, paths, output_dir, task_id):
+    """
+    Executa uma tarefa (lote de imagens ou um vídeo) dentro do processo trabalhador.
+
+    Args:
+        task_id (str): Identificador único da tarefa nesta execução (nomeia a saída das imagens).
+
+    Returns:
+        tuple[list[dict], dict, dict | None]: Registros do manifesto, métricas da tarefa (vazias
+        se desativadas) e frames escalados pela cascata na tarefa (None sem cascata).
+    """
+    global _INSTR
+    _INSTR = instrumentation.make(_OPTIONS["metrics"])
+    if isinstance(_MODEL, instrumentation.InstrumentedBackend):
+        _MODEL.instrumentation = _INSTR
+    cascade_stats = getattr(_MODEL, "cascade_stats", None)
+    antes = cascade_stats() if cascade_stats else None
+
+    profile_dir = _OPTIONS["profile_dir"]
+    try:
+        with _INSTR.profiling(bool(profile_dir)) as profiler:
+            if kind == "images":
+                registros = _process_images(paths, output_dir, task_id)
+            else:
+                registros = _process_video(paths[0], output_dir)
+    except Exception as e:
+        registros = [{"key": file_key(p), "source": p, "status": "error", "error": str(e)} for p in paths]
+    if profiler is not None:
+        profiler.write_collapsed(os.path.join(profile_dir, f"{task_id}.collapsed"))
+    cascata = None
+    if cascade_stats:
+        depois = cascade_stats()
+        cascata = {"frames": depois["frames"] - antes["frames"], "escalados": depois["escalados"] - antes["escalados"]}
+    return registros, _INSTR.snapshot(), cascata
+
+
+# =============================================
+# EXECUÇÃO DIRETA DO SCRIPT
+# =============================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Inferência em lote sobre diretórios de imagens e vídeos.")
+    parser.add_argument("sources", nargs="*", help="Diretórios, arquivos ou globs (ex.: '../dataset/test/images/*.jpg')")
+    parser.add_argument("--list", dest="list_file", help="Arquivo texto com um caminho por linha")
+    parser.add_argument("--output", default="batch_output", help="Diretório de saída")
+    parser.add_argument("--backend", default=None, choices=BACKENDS, help="Padrão: configs/inference.yaml")
+    parser.add_argument("--weights", default=None, help="Artefato do modelo (padrão: o do backend configurado)")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 4),
+                        help="Processos trabalhadores (cada um carrega o modelo uma vez)")
+    parser.add_argument("--threads", type=int, default=None, help="Threads do PyTorch por processo (backend torch)")
+    parser.add_argument("--conf", type=float, default=None)
+    parser.add_argument("--iou", type=float, default=None)
+    parser.add_argument("--imgsz", type=int, default=None)
+    parser.add_argument("--tile-size", type=int, default=None,
+                        help="Inferência em blocos com este lado (0 desativa; padrão: configs/inference.yaml)")
+    parser.add_argument("--adaptive-tiles", action="store_true", help="Blocos só ao redor dos candidatos")
+    parser.add_argument("--cascade", action="store_true",
+                        help="Modelo rápido em todos os frames e o completo só nos inconclusivos (seção cascade)")
+    parser.add_argument("--format", default="jsonl", choices=list(sinks.SINKS),
+                        help="Formato dos arquivos de detecções (jsonl, parquet ou resultados COCO)")
+    parser.add_argument("--save-media", action="store_true", help="Salva imagens/vídeos anotados em <output>/media")
+    parser.add_argument("--stride", type=int, default=1, help="Vídeos: inferência a cada N frames")
+    parser.add_argument("--motion", type=float, default=0.0, help="Vídeos: limiar do portão de movimento")
+    parser.add_argument("--track", action="store_true", help="Vídeos: rastreia e conta veículos")
+    parser.add_argument("--counting", default="../configs/counting.yaml")
+    parser.add_argument("--cache-dir", default="../cache/detections", help="Cache de detecções em disco")
+    parser.add_argument("--no-cache", action="store_true", help="Desativa o cache de detecções")
+    parser.add_argument("--metrics", default=None,
+                        help="Métricas por estágio: .prom (Prometheus, totais) ou JSONL (uma linha por tarefa e o total)")
+    parser.add_argument("--profile", default=None, help="Diretório que recebe as pilhas amostradas de cada tarefa")
+    args = parser.parse_args()
+
+    imagens, videos = collect_inputs(args.sources, args.list_file)
+    os.makedirs(os.path.join(args.output, "detections"), exist_ok=True)
+    if args.save_media:
+        os.makedirs(os.path.join(args.output, "media"), exist_ok=True)
+
+    # Retomada: pula entradas já concluídas (mesmo caminho, tamanho e data)
+    concluidos = load_manifest(args.output)
+    imagens = [p for p in imagens if file_key(p) not in concluidos]
+    videos = [p for p in videos if file_key(p) not in concluidos]
+    print(f"📂 Pendentes: {len(imagens)} imagens, {len(videos)} vídeos ({len(concluidos)} já concluídos)")
+    if not imagens and not videos:
+        return
+
+    # Id da execução: as tarefas de imagens de uma retomada ganham arquivos novos
+    execucao = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+    tarefas = [("video", [v], f"video-{output_stem(v)}") for v in videos]
+    tarefas += [("images", imagens[i:i + IMAGES_PER_TASK], f"images-{execucao}-{i // IMAGES_PER_TASK:05d}")
+                for i in range(0, len(imagens), IMAGES_PER_TASK)]
+    threads = args.threads or max(1, (os.cpu_count() or 1) // args.workers)
+    # Os trabalhadores só importam o torch para ajustar as threads quando o backend é o torch
+    backend = args.backend or load_config()["backend"]
+    options = {
+        "predict": {"conf": args.conf, "iou": args.iou, "imgsz": args.imgsz},
+        "tiling": cli_tiling(args.tile_size, args.adaptive_tiles),
+        "cascade": cli_cascade(args.cascade),
+        "save_media": args.save_media,
+        "format": args.format,
+        "stride": args.stride,
+        "motion": args.motion,
+        "track": args.track,
+        "counting": args.counting,
+        "cache_dir": None if args.no_cache else args.cache_dir,
+        "metrics": bool(args.metrics),
+        "profile_dir": args.profile,
+    }
+    if args.profile:
+        os.makedirs(args.profile, exist_ok=True)
+    jsonl = args.metrics and not args.metrics.endswith((".prom", ".txt"))
+    metricas = instrumentation.Instrumentation()
+
+    inicio = time.perf_counter()
+    totais = {"ok": 0, "error": 0, "puladas": 0}
+    cascata = {"frames": 0, "escalados": 0}
+    with open(os.path.join(args.output, MANIFEST_NAME), "a") as manifest, \
+            ProcessPoolExecutor(args.workers, initializer=_init_worker,
+                                initargs=(backend, args.weights, options, threads)) as pool:
+        futuros = {pool.submit(run_task, kind, paths, args.output, task_id): (kind, paths)
+                   for kind, paths, task_id in tarefas}
+        interrompidas = 0
+        for futuro in as_completed(futuros):
+            try:
+                registros, snapshot, cascata_tarefa = futuro.result()
+            except BrokenProcessPool:
+                # Um trabalhador morreu (ex.: falta de memória): o pool inteiro para e as tarefas
+                # restantes falham aqui; ficam como erro no manifesto e são refeitas na retomada
+                interrompidas += 1
+                erro = "processo trabalhador encerrado inesperadamente"
+                registros = [{"key": file_key(p), "source": p, "status": "error", "error": erro}
+                             for p in futuros[futuro][1]]
+                snapshot = cascata_tarefa = None
+            if cascata_tarefa:
+                cascata = {k: cascata[k] + cascata_tarefa[k] for k in cascata}
+            if snapshot:
+                metricas.merge(snapshot)
+                if jsonl:
+                    kind, paths = futuros[futuro]
+                    with open(args.metrics, "a") as f:
+                        f.write(json.dumps({"time": time.time(), "tarefa": kind, "source": paths[0], **snapshot}) + "\n")
+            for registro in registros:
+                totais[registro["status"]] += 1
+                totais["puladas"] += registro.get("inferencias_puladas", 0)
+                if registro["status"] == "error" and not interrompidas:
+                    print(f"❌ {registro['source']}: {registro['error']}")
+                manifest.write(json.dumps(registro) + "\n")
+            manifest.flush()
+            if not interrompidas:
+                print(f"✅ {totais['ok']} concluídos | {totais['error']} com erro")
+
+    if interrompidas:
+        print(f"\n💥 Um processo trabalhador foi encerrado (ex.: falta de memória): {interrompidas} tarefas não "
+              f"concluídas, {totais['ok']} arquivos concluídos ficam no manifesto.\n"
+              f"   Rode o mesmo comando para retomar (talvez com menos --workers).")
+        sys.exit(1)
+
+    tempo = time.perf_counter() - inicio
+    print(f"\n⏱️  {totais['ok']} arquivos em {tempo:.1f} s | inferências puladas em vídeos: {totais['puladas']}")
+    if cascata["frames"]:
+        print(f"🪜 Cascata: {cascata['escalados']} de {cascata['frames']} frames escalados para o modelo completo "
+              f"({cascata['escalados'] / cascata['frames']:.1%})")
+    if args.metrics:
+        metricas.export(args.metrics, tarefa="total")
+        for nome, e in sorted(metricas.snapshot()["estagios"].items()):
+            print(f"📈 {nome:<22} {e['itens']:>7} itens | {e['media_ms']:8.2f} ms/item | {e['total_s']:8.2f} s")
+    if options["cache_dir"]:
+        import result_cache
+        print(f"🗄️  Cache: {result_cache.DetectionCache(options['cache_dir']).stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+import argparse
+import json
+import time
+
+import cv2
+
+import result_cache
+from backends import BACKENDS, load_backend, load_config
+from cascade import CONFUSABLE_CONF, CONFUSABLE_IOU, CONFUSABLE_PAIRS, UNCERTAIN, CascadeBackend
+from detections import nms
+from evaluate_model import (BATCH, EVAL_CACHE_DIR, RAW_CONF, default_data_config, load_ground_truth,
+                            predict_split, resolve_split, score)
+
+# =============================================
+# BENCHMARK: CURVA PRECISÃO x VAZÃO DA CASCATA
+# =============================================
+# O modelo completo e o rápido (em cada resolução) rodam uma única vez no split, com as
+# predições em cache como no evaluate_model.py. Cada ponto da curva (resolução do modelo
+# rápido x limite alto da faixa de incerteza) decide com CascadeBackend.reason quais
+# imagens escalam, junta as predições dos dois modelos e pontua sem nova inferência.
+# A vazão estimada é a do modelo rápido mais a fração escalada da latência do completo;
+# --measure roda a cascata de verdade no ponto configurado para conferir a estimativa.
+
+FAST_IMGSZ = [320, 416, 512]
+UNCERTAIN_HIGH = [0.4, 0.5, 0.6, 0.7, 0.8]
+CONF = 0.25       # Confiança de operação (precisão, recall e decisão de escalar)
+IOU = 0.6         # IoU do NMS
+
+
+def point(nome, imgsz, high, escalados, total, combinadas, verdade, names, args, ms_rapido, ms_completo):
+    """Pontua uma configuração: mAP nas predições completas, P/R na confiança de operação e vazão estimada."""
+    taxa = escalados / total if total else 0.0
+    geral = score(combinadas, verdade, names, RAW_CONF, args.iou)
+    operacao = score(combinadas, verdade, names, args.conf, args.iou)
+    ms = ms_rapido + taxa * ms_completo
+    return {
+        "modo": nome,
+        "fast_imgsz": imgsz,
+        "uncertain_high": high,
+        "taxa_escalonamento": round(taxa, 4),
+        "map50": geral["map50"],
+        "map": geral["map"],
+        "precision": operacao["precision"],
+        "recall": operacao["recall"],
+        "ms_por_imagem": round(ms, 3),
+        "imagens_por_s": round(1000 / ms, 2) if ms > 0 else 0.0,
+    }
+
+
+def measure(cascata, imagens, args):
+    """Vazão real da cascata (leitura das imagens fora da medida) e taxa de escalonamento."""
+    frames = [cv2.imread(i) for i in imagens]
+    cascata.detect(frames[:args.batch], conf=args.conf, iou=args.iou)  # Aquecimento
+    antes = cascata.cascade_stats()
+    inicio = time.perf_counter()
+    for i in range(0, len(frames), args.batch):
+        cascata.detect(frames[i:i + args.batch], conf=args.conf, iou=args.iou)
+    tempo = time.perf_counter() - inicio
+    depois = cascata.cascade_stats()
+    return {
+        "imagens_por_s": round(len(frames) / tempo, 2) if tempo > 0 else 0.0,
+        "taxa_escalonamento": round((depois["escalados"] - antes["escalados"]) / len(frames), 4),
+        "motivos": {k: depois["motivos"][k] - antes["motivos"][k] for k in depois["motivos"]},
+    }
+
+
+def main():
+    config = load_config().get("cascade") or {}
+    parser = argparse.ArgumentParser(description="Curva precisão x vazão da cascata modelo rápido -> modelo completo.")
+    parser.add_argument("--data", default=default_data_config())
+    parser.add_argument("--split", default="test")
+    parser.add_argument("--backend", default=None, choices=BACKENDS, help="Runtime do modelo completo")
+    parser.add_argument("--weights", default=None, help="Modelo completo (padrão: o do backend configurado)")
+    parser.add_argument("--fast-backend", default=config.get("fast_backend"), choices=BACKENDS)
+    parser.add_argument("--fast-weights", default=config.get("fast_weights"), help="Modelo rápido treinado no dataset")
+    parser.add_argument("--fast-imgsz", type=int, nargs="+", default=FAST_IMGSZ)
+    parser.add_argument("--uncertain-low", type=float, default=(config.get("uncertain") or UNCERTAIN)[0])
+    parser.add_argument("--uncertain-high", type=float, nargs="+", default=UNCERTAIN_HIGH)
+    parser.add_argument("--confusable-iou", type=float, default=config.get("confusable_iou", CONFUSABLE_IOU))
+    parser.add_argument("--confusable-conf", type=float, default=config.get("confusable_conf", CONFUSABLE_CONF))
+    parser.add_argument("--escalate-empty", action="store_true", default=config.get("escalate_empty", False))
+    parser.add_argument("--conf", type=float, default=CONF, help="Confiança de operação")
+    parser.add_argument("--iou", type=float, default=IOU, help="IoU do NMS")
+    parser.add_argument("--batch", type=int, default=BATCH)
+    parser.add_argument("--cache-dir", default=EVAL_CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true", help="Refaz a inferência (e mede a latência de novo)")
+    parser.add_argument("--measure", action="store_true",
+                        help="Roda a cascata de verdade no ponto de configs/inference.yaml para conferir a vazão")
+    parser.add_argument("--output", default=None, help="Salva a curva em JSON")
+    args = parser.parse_args()
+    if not args.fast_weights:
+        parser.error("Informe --fast-weights ou configure cascade.fast_weights em configs/inference.yaml")
+
+    imagens, names = resolve_split(args.data, args.split)
+    imagens, verdade = load_ground_truth(imagens)
+    print(f"📂 {args.split}: {len(imagens)} imagens | {sum(len(c) for _, c in verdade)} objetos")
+    cache = None if args.no_cache else result_cache.DetectionCache(args.cache_dir)
+
+    completo = load_backend(args.backend, weights=args.weights, tiling=False, cascade=False)
+    rapido = load_backend(args.fast_backend or completo.name, weights=args.fast_weights, tiling=False, cascade=False)
+    predicoes_completo, speed_completo, _ = predict_split(completo, imagens, args.split, completo.params["imgsz"],
+                                                          cache, args.batch)
+    ms_completo = speed_completo["total_ms"]
+    pares = [tuple(p) for p in config.get("confusable_pairs", CONFUSABLE_PAIRS)]
+
+    curva = [point("completo", None, None, len(imagens), len(imagens), predicoes_completo, verdade, names, args,
+                   0.0, ms_completo)]
+    for imgsz in args.fast_imgsz:
+        predicoes_rapido, speed_rapido, _ = predict_split(rapido, imagens, args.split, imgsz, cache, args.batch)
+        ms_rapido = speed_rapido["total_ms"]
+        curva.append(point("rapido", imgsz, None, 0, len(imagens), predicoes_rapido, verdade, names, args,
+                           ms_rapido, ms_completo))
+        for high in args.uncertain_high:
+            cascata = CascadeBackend(rapido, completo, imgsz, (args.uncertain_low, max(high, args.uncertain_low)),
+                                     pares, args.confusable_iou, args.confusable_conf, args.escalate_empty)
+            # A decisão usa as detecções na confiança e no NMS de operação, como na inferência real
+            escalar = [cascata.reason(nms(d.filter_conf(args.conf), args.iou)) is not None for d in predicoes_rapido]
+            combinadas = [c if e else r for e, r, c in zip(escalar, predicoes_rapido, predicoes_completo)]
+            curva.append(point("cascata", imgsz, high, sum(escalar), len(imagens), combinadas, verdade, names, args,
+                               ms_rapido, ms_completo))
+
+    print(f"\n{'modo':<9} | {'imgsz':>5} | {'alta':>4} | {'escala':>6} | {'mAP50':>6} | {'mAP':>6} | "
+          f"{'P':>6} | {'R':>6} | {'ms/img':>7} | {'img/s':>7}")
+    for p in curva:
+        imgsz = p["fast_imgsz"] or completo.params["imgsz"]
+        alta = f"{p['uncertain_high']:.2f}" if p["uncertain_high"] is not None else "-"
+        print(f"{p['modo']:<9} | {imgsz:>5} | {alta:>4} | {p['taxa_escalonamento']:6.1%} | {p['map50']:6.4f} | "
+              f"{p['map']:6.4f} | {p['precision']:6.4f} | {p['recall']:6.4f} | {p['ms_por_imagem']:7.2f} | "
+              f"{p['imagens_por_s']:7.1f}")
+
+    relatorio = {"config": vars(args), "imagens": len(imagens), "curva": curva}
+    if args.measure:
+        cascata = CascadeBackend(rapido, completo, config.get("fast_imgsz", args.fast_imgsz[0]),
+                                 tuple(config.get("uncertain", UNCERTAIN)), pares, args.confusable_iou,
+                                 args.confusable_conf, args.escalate_empty)
+        medido = measure(cascata, imagens, args)
+        relatorio["medido"] = {"fast_imgsz": cascata.fast_imgsz, "uncertain": cascata.uncertain, **medido}
+        print(f"\n⏱️  Cascata real ({cascata.fast_imgsz} px, faixa {cascata.uncertain}): {medido['imagens_por_s']:.1f} img/s "
+              f"| {medido['taxa_escalonamento']:.1%} escalados | motivos: {medido['motivos']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(relatorio, f, indent=2, ensure_ascii=False)
+        print(f"💾 Curva salva em {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+from detections import PALETTE, Detections
+from renderer import Renderer
+
+# =============================================
+# BENCHMARK DO DESENHO DAS ANOTAÇÕES
+# =============================================
+# Custo por frame de anotar N detecções em 1080p e 4K:
+#   - legado: getTextSize/putText por rótulo (o desenho anterior ao Renderer)
+#   - renderer: rótulos a partir de blocos pré-renderizados, no próprio buffer
+#   - somente_dados: Renderer(draw=False)
+#   - ultralytics: results.plot() (só se a Ultralytics estiver instalada)
+# "conversões" mede o que o caminho de imagem antigo do app fazia em volta do desenho
+# (RGB -> BGR na entrada, BGR -> RGB e Image.fromarray na saída) e que deixou de existir.
+
+RESOLUTIONS = {"1080p": (1920, 1080), "4k": (3840, 2160)}
+DETECTIONS = [10, 50, 200]
+ITERATIONS = 50
+NAMES = ['big bus', 'big truck', 'bus-l-', 'bus-s-', 'car', 'mid truck', 'small bus', 'small truck',
+         'truck-l-', 'truck-m-', 'truck-s-', 'truck-xl-']
+
+
+def draw_legacy(frame, detections, names):
+    """Desenho anterior ao ``Renderer``: texto rasterizado a cada rótulo."""
+    track_ids = detections.track_id if detections.track_id is not None else np.full(len(detections), -1)
+    for box, p, c, tid in zip(detections.xyxy.astype(np.int32), detections.conf, detections.cls, track_ids):
+        color = PALETTE[int(c) % len(PALETTE)]
+        x1, y1, x2, y2 = box.tolist()
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, 2, cv2.LINE_AA)
+
+        label = f"#{tid} {names[int(c)]} {p:.2f}" if tid >= 0 else f"{names[int(c)]} {p:.2f}"
+        (tw, th), base = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.5, 1)
+        y_text = y1 - 4 if y1 - th - base - 4 >= 0 else y1 + th + 4
+        cv2.rectangle(frame, (x1, y_text - th - base), (x1 + tw + 4, y_text + base), color, -1)
+        cv2.putText(frame, label, (x1 + 2, y_text), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1, cv2.LINE_AA)
+    return frame
+
+
+def random_detections(n, width, height, rng, tracked=False):
+    tamanho = rng.uniform(20, min(width, height) / 6, (n, 2))
+    origem = rng.uniform(0, 1, (n, 2)) * ([width, height] - tamanho)
+    xyxy = np.concatenate([origem, origem + tamanho], axis=1).astype(np.float32)
+    track_id = rng.integers(1, 500, n) if tracked else None
+    return Detections(xyxy, rng.uniform(0.25, 1, n).astype(np.float32), rng.integers(0, len(NAMES), n).astype(np.int32),
+                      track_id)
+
+
+def ultralytics_plot():
+    """Desenho genérico da Ultralytics, ou None se ela não estiver instalada."""
+    try:
+        import torch
+        from ultralytics.engine.results import Results
+    except ImportError:
+        return None
+
+    def plot(frame, detections, names):
+        boxes = torch.from_numpy(np.concatenate(
+            [detections.xyxy, detections.conf[:, None], detections.cls[:, None].astype(np.float32)], axis=1))
+        return Results(frame, path="", names=dict(enumerate(names)), boxes=boxes).plot()
+    return plot
+
+
+def conversions(frame):
+    """Conversões de cor do caminho de imagem antigo do app (sem o desenho)."""
+    from PIL import Image
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    bgr = cv2.cvtColor(np.array(Image.fromarray(rgb)), cv2.COLOR_RGB2BGR)
+    Image.fromarray(cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB))
+
+
+def measure(fn, frame, iterations):
+    """Mediana do custo por frame (ms); cada iteração desenha sobre uma cópia nova (fora do tempo)."""
+    fn(frame.copy())  # Aquecimento (inclui a montagem dos blocos do Renderer)
+    tempos = []
+    for _ in range(iterations):
+        alvo = frame.copy()
+        inicio = time.perf_counter()
+        fn(alvo)
+        tempos.append(time.perf_counter() - inicio)
+    return round(float(np.median(tempos)) * 1000, 3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Custo por frame do desenho das anotações em 1080p e 4K.")
+    parser.add_argument("--resolutions", nargs="+", default=list(RESOLUTIONS), choices=list(RESOLUTIONS))
+    parser.add_argument("--detections", type=int, nargs="+", default=DETECTIONS)
+    parser.add_argument("--iterations", type=int, default=ITERATIONS)
+    parser.add_argument("--tracked", action="store_true", help="Inclui o id da trilha nos rótulos")
+    parser.add_argument("--output", default=None, help="Salva os resultados em JSON")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    renderer = Renderer(NAMES)
+    somente_dados = Renderer(NAMES, draw=False)
+    plot = ultralytics_plot()
+
+    resultados = []
+    print(f"{'resolução':<9} | {'N':>4} | {'legado':>9} | {'renderer':>9} | {'somente dados':>13} | "
+          f"{'ultralytics':>11} | {'conversões':>10}")
+    for nome in args.resolutions:
+        largura, altura = RESOLUTIONS[nome]
+        frame = rng.integers(0, 256, (altura, largura, 3), dtype=np.uint8)
+        conversao = measure(conversions, frame, args.iterations)
+        for n in args.detections:
+            dets = random_detections(n, largura, altura, rng, args.tracked)
+            linha = {
+                "resolucao": nome,
+                "deteccoes": n,
+                "legado_ms": measure(lambda f: draw_legacy(f, dets, NAMES), frame, args.iterations),
+                "renderer_ms": measure(lambda f: renderer.draw(f, dets), frame, args.iterations),
+                "somente_dados_ms": measure(lambda f: somente_dados.draw(f, dets), frame, args.iterations),
+                "ultralytics_ms": measure(lambda f: plot(f, dets, NAMES), frame, args.iterations) if plot else None,
+                "conversoes_ms": conversao,
+            }
+            resultados.append(linha)
+            ultra = f"{linha['ultralytics_ms']:8.3f} ms" if plot else f"{'-':>11}"
+            print(f"{nome:<9} | {n:>4} | {linha['legado_ms']:6.3f} ms | {linha['renderer_ms']:6.3f} ms | "
+                  f"{linha['somente_dados_ms']:10.3f} ms | {ultra} | {conversao:7.3f} ms")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
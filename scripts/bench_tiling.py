@@ -0,0 +1,108 @@
+import argparse
+import json
+import time
+
+import cv2
+import numpy as np
+
+import metrics
+import tiling
+from backends import BACKENDS, load_backend
+
+# =============================================
+# BENCHMARK: FRAME INTEIRO x BLOCOS
+# =============================================
+# Compara recall (geral e em objetos pequenos) e latência por imagem entre a inferência
+# no frame inteiro, em blocos e em blocos adaptativos, no split de teste do dataset.
+# As imagens do dataset têm 640x480: com blocos de 320 px cada bloco é ampliado 2x pelo
+# modelo, o mesmo efeito que blocos de 640 px têm em um frame 4K.
+
+IMAGES_DIR = "../dataset/test/images"
+MODES = ["inteiro", "blocos", "adaptativo"]
+TILE_SIZE = 320
+BATCH = 8
+
+
+def make_detector(backend, mode, args):
+    if mode == "inteiro":
+        return backend
+    return tiling.TiledBackend(backend, tile_size=args.tile_size, overlap=args.overlap, merge=args.merge,
+                               adaptive=mode == "adaptativo")
+
+
+def run_mode(detector, imagens, rotulos, args):
+    """Detecta em todas as imagens (em lotes) e mede recall, precisão e latência."""
+    detector.detect(imagens[:args.batch])  # Aquecimento
+
+    tempos = []
+    tp_total = pred_total = 0
+    encontrados, pequenos = [], []
+    blocos_antes = getattr(detector, "blocos_processados", 0)
+    for i in range(0, len(imagens), args.batch):
+        lote = imagens[i:i + args.batch]
+        inicio = time.perf_counter()
+        resultados = detector.detect(lote, conf=args.conf)
+        tempos.append((time.perf_counter() - inicio) / len(lote))
+        for det, (gt_xyxy, gt_cls) in zip(resultados, rotulos[i:i + args.batch]):
+            tp, achados = metrics.match_detections(det, gt_xyxy, gt_cls, args.iou)
+            tp_total += int(tp.sum())
+            pred_total += len(det)
+            encontrados.append(achados)
+            pequenos.append(metrics.box_area(gt_xyxy) < args.small_area)
+
+    encontrados = np.concatenate(encontrados)
+    pequenos = np.concatenate(pequenos)
+    tempos = np.array(tempos) * 1000
+    return {
+        "recall": round(float(encontrados.mean()), 4) if len(encontrados) else 0.0,
+        "recall_pequenos": round(float(encontrados[pequenos].mean()), 4) if pequenos.any() else None,
+        "precisao": round(tp_total / pred_total, 4) if pred_total else 0.0,
+        "latencia_ms": round(float(tempos.mean()), 2),
+        "latencia_p95_ms": round(float(np.percentile(tempos, 95)), 2),
+        "blocos_por_imagem": round((getattr(detector, "blocos_processados", 0) - blocos_antes) / len(imagens), 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall em objetos pequenos x latência: frame inteiro e blocos.")
+    parser.add_argument("--images", default=IMAGES_DIR)
+    parser.add_argument("--backend", default=None, choices=BACKENDS)
+    parser.add_argument("--weights", default=None)
+    parser.add_argument("--modes", nargs="+", default=MODES, choices=MODES)
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE)
+    parser.add_argument("--overlap", type=float, default=tiling.OVERLAP)
+    parser.add_argument("--merge", default=tiling.MERGE, choices=["nms", "wbf"])
+    parser.add_argument("--conf", type=float, default=0.25)
+    parser.add_argument("--iou", type=float, default=0.5, help="IoU mínimo para uma predição contar como acerto")
+    parser.add_argument("--small-area", type=float, default=metrics.SMALL_AREA, help="Área máxima (px²) de um objeto pequeno")
+    parser.add_argument("--batch", type=int, default=BATCH)
+    parser.add_argument("--limit", type=int, default=None, help="Usa só as N primeiras imagens")
+    parser.add_argument("--output", default=None, help="Salva os resultados em JSON")
+    args = parser.parse_args()
+
+    itens = metrics.dataset_items(args.images)[:args.limit]
+    imagens, rotulos = [], []
+    for imagem, rotulo in itens:
+        frame = cv2.imread(imagem)
+        imagens.append(frame)
+        rotulos.append(metrics.load_yolo_labels(rotulo, frame.shape[1], frame.shape[0]))
+    n_pequenos = sum(int((metrics.box_area(xyxy) < args.small_area).sum()) for xyxy, _ in rotulos)
+    print(f"📂 {len(imagens)} imagens | {sum(len(c) for _, c in rotulos)} objetos ({n_pequenos} pequenos)")
+
+    backend = load_backend(args.backend, weights=args.weights, tiling=False, cascade=False)
+    resultados = {}
+    print(f"{'modo':<11} | {'recall':>6} | {'recall peq.':>11} | {'precisão':>8} | {'ms/img':>7} | {'p95 ms':>7} | {'blocos/img':>10}")
+    for mode in args.modes:
+        r = run_mode(make_detector(backend, mode, args), imagens, rotulos, args)
+        resultados[mode] = r
+        peq = f"{r['recall_pequenos']:.4f}" if r["recall_pequenos"] is not None else "-"
+        print(f"{mode:<11} | {r['recall']:6.4f} | {peq:>11} | {r['precisao']:8.4f} | {r['latencia_ms']:7.2f} | "
+              f"{r['latencia_p95_ms']:7.2f} | {r['blocos_por_imagem']:10.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"config": vars(args), "resultados": resultados}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
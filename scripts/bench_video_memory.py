@@ -0,0 +1,125 @@
+import argparse
+import io
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+from detections import Detections
+import video_io
+
+# =============================================
+# BENCHMARK DE MEMÓRIA DO CAMINHO DE VÍDEO
+# =============================================
+# Mede o pico de RSS em função do tamanho do vídeo em dois modos:
+#   - legado: upload em memória (como o UploadedFile do Streamlit) e upload.read() + escrita
+#   - streaming: arquivo em disco copiado em blocos (video_io.save_upload), resultado servido do disco
+#   - arquivo: processa o vídeo direto do caminho em disco, sem cópia (video_engine.py, batch_infer.py)
+# Cada medição roda em um subprocesso próprio, para que o pico de RSS não se acumule.
+# O backend padrão não roda o modelo, isolando o custo de E/S; use --backend para incluí-lo.
+
+SECONDS = [10, 30, 60]   # Durações dos vídeos sintéticos gerados
+RESOLUTION = (1280, 720)
+FPS = 30
+
+
+class NullBackend:
+    """Backend sem modelo: devolve detecções vazias, isolando decodificação e codificação."""
+    names = {}
+
+    def detect(self, frames, **kwargs):
+        return [Detections.empty() for _ in frames]
+
+
+def make_video(path, seconds, resolution=RESOLUTION, fps=FPS):
+    """Gera um vídeo sintético com ruído (comprime mal, aproximando o tamanho de vídeos reais)."""
+    out = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, resolution)
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 256, (resolution[1], resolution[0], 3), dtype=np.uint8)
+    for i in range(int(seconds * fps)):
+        out.write(np.roll(base, i * 4, axis=1))
+    out.release()
+
+
+def peak_rss_mb():
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 if sys.platform != "darwin" else maxrss / 1024 ** 2
+
+
+def run_child(mode, source, backend_name):
+    """Executa um único ciclo upload -> processamento -> download e imprime o pico de RSS."""
+    from video_engine import VideoEngine
+
+    backend = NullBackend()
+    if backend_name:
+        from backends import load_backend
+        backend = load_backend(backend_name)
+
+    base_rss = peak_rss_mb()
+    if mode == "legado":
+        # O Streamlit mantém o arquivo enviado em memória (UploadedFile)
+        with open(source, "rb") as f:
+            upload = io.BytesIO(f.read())
+        base_rss = peak_rss_mb()
+        with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as tmp:
+            tmp.write(upload.read())
+            video_path = tmp.name
+        upload.close()
+    elif mode == "streaming":
+        with open(source, "rb") as upload:
+            video_path, _ = video_io.save_upload(upload)
+    else:
+        video_path = source
+
+    output_path = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False).name
+    VideoEngine(backend).run(video_path, output_path)
+
+    if video_path != source:
+        os.unlink(video_path)
+    os.unlink(output_path)
+    print(json.dumps({"pico_rss_mb": round(peak_rss_mb(), 1), "rss_apos_upload_mb": round(base_rss, 1)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pico de RSS do caminho de vídeo em função do tamanho do arquivo.")
+    parser.add_argument("--seconds", type=int, nargs="+", default=SECONDS)
+    parser.add_argument("--modes", nargs="+", default=["legado", "streaming", "arquivo"])
+    parser.add_argument("--backend", default=None, help="Inclui o modelo (torch, onnx, openvino)")
+    parser.add_argument("--output", default=None, help="Salva os resultados em JSON")
+    parser.add_argument("--child", nargs=2, metavar=("MODE", "VIDEO"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child[0], args.child[1], args.backend)
+        return
+
+    resultados = []
+    print(f"{'duração (s)':>11} | {'tamanho (MB)':>12} | " + " | ".join(f"{m:>14}" for m in args.modes))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for seconds in args.seconds:
+            video = os.path.join(tmp_dir, f"bench_{seconds}s.mp4")
+            make_video(video, seconds)
+            tamanho = os.path.getsize(video) / 1024 ** 2
+            linha = {"segundos": seconds, "tamanho_mb": round(tamanho, 1)}
+            for mode in args.modes:
+                cmd = [sys.executable, __file__, "--child", mode, video]
+                if args.backend:
+                    cmd += ["--backend", args.backend]
+                saida = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+                linha[mode] = json.loads(saida.strip().splitlines()[-1])["pico_rss_mb"]
+            resultados.append(linha)
+            print(f"{seconds:>11} | {tamanho:>12.1f} | " + " | ".join(f"{linha[m]:>11.1f} MB" for m in args.modes))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(resultados, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,313 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+import metrics
+from backends import BACKENDS
+from detections import Detections, draw_detections
+from video_engine import VideoEngine
+
+# =============================================
+# BENCHMARK DE DESEMPENHO (IMAGEM E VÍDEO)
+# =============================================
+# Mede, em CPU e sem rede, o caminho de imagem (decodificação, pré-processamento,
+# inferência, pós-processamento, desenho e codificação JPEG, como no app) e o caminho
+# de vídeo (VideoEngine completo), além do pico de RSS e do tempo de partida a frio.
+# Cada combinação backend x threads roda em um subprocesso próprio, para que a
+# partida a frio e o pico de memória sejam medidos do zero.
+
+IMAGES_DIR = "../dataset/test/images"
+VIDEOS = ["../videos/videoteste1.mp4", "../videos/videoteste2.mp4"]
+BATCH_SIZES = [1, 8]
+THREADS = [0]           # 0 = padrão das bibliotecas
+WARMUP = 2              # Lotes descartados antes da medição
+REPEAT = 3              # Repetições do caminho de imagem (vale a mediana)
+TOLERANCE = 0.10        # Piora relativa que conta como regressão
+MIN_DELTA = 0.5         # Diferença absoluta mínima (ms, MB, s) para evitar ruído em valores pequenos
+REPORT = "benchmark.json"
+
+IMAGE_STAGES = ["decode", "preprocess", "inference", "postprocess", "plot", "encode"]
+HIGHER_IS_BETTER = {"imagens_por_s", "fps"}
+
+
+def peak_rss_mb():
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / 1024 if sys.platform != "darwin" else maxrss / 1024 ** 2
+
+
+class SpeedRecorder:
+    """Backend que acumula ``Results.speed`` (pré, inferência e pós em ms) de cada frame."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.estagios = np.zeros(3)
+        self.frames = 0
+
+    @property
+    def names(self):
+        return self.backend.names
+
+    def detect(self, frames, **kwargs):
+        resultados = self.backend.predict(frames, **kwargs)
+        for r in resultados:
+            self.estagios += (r.speed["preprocess"], r.speed["inference"], r.speed["postprocess"])
+        self.frames += len(resultados)
+        return [Detections.from_result(r) for r in resultados]
+
+    def media_ms(self):
+        media = self.estagios / max(self.frames, 1)
+        return dict(zip(("preprocess", "inference", "postprocess"), (round(float(v), 3) for v in media)))
+
+
+# =============================================
+# MEDIÇÕES (NO SUBPROCESSO)
+# =============================================
+
+def bench_images(backend, caminhos, batch, repeat=REPEAT, warmup=WARMUP):
+    """
+    Caminho de imagem de ponta a ponta, lote a lote.
+
+    Returns:
+        dict: Imagens por segundo, latência por imagem (p50/p95) e média por estágio (ms).
+    """
+    names = backend.names
+    lotes = [caminhos[i:i + batch] for i in range(0, len(caminhos), batch)]
+    for lote in lotes[:warmup]:
+        backend.predict([cv2.imread(c) for c in lote])
+
+    execucoes = []
+    for _ in range(repeat):
+        estagios = dict.fromkeys(IMAGE_STAGES, 0.0)
+        latencias = []
+        inicio_total = time.perf_counter()
+        for lote in lotes:
+            inicio_lote = time.perf_counter()
+            t = time.perf_counter()
+            frames = [cv2.imread(c) for c in lote]
+            estagios["decode"] += (time.perf_counter() - t) * 1000
+
+            for frame, r in zip(frames, backend.predict(frames)):
+                for nome in ("preprocess", "inference", "postprocess"):
+                    estagios[nome] += r.speed[nome]
+                t = time.perf_counter()
+                anotada = draw_detections(frame, Detections.from_result(r), names)
+                estagios["plot"] += (time.perf_counter() - t) * 1000
+                t = time.perf_counter()
+                cv2.imencode(".jpg", anotada)
+                estagios["encode"] += (time.perf_counter() - t) * 1000
+            latencias.append((time.perf_counter() - inicio_lote) * 1000 / len(lote))
+        total = time.perf_counter() - inicio_total
+        execucoes.append({
+            "imagens_por_s": len(caminhos) / total,
+            "latencia_ms_p50": float(np.percentile(latencias, 50)),
+            "latencia_ms_p95": float(np.percentile(latencias, 95)),
+            "estagios_ms": {k: v / len(caminhos) for k, v in estagios.items()},
+        })
+
+    # Mediana das repetições, métrica a métrica
+    mediana = lambda valores: round(float(np.median(valores)), 3)
+    return {
+        "batch": batch,
+        "imagens": len(caminhos),
+        **{k: mediana([e[k] for e in execucoes]) for k in ("imagens_por_s", "latencia_ms_p50", "latencia_ms_p95")},
+        "estagios_ms": {s: mediana([e["estagios_ms"][s] for e in execucoes]) for s in IMAGE_STAGES},
+    }
+
+
+def bench_video(backend, video, batch):
+    """VideoEngine completo (decodificação, inferência, desenho e codificação em pipeline)."""
+    gravador = SpeedRecorder(backend)
+    saida = tempfile.NamedTemporaryFile(suffix=".mp4", delete=False).name
+    try:
+        stats = VideoEngine(gravador, batch_size=batch).run(video, saida)
+    finally:
+        os.unlink(saida)
+    resumo = stats.resumo()
+    ms_por_frame = {
+        nome: round(e["tempo_s"] * 1000 / e["frames"], 3) if e["frames"] else 0.0
+        for nome, e in resumo["estagios"].items()
+    }
+    return {
+        "video": os.path.basename(video),
+        "batch": batch,
+        "frames": resumo["frames"],
+        "fps": resumo["fps_total"],
+        "estagios_ms": {**ms_por_frame, **{f"modelo_{k}": v for k, v in gravador.media_ms().items()}},
+    }
+
+
+def run_child(backend_name, threads, args):
+    """Mede uma combinação backend x threads e imprime o resultado em JSON."""
+    inicio = time.perf_counter()
+    if threads:
+        cv2.setNumThreads(threads)
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+    from backends import load_backend
+    backend = load_backend(backend_name, weights=args.weights, tiling=False, cascade=False, imgsz=args.imgsz)
+    carga = time.perf_counter() - inicio
+    caminhos = [img for img, _ in metrics.dataset_items(args.images)][:args.limit]
+    t = time.perf_counter()
+    backend.predict([cv2.imread(caminhos[0])])
+    primeira = time.perf_counter() - t
+    rss_carga = peak_rss_mb()
+
+    resultado = {
+        "backend": backend.name,
+        "threads": threads,
+        "carga_modelo_s": round(carga, 3),
+        "primeira_inferencia_s": round(primeira, 3),
+        "cold_start_s": round(carga + primeira, 3),
+        "imagens": [bench_images(backend, caminhos, b, args.repeat) for b in args.batch],
+        "videos": [bench_video(backend, v, b) for v in args.videos for b in args.batch],
+        "rss_apos_carga_mb": round(rss_carga, 1),
+        "pico_rss_mb": round(peak_rss_mb(), 1),
+    }
+    print(json.dumps(resultado))
+
+
+# =============================================
+# COMPARAÇÃO COM A LINHA DE BASE
+# =============================================
+
+def flatten(relatorio):
+    """Métricas comparáveis do relatório como ``{caminho: valor}``."""
+    valores = {}
+    for e in relatorio["execucoes"]:
+        prefixo = f"{e['backend']}/t{e['threads']}"
+        for k in ("cold_start_s", "pico_rss_mb"):
+            valores[f"{prefixo}/{k}"] = e[k]
+        for img in e["imagens"]:
+            base = f"{prefixo}/imagem/b{img['batch']}"
+            for k in ("imagens_por_s", "latencia_ms_p50", "latencia_ms_p95"):
+                valores[f"{base}/{k}"] = img[k]
+            valores.update({f"{base}/{s}_ms": v for s, v in img["estagios_ms"].items()})
+        for vid in e["videos"]:
+            base = f"{prefixo}/{vid['video']}/b{vid['batch']}"
+            valores[f"{base}/fps"] = vid["fps"]
+            valores.update({f"{base}/{s}_ms": v for s, v in vid["estagios_ms"].items()})
+    return valores
+
+
+def compare(relatorio, baseline, tolerance=TOLERANCE, min_delta=MIN_DELTA):
+    """
+    Compara com uma linha de base; métricas ausentes em um dos lados são ignoradas.
+
+    Returns:
+        list[dict]: Métricas com piora relativa acima de ``tolerance`` (e absoluta acima de ``min_delta``).
+    """
+    atual, anterior = flatten(relatorio), flatten(baseline)
+    regressoes = []
+    for chave in sorted(atual.keys() & anterior.keys()):
+        novo, velho = atual[chave], anterior[chave]
+        if not velho:
+            continue
+        maior_melhor = chave.rsplit("/", 1)[1] in HIGHER_IS_BETTER
+        variacao = (novo - velho) / velho
+        piora = -variacao if maior_melhor else variacao
+        if piora > tolerance and abs(novo - velho) > min_delta:
+            regressoes.append({"metrica": chave, "base": velho, "atual": novo, "variacao": round(variacao, 4)})
+    return regressoes
+
+
+# =============================================
+# EXECUÇÃO DIRETA DO SCRIPT
+# =============================================
+
+def print_report(e):
+    print(f"\n⚙️  {e['backend']} | threads {e['threads'] or 'padrão'} | partida a frio {e['cold_start_s']:.2f} s "
+          f"(carga {e['carga_modelo_s']:.2f} s) | pico RSS {e['pico_rss_mb']:.0f} MB")
+    print(f"{'imagem':<22} | {'img/s':>7} | {'p50 ms':>7} | {'p95 ms':>7} | " + " | ".join(f"{s:>11}" for s in IMAGE_STAGES))
+    for img in e["imagens"]:
+        print(f"{'batch ' + str(img['batch']):<22} | {img['imagens_por_s']:7.2f} | {img['latencia_ms_p50']:7.2f} | "
+              f"{img['latencia_ms_p95']:7.2f} | " + " | ".join(f"{img['estagios_ms'][s]:8.2f} ms" for s in IMAGE_STAGES))
+    for vid in e["videos"]:
+        estagios = ", ".join(f"{s} {v:.2f}" for s, v in vid["estagios_ms"].items())
+        print(f"{vid['video'] + ' b' + str(vid['batch']):<22} | {vid['fps']:7.2f} FPS | ms/frame: {estagios}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de desempenho dos caminhos de imagem e vídeo.")
+    parser.add_argument("--backends", nargs="+", default=[None], choices=BACKENDS,
+                        help="Backends a medir (padrão: o configurado)")
+    parser.add_argument("--weights", default=None, help="Artefato do modelo (com um único backend)")
+    parser.add_argument("--imgsz", type=int, default=None)
+    parser.add_argument("--batch", type=int, nargs="+", default=BATCH_SIZES)
+    parser.add_argument("--threads", type=int, nargs="+", default=THREADS, help="Threads de inferência (0 = padrão)")
+    parser.add_argument("--images", default=IMAGES_DIR)
+    parser.add_argument("--videos", nargs="*", default=VIDEOS)
+    parser.add_argument("--limit", type=int, default=None, help="Usa só as N primeiras imagens")
+    parser.add_argument("--repeat", type=int, default=REPEAT)
+    parser.add_argument("--output", default=REPORT, help="Relatório em JSON")
+    parser.add_argument("--compare", default=None, help="Relatório de linha de base para detectar regressões")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--child", nargs=2, metavar=("BACKEND", "THREADS"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(None if args.child[0] == "-" else args.child[0], int(args.child[1]), args)
+        return
+
+    repassados = ["--batch", *map(str, args.batch), "--images", args.images, "--repeat", str(args.repeat),
+                  "--videos", *args.videos]
+    for opcao in ("weights", "imgsz", "limit"):
+        if getattr(args, opcao) is not None:
+            repassados += [f"--{opcao}", str(getattr(args, opcao))]
+
+    relatorio = {
+        "ambiente": {
+            "python": platform.python_version(),
+            "plataforma": platform.platform(),
+            "processador": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(),
+            "opencv": cv2.__version__,
+            "numpy": np.__version__,
+        },
+        "config": {k: v for k, v in vars(args).items() if k not in ("child", "output", "compare")},
+        "execucoes": [],
+    }
+    for backend in args.backends:
+        for threads in args.threads:
+            env = dict(os.environ)
+            if threads:
+                env["OMP_NUM_THREADS"] = str(threads)
+            cmd = [sys.executable, __file__, "--child", backend or "-", str(threads), *repassados]
+            saida = subprocess.run(cmd, capture_output=True, text=True, env=env)
+            if saida.returncode != 0:
+                sys.exit(f"❌ Falha no benchmark ({backend or 'padrão'}, threads {threads}):\n{saida.stderr}")
+            execucao = json.loads(saida.stdout.strip().splitlines()[-1])
+            relatorio["execucoes"].append(execucao)
+            print_report(execucao)
+
+    with open(args.output, "w") as f:
+        json.dump(relatorio, f, indent=2)
+    print(f"\n💾 Relatório salvo em {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressoes = compare(relatorio, json.load(f), args.tolerance)
+        if not regressoes:
+            print(f"✅ Nenhuma regressão acima de {args.tolerance:.0%} em relação a {args.compare}")
+            return
+        print(f"⚠️  {len(regressoes)} regressões acima de {args.tolerance:.0%} em relação a {args.compare}:")
+        for r in regressoes:
+            print(f"  {r['metrica']:<55} {r['base']:>10} -> {r['atual']:<10} ({r['variacao']:+.1%})")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+import os
+import threading
+
+import numpy as np
+
+from detections import box_iou
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+FAST_IMGSZ = 416                 # Resolução da passada barata (múltiplo de 32)
+UNCERTAIN = (0.25, 0.6)          # Faixa de confiança [baixa, alta) que escala o frame para o modelo completo
+CONFUSABLE_IOU = 0.5             # Caixas de classes confundíveis sobrepostas acima disso escalam o frame
+CONFUSABLE_CONF = 0.75           # Confiança mínima para aceitar uma classe confundível sem escalar
+
+# Pares de classes que o modelo pequeno confunde (mesmo veículo com rótulos de origens diferentes)
+CONFUSABLE_PAIRS = [
+    ("truck-m-", "mid truck"),
+    ("truck-s-", "small truck"),
+    ("truck-l-", "big truck"),
+    ("bus-l-", "big bus"),
+    ("bus-s-", "small bus"),
+]
+REASONS = ("incerteza", "confusao", "vazio")
+
+
+# =============================================
+# CASCATA DE MODELOS
+# =============================================
+
+class CascadeBackend:
+    """
+    Cascata de dois modelos: um pequeno em resolução reduzida decide quais frames
+    precisam do modelo completo.
+
+    Todos os frames passam pelo modelo rápido (ex.: YOLO11n treinado no mesmo dataset)
+    em ``fast_imgsz``. Um frame é escalado quando a passada barata não é conclusiva:
+
+    - ``incerteza``: alguma detecção com confiança na faixa ``uncertain`` [baixa, alta);
+    - ``confusao``: detecções de um par confundível (ex.: ``truck-m-`` e ``mid truck``)
+      sobrepostas com IoU >= ``confusable_iou``, ou uma classe confundível abaixo de
+      ``confusable_conf``;
+    - ``vazio`` (opcional): nenhuma detecção acima da faixa baixa.
+
+    Os frames escalados vão ao modelo completo em uma única chamada em lote e suas
+    detecções substituem as da passada barata; os demais ficam com as do modelo rápido.
+    Detecções abaixo da faixa baixa são tratadas como fundo, então chamar ``detect`` com
+    uma confiança menor (como o cache faz) não muda quais frames escalam.
+
+    Expõe a mesma interface do ``InferenceBackend`` (``detect``, ``names``, ``params``),
+    então pode ser envolvido pelo ``TiledBackend`` e usado pelo ``VideoEngine``, pelo
+    cache, pelos streams e pelos scripts de lote.
+
+    Args:
+        fast (InferenceBackend): Modelo barato.
+        full (InferenceBackend): Modelo completo (best.pt).
+        fast_imgsz (int): Resolução da passada barata.
+        uncertain (tuple[float, float]): Faixa de confiança que escala o frame.
+        confusable_pairs (list[tuple[str, str]]): Pares de nomes de classes confundíveis.
+        confusable_iou (float): IoU entre classes de um par que caracteriza a confusão.
+        confusable_conf (float): Confiança mínima de uma classe confundível.
+        escalate_empty (bool): Escala frames sem nenhuma detecção.
+    """
+
+    def __init__(self, fast, full, fast_imgsz=FAST_IMGSZ, uncertain=UNCERTAIN, confusable_pairs=CONFUSABLE_PAIRS,
+                 confusable_iou=CONFUSABLE_IOU, confusable_conf=CONFUSABLE_CONF, escalate_empty=False):
+        nomes = list(full.names.values()) if isinstance(full.names, dict) else list(full.names)
+        nomes_rapido = list(fast.names.values()) if isinstance(fast.names, dict) else list(fast.names)
+        if nomes_rapido != nomes:
+            raise ValueError("O modelo rápido da cascata precisa ter as mesmas classes do modelo completo "
+                             f"({len(nomes_rapido)} x {len(nomes)}): treine-o no mesmo data.yaml")
+        low, high = uncertain
+        if not 0 <= low <= high <= 1:
+            raise ValueError("uncertain deve ser uma faixa [baixa, alta] dentro de [0, 1]")
+
+        self.fast = fast
+        self.full = full
+        self.fast_imgsz = int(fast_imgsz)
+        self.uncertain = (float(low), float(high))
+        self.confusable_iou = float(confusable_iou)
+        self.confusable_conf = float(confusable_conf)
+        self.escalate_empty = bool(escalate_empty)
+
+        ids = {nome: c for c, nome in enumerate(nomes)}
+        desconhecidas = sorted({n for par in confusable_pairs for n in par} - set(ids))
+        if desconhecidas:
+            raise ValueError(f"Classes confundíveis desconhecidas: {', '.join(desconhecidas)}")
+        self.confusable_pairs = [tuple(par) for par in confusable_pairs]
+        self._pares = np.array([(ids[a], ids[b]) for a, b in confusable_pairs], np.int64).reshape(-1, 2)
+        self._confundivel = np.zeros(len(nomes), bool)
+        self._confundivel[self._pares.ravel()] = True
+
+        self._lock = threading.Lock()
+        self.frames = 0
+        self.escalados = 0
+        self.motivos = dict.fromkeys(REASONS, 0)
+
+    @property
+    def name(self):
+        # Entra na chave do cache: a saída depende do modelo rápido e dos limiares de escalonamento
+        from result_cache import weights_hash
+
+        low, high = self.uncertain
+        vazio = "-vazio" if self.escalate_empty else ""
+        return (f"{self.full.name}+cascade-{self.fast.name}{weights_hash(self.fast.weights)[:8]}-{self.fast_imgsz}-"
+                f"u{low}-{high}-c{self.confusable_iou}-{self.confusable_conf}-p{len(self.confusable_pairs)}{vazio}")
+
+    def __getattr__(self, nome):
+        # names, params, weights, model... vêm do modelo completo
+        return getattr(self.full, nome)
+
+    def reason(self, detections):
+        """
+        Motivo para escalar um frame a partir das detecções da passada barata.
+
+        Returns:
+            str | None: Um de ``REASONS`` ou None quando a passada barata basta.
+        """
+        low, high = self.uncertain
+        d = detections.filter_conf(low)
+        if len(d) == 0:
+            return "vazio" if self.escalate_empty else None
+        if (d.conf < high).any():
+            return "incerteza"
+        confundiveis = self._confundivel[d.cls]
+        if not confundiveis.any():
+            return None
+        if (d.conf[confundiveis] < self.confusable_conf).any():
+            return "confusao"
+        # Mesmo veículo com as duas classes de um par: o NMS por classe mantém as duas caixas
+        xyxy, cls = d.xyxy[confundiveis], d.cls[confundiveis]
+        sobrepostas = box_iou(xyxy, xyxy) >= self.confusable_iou
+        for a, b in self._pares:
+            if sobrepostas[np.ix_(cls == a, cls == b)].any():
+                return "confusao"
+        return None
+
+    def detect(self, frames, **kwargs):
+        """Inferência em lote retornando uma lista de ``Detections`` (uma por frame)."""
+        if not frames:
+            return []
+        # O imgsz pedido (ex.: degradação do escalonador) só pode reduzir a passada barata
+        imgsz = min(kwargs.get("imgsz") or self.fast_imgsz, self.fast_imgsz)
+        saida = self.fast.detect(frames, **{**kwargs, "imgsz": imgsz})
+        motivos = [self.reason(d) for d in saida]
+        escalar = [i for i, m in enumerate(motivos) if m]
+        if escalar:
+            for i, d in zip(escalar, self.full.detect([frames[i] for i in escalar], **kwargs)):
+                saida[i] = d
+
+        with self._lock:
+            self.frames += len(frames)
+            self.escalados += len(escalar)
+            for i in escalar:
+                self.motivos[motivos[i]] += 1
+        return saida
+
+    def cascade_stats(self):
+        """Frames processados, frames escalados, taxa de escalonamento e contagem por motivo."""
+        with self._lock:
+            return {
+                "frames": self.frames,
+                "escalados": self.escalados,
+                "taxa_escalonamento": round(self.escalados / self.frames, 4) if self.frames else 0.0,
+                "motivos": dict(self.motivos),
+            }
+
+
+def from_config(backend, config):
+    """
+    Monta a cascata conforme a seção ``cascade`` de ``configs/inference.yaml``.
+
+    O modelo rápido usa o runtime ``fast_backend`` (padrão: o do modelo completo) e os
+    mesmos conf, iou e device do modelo completo.
+
+    Returns:
+        InferenceBackend | CascadeBackend: O próprio backend se a seção estiver ausente ou desativada.
+
+    Raises:
+        FileNotFoundError: Se o modelo rápido ainda não foi treinado.
+    """
+    config = dict(config or {})
+    if not config.pop("enabled", False):
+        return backend
+    from backends import InferenceBackend
+
+    fast_weights = config.pop("fast_weights", None)
+    if not fast_weights:
+        raise ValueError("A cascata precisa de fast_weights (o modelo pequeno treinado no dataset)")
+    if not os.path.exists(fast_weights):
+        raise FileNotFoundError(
+            f"Modelo rápido da cascata não encontrado: {fast_weights}. Treine-o de dentro de scripts/ com "
+            "'yolo detect train data=../configs/data_split.yaml model=yolo11n.pt imgsz=416 name=train_nano' "
+            "ou desative a seção cascade de configs/inference.yaml")
+    fast_name = config.pop("fast_backend", None) or backend.name
+    params = {**backend.params, "imgsz": config.get("fast_imgsz", FAST_IMGSZ)}
+    if "uncertain" in config:
+        config["uncertain"] = tuple(config["uncertain"])
+    if "confusable_pairs" in config:
+        config["confusable_pairs"] = [tuple(par) for par in config["confusable_pairs"] or []]
+    return CascadeBackend(InferenceBackend(fast_name, fast_weights, **params), backend, **config)
+
+
+def cli_cascade(enabled=False, config_path=None):
+    """
+    Seção ``cascade`` a partir da opção de linha de comando, para ``load_backend``.
+
+    Returns:
+        dict | None: None quando a opção não foi passada (vale o arquivo).
+    """
+    if not enabled:
+        return None
+    from backends import INFERENCE_CONFIG, load_config
+
+    config = dict(load_config(config_path or INFERENCE_CONFIG).get("cascade") or {})
+    config["enabled"] = True
+    return config
+
@@ -0,0 +1,60 @@
+import argparse
+import os
+import sys
+
+from backends import load_backend, load_config
+
+# =============================================
+# VERIFICAÇÃO DE PARIDADE ENTRE BACKENDS
+# =============================================
+# Avalia cada backend exportado no conjunto de teste e compara o mAP com o do PyTorch.
+# Termina com código 1 se alguma diferença passar da tolerância.
+
+def evaluate(backend, data, split):
+    """Retorna mAP@0.5 e mAP@0.5:0.95 do backend no split indicado."""
+    metrics = backend.model.val(
+        data=data,
+        split=split,
+        imgsz=backend.params["imgsz"],
+        batch=1,
+        conf=0.001,     # Confiança baixa, padrão para o cálculo de mAP
+        iou=0.6,
+        device="cpu",
+        plots=False,
+        verbose=False,
+    )
+    return {"map50": float(metrics.box.map50), "map": float(metrics.box.map)}
+
+
+if __name__ == "__main__":
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Compara o mAP dos backends exportados com o PyTorch.")
+    parser.add_argument("--backends", nargs="+", default=["onnx", "openvino"])
+    parser.add_argument("--data", default="../configs/data.yaml")
+    parser.add_argument("--split", default="test")
+    parser.add_argument("--tolerance", type=float, default=0.01, help="Diferença absoluta máxima de mAP")
+    args = parser.parse_args()
+
+    referencia = evaluate(load_backend("torch"), args.data, args.split)
+    print(f"{'backend':<10} | {'mAP50':>7} | {'mAP50-95':>8} | {'Δ mAP50':>8} | {'Δ mAP50-95':>10}")
+    print(f"{'torch':<10} | {referencia['map50']:7.4f} | {referencia['map']:8.4f} | {'-':>8} | {'-':>10}")
+
+    falhas = []
+    for nome in args.backends:
+        artefato = (config.get("weights") or {}).get(nome)
+        if not artefato or not os.path.exists(artefato):
+            print(f"{nome:<10} | artefato não encontrado ({artefato}), rode export_model.py")
+            falhas.append(nome)
+            continue
+        resultado = evaluate(load_backend(nome), args.data, args.split)
+        d50 = resultado["map50"] - referencia["map50"]
+        d = resultado["map"] - referencia["map"]
+        status = "✅" if max(abs(d50), abs(d)) <= args.tolerance else "❌"
+        print(f"{nome:<10} | {resultado['map50']:7.4f} | {resultado['map']:8.4f} | {d50:+8.4f} | {d:+10.4f} {status}")
+        if status == "❌":
+            falhas.append(nome)
+
+    if falhas:
+        print(f"\nParidade falhou para: {', '.join(falhas)} (tolerância {args.tolerance})")
+        sys.exit(1)
+    print(f"\nTodos os backends dentro da tolerância de {args.tolerance} de mAP.")
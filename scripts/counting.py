@@ -0,0 +1,242 @@
+import threading
+from dataclasses import dataclass
+
+import cv2
+import numpy as np
+import yaml
+
+from tracker import MAX_AGE
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+COUNTING_CONFIG = "../configs/counting.yaml"  # Linhas e zonas de contagem (coordenadas normalizadas 0-1)
+# Atualizações sem ver uma trilha antes de esquecê-la (posição e regiões já contadas). Acima do
+# max_age do rastreador: a essa altura ele já descartou a trilha, e ids não são reutilizados.
+MEMORY_UPDATES = MAX_AGE + 1
+
+
+@dataclass
+class CountEvent:
+    """Uma trilha contada ao cruzar uma linha ou entrar em uma zona."""
+    frame: int
+    region: str
+    track_id: int
+    class_id: int
+    class_name: str
+    direction: str  # "in"/"out" para linhas, "enter" para zonas
+
+    def to_dict(self):
+        return self.__dict__.copy()
+
+
+# =============================================
+# GEOMETRIA VETORIZADA
+# =============================================
+
+def _cross(o, a, b):
+    """Produto vetorial 2D (a - o) x (b - o) com broadcasting."""
+    return (a[..., 0] - o[..., 0]) * (b[..., 1] - o[..., 1]) - (a[..., 1] - o[..., 1]) * (b[..., 0] - o[..., 0])
+
+
+def segments_cross(p0, p1, a, b):
+    """
+    Testa quais deslocamentos p0 -> p1 cruzam quais linhas a -> b.
+
+    Args:
+        p0, p1 (np.ndarray): Posições anterior e atual (N, 2).
+        a, b (np.ndarray): Extremidades das linhas (L, 2).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Matriz booleana (N, L) de cruzamentos e o lado
+        final (N, L), positivo à esquerda da linha.
+    """
+    p0, p1 = p0[:, None, :], p1[:, None, :]
+    a, b = a[None, :, :], b[None, :, :]
+    d1 = _cross(a, b, p0)
+    d2 = _cross(a, b, p1)
+    d3 = _cross(p0, p1, a)
+    d4 = _cross(p0, p1, b)
+    # Convenção semiaberta: um ponto exatamente sobre a linha conta como lado positivo
+    return ((d1 >= 0) != (d2 >= 0)) & (d3 * d4 <= 0), d2
+
+
+def points_in_polygon(points, polygon):
+    """Ray casting vetorizado: (N, 2) pontos contra um polígono (V, 2) -> (N,) booleano."""
+    x, y = points[:, 0:1], points[:, 1:2]
+    xi, yi = polygon[:, 0], polygon[:, 1]
+    xj, yj = np.roll(xi, 1), np.roll(yi, 1)
+    cruza = ((yi > y) != (yj > y)) & (x < (xj - xi) * (y - yi) / np.where(yj - yi == 0, 1e-9, yj - yi) + xi)
+    return cruza.sum(axis=1) % 2 == 1
+
+
+# =============================================
+# CONTADOR DE VEÍCULOS POR CLASSE
+# =============================================
+
+class VehicleCounter:
+    """
+    Conta veículos rastreados que cruzam linhas ou entram em zonas, por classe.
+
+    Cada trilha é contada no máximo uma vez por região. Os eventos são emitidos
+    imediatamente via ``on_count`` e as contagens podem ser lidas a qualquer momento
+    (inclusive de outra thread) com ``snapshot``.
+
+    Args:
+        names (dict | list): Nomes das classes indexados pelo id.
+        lines (list[dict]): Linhas ``{"name": str, "points": [[x, y], [x, y]]}`` normalizadas.
+        zones (list[dict]): Zonas ``{"name": str, "polygon": [[x, y], ...]}`` normalizadas.
+        on_count (callable | None): Chamado com cada ``CountEvent`` assim que ocorre.
+        memory (int): Atualizações sem ver a trilha antes de esquecê-la; deve passar do
+            ``max_age`` do rastreador (uma chamada de ``update`` por atualização dele).
+    """
+
+    def __init__(self, names, lines=(), zones=(), on_count=None, memory=MEMORY_UPDATES):
+        self.names = names
+        self.lines = list(lines)
+        self.zones = list(zones)
+        self.on_count = on_count
+        self.regioes = [l["name"] for l in self.lines] + [z["name"] for z in self.zones]
+        self.counts = np.zeros((len(self.regioes), len(names)), np.int64)
+        self.memory = memory
+        self._lock = threading.Lock()
+        self._px_lines = None
+        self._px_zones = None
+        self._atualizacoes = 0
+        # Trilhas lembradas, ordenadas pelo id: última posição, última atualização em que
+        # apareceram e regiões em que já foram contadas
+        self._prev_ids = np.zeros(0, np.int64)
+        self._prev_pts = np.zeros((0, 2))
+        self._prev_visto = np.zeros(0, np.int64)
+        self._prev_contado = np.zeros((0, len(self.regioes)), bool)
+
+    @classmethod
+    def from_config(cls, names, path=COUNTING_CONFIG, on_count=None):
+        with open(path) as f:
+            config = yaml.safe_load(f) or {}
+        return cls(names, config.get("lines") or [], config.get("zones") or [], on_count)
+
+    def _em_pixels(self, frame_shape):
+        escala = np.array([frame_shape[1], frame_shape[0]], np.float64)
+        self._px_lines = np.array([l["points"] for l in self.lines], np.float64).reshape(-1, 2, 2) * escala
+        self._px_zones = [np.array(z["polygon"], np.float64) * escala for z in self.zones]
+
+    def update(self, frame_idx, detections, frame_shape):
+        """
+        Atualiza as contagens com as detecções rastreadas de um frame.
+
+        Args:
+            frame_idx (int): Índice do frame.
+            detections (Detections): Detecções com ``track_id`` (ids < 0 são ignorados).
+            frame_shape (tuple): Formato do frame, para converter as regiões normalizadas.
+
+        Returns:
+            list[CountEvent]: Eventos de contagem gerados neste frame.
+        """
+        if self._px_lines is None:
+            self._em_pixels(frame_shape)
+        if detections.track_id is None or not self.regioes:
+            return []
+        self._atualizacoes += 1
+
+        validas = detections.track_id >= 0
+        ids = detections.track_id[validas]
+        pts = detections.centers[validas].astype(np.float64)
+        cls = detections.cls[validas]
+        reg, det, sentido = [np.zeros(0, np.int64)], [np.zeros(0, np.int64)], [np.zeros(0, "<U5")]
+
+        # Posição de cada trilha na memória
+        pos = np.minimum(np.searchsorted(self._prev_ids, ids), max(len(self._prev_ids) - 1, 0))
+        conhecidas = np.zeros(len(ids), bool)
+        if len(self._prev_ids):
+            conhecidas = self._prev_ids[pos] == ids
+
+        # Linhas: deslocamento desde a última posição conhecida da trilha
+        if len(self._px_lines) and len(ids):
+            if conhecidas.any():
+                cruzou, lado = segments_cross(self._prev_pts[pos[conhecidas]], pts[conhecidas],
+                                              self._px_lines[:, 0], self._px_lines[:, 1])
+                det_idx, linha = np.nonzero(cruzou)
+                reg.append(linha)
+                det.append(np.flatnonzero(conhecidas)[det_idx])
+                sentido.append(np.where(lado[det_idx, linha] >= 0, "in", "out"))
+
+        # Zonas: primeira vez que o centro da trilha aparece dentro do polígono
+        if len(ids):
+            for z, poligono in enumerate(self._px_zones):
+                dentro = np.flatnonzero(points_in_polygon(pts, poligono))
+                reg.append(np.full(len(dentro), len(self.lines) + z))
+                det.append(dentro)
+                sentido.append(np.full(len(dentro), "enter"))
+
+        reg, det, sentido = np.concatenate(reg), np.concatenate(det), np.concatenate(sentido)
+        # Mantém apenas pares (trilha, região) ainda não contados, sem duplicatas no frame
+        _, primeiro = np.unique(ids[det] * len(self.regioes) + reg, return_index=True)
+        reg, det, sentido = reg[primeiro], det[primeiro], sentido[primeiro]
+        contado = conhecidas[det]
+        contado[contado] = self._prev_contado[pos[det[contado]], reg[contado]]
+        reg, det, sentido = reg[~contado], det[~contado], sentido[~contado]
+
+        with self._lock:
+            np.add.at(self.counts, (reg, cls[det]), 1)
+
+        # Eventos são raros (um por trilha e região), então a montagem fica fora da parte vetorizada
+        eventos = [
+            CountEvent(frame_idx, self.regioes[r], int(ids[i]), int(cls[i]), self.names[int(cls[i])], str(d))
+            for r, i, d in zip(reg, det, sentido)
+        ]
+
+        self._atualiza_memoria(ids, pts, pos, conhecidas, reg, det)
+        if self.on_count is not None:
+            for evento in eventos:
+                self.on_count(evento)
+        return eventos
+
+    def _atualiza_memoria(self, ids, pts, pos, conhecidas, reg, det):
+        """
+        Guarda a última posição e as regiões contadas de cada trilha vista, esquecendo as que
+        sumiram há mais de ``memory`` atualizações: a memória acompanha as trilhas ativas.
+        """
+        contado = np.zeros((len(ids), len(self.regioes)), bool)
+        contado[conhecidas] = self._prev_contado[pos[conhecidas]]
+        contado[det, reg] = True
+        manter = ~np.isin(self._prev_ids, ids) & (self._atualizacoes - self._prev_visto <= self.memory)
+        todos_ids = np.concatenate([self._prev_ids[manter], ids])
+        ordem = np.argsort(todos_ids, kind="stable")
+        self._prev_ids = todos_ids[ordem]
+        self._prev_pts = np.concatenate([self._prev_pts[manter], pts])[ordem]
+        self._prev_visto = np.concatenate([self._prev_visto[manter], np.full(len(ids), self._atualizacoes)])[ordem]
+        self._prev_contado = np.concatenate([self._prev_contado[manter], contado])[ordem]
+
+    def snapshot(self):
+        """Contagens atuais como ``{região: {classe: n}}``, omitindo classes zeradas."""
+        with self._lock:
+            counts = self.counts.copy()
+        return {
+            regiao: {self.names[c]: int(n) for c, n in enumerate(linha) if n}
+            for regiao, linha in zip(self.regioes, counts)
+        }
+
+    def totals(self):
+        """Total por classe somando todas as regiões."""
+        with self._lock:
+            totais = self.counts.sum(axis=0)
+        return {self.names[c]: int(n) for c, n in enumerate(totais) if n}
+
+    def draw(self, frame):
+        """Desenha as linhas, zonas e o total contado em cada região sobre o frame."""
+        if self._px_lines is None:
+            self._em_pixels(frame.shape)
+        with self._lock:
+            por_regiao = self.counts.sum(axis=1)
+        for i, (a, b) in enumerate(self._px_lines.astype(np.int32)):
+            cv2.line(frame, tuple(a.tolist()), tuple(b.tolist()), (0, 255, 255), 2, cv2.LINE_AA)
+            cv2.putText(frame, f"{self.regioes[i]}: {por_regiao[i]}", tuple(a.tolist()),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2, cv2.LINE_AA)
+        for z, poligono in enumerate(self._px_zones):
+            pts = poligono.astype(np.int32)
+            cv2.polylines(frame, [pts], True, (255, 255, 0), 2, cv2.LINE_AA)
+            cv2.putText(frame, f"{self.regioes[len(self.lines) + z]}: {por_regiao[len(self.lines) + z]}",
+                        tuple(pts[0].tolist()), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2, cv2.LINE_AA)
+        return frame
@@ -0,0 +1,209 @@
+from dataclasses import dataclass
+
+import numpy as np
+
+# =============================================
+# ESTRUTURA COMUM DE DETECÇÕES
+# =============================================
+
+# Paleta BGR fixa, uma cor por classe (repetida se houver mais classes)
+PALETTE = [
+    (56, 56, 255), (151, 157, 255), (31, 112, 255), (29, 178, 255),
+    (49, 210, 207), (10, 249, 72), (23, 204, 146), (134, 219, 61),
+    (211, 188, 0), (209, 85, 0), (255, 115, 100), (203, 56, 255),
+]
+
+
+@dataclass
+class Detections:
+    """
+    Detecções de um único frame em arrays NumPy compactos.
+
+    Attributes:
+        xyxy (np.ndarray): Caixas (N, 4) em pixels, float32, formato x1, y1, x2, y2.
+        conf (np.ndarray): Confiança (N,), float32.
+        cls (np.ndarray): Índice da classe (N,), int32.
+        track_id (np.ndarray | None): Id persistente do rastreador (N,), int64; -1 para trilhas não confirmadas.
+    """
+    xyxy: np.ndarray
+    conf: np.ndarray
+    cls: np.ndarray
+    track_id: np.ndarray | None = None
+
+    @classmethod
+    def empty(cls):
+        return cls(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int32))
+
+    @classmethod
+    def from_result(cls, result):
+        """Converte um ``ultralytics.engine.results.Results`` para ``Detections``."""
+        boxes = result.boxes
+        if boxes is None or len(boxes) == 0:
+            return cls.empty()
+        return cls(
+            boxes.xyxy.cpu().numpy().astype(np.float32, copy=False),
+            boxes.conf.cpu().numpy().astype(np.float32, copy=False),
+            boxes.cls.cpu().numpy().astype(np.int32),
+        )
+
+    def __len__(self):
+        return len(self.conf)
+
+    def select(self, mask):
+        """Subconjunto das detecções por máscara booleana ou índices."""
+        track_id = self.track_id[mask] if self.track_id is not None else None
+        return Detections(self.xyxy[mask], self.conf[mask], self.cls[mask], track_id)
+
+    def filter_conf(self, conf):
+        """Mantém apenas as detecções com confiança >= ``conf``."""
+        return self.select(self.conf >= conf)
+
+    @property
+    def centers(self):
+        """Centros das caixas (N, 2)."""
+        return (self.xyxy[:, :2] + self.xyxy[:, 2:]) * 0.5
+
+    def to_records(self, names):
+        """Lista de dicionários serializáveis (uma entrada por caixa)."""
+        records = [
+            {
+                "class_id": int(c),
+                "class_name": names[int(c)],
+                "confidence": round(float(p), 4),
+                "box": [round(float(v), 1) for v in box],
+            }
+            for box, p, c in zip(self.xyxy, self.conf, self.cls)
+        ]
+        if self.track_id is not None:
+            for record, tid in zip(records, self.track_id):
+                record["track_id"] = int(tid)
+        return records
+
+
+def box_iou(a, b):
+    """
+    IoU entre todos os pares de caixas, sem laços em Python.
+
+    Args:
+        a (np.ndarray): Caixas (N, 4) no formato xyxy.
+        b (np.ndarray): Caixas (M, 4) no formato xyxy.
+
+    Returns:
+        np.ndarray: Matriz (N, M) de IoU.
+    """
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(rb - lt, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def box_ios(a, b):
+    """
+    Interseção sobre a menor área entre todos os pares de caixas.
+
+    Próxima de 1 quando uma caixa está contida na outra, como um veículo cortado na
+    borda de um bloco e a caixa completa vinda do bloco vizinho.
+
+    Returns:
+        np.ndarray: Matriz (N, M) de IoS.
+    """
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.clip(rb - lt, 0, None).prod(axis=2)
+    area_a = (a[:, 2:] - a[:, :2]).prod(axis=1)
+    area_b = (b[:, 2:] - b[:, :2]).prod(axis=1)
+    return inter / np.maximum(np.minimum(area_a[:, None], area_b[None, :]), 1e-9)
+
+
+# =============================================
+# SUPRESSÃO E FUSÃO DE CAIXAS
+# =============================================
+
+def _greedy_clusters(detections, threshold, metric, class_agnostic):
+    """
+    NMS guloso sobre a matriz de sobreposição calculada uma única vez.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Índices mantidos (em ordem decrescente de
+        confiança) e, para cada detecção, a posição em ``keep`` da caixa que a suprimiu.
+    """
+    order = np.argsort(-detections.conf, kind="stable")
+    boxes = detections.xyxy[order]
+    overlap = (box_ios if metric == "ios" else box_iou)(boxes, boxes) > threshold
+    if not class_agnostic:
+        cls = detections.cls[order]
+        overlap &= cls[:, None] == cls[None, :]
+
+    suprimido = np.zeros(len(order), bool)
+    keep = []
+    for i in range(len(order)):
+        if not suprimido[i]:
+            keep.append(i)
+            suprimido |= overlap[i]
+    # Cada caixa pertence à primeira mantida (mais confiante) que a sobrepõe, como no laço acima
+    assign = np.empty(len(order), np.int64)
+    assign[order] = np.argmax(overlap[keep], axis=0)
+    return order[keep], assign
+
+
+def nms(detections, iou_threshold=0.5, metric="iou", class_agnostic=False):
+    """
+    Supressão de não-máximos por classe.
+
+    Args:
+        detections (Detections): Detecções de um frame (por exemplo, somando vários blocos).
+        iou_threshold (float): Sobreposição acima da qual a caixa menos confiante é suprimida.
+        metric (str): ``"iou"`` ou ``"ios"`` (interseção sobre a menor área).
+        class_agnostic (bool): Suprime também entre classes diferentes.
+
+    Returns:
+        Detections: Detecções mantidas, em ordem decrescente de confiança.
+    """
+    if len(detections) == 0:
+        return detections
+    keep, _ = _greedy_clusters(detections, iou_threshold, metric, class_agnostic)
+    return detections.select(keep)
+
+
+def fuse_boxes(detections, iou_threshold=0.5, metric="iou", class_agnostic=False):
+    """
+    Fusão ponderada de caixas (WBF): agrupa como o NMS e funde cada grupo.
+
+    A caixa fundida é a média das caixas do grupo ponderada pela confiança; a
+    confiança é a maior do grupo (um veículo visto em um só bloco não é penalizado).
+
+    Returns:
+        Detections: Uma detecção por grupo, em ordem decrescente de confiança.
+    """
+    if len(detections) == 0:
+        return detections
+    keep, assign = _greedy_clusters(detections, iou_threshold, metric, class_agnostic)
+    pesos = detections.conf.astype(np.float64)
+    soma = np.zeros(len(keep))
+    caixas = np.zeros((len(keep), 4))
+    np.add.at(soma, assign, pesos)
+    np.add.at(caixas, assign, detections.xyxy * pesos[:, None])
+    fundidas = detections.select(keep)
+    fundidas.xyxy = (caixas / np.maximum(soma, 1e-9)[:, None]).astype(np.float32)
+    return fundidas
+
+
+# =============================================
+# DESENHO DAS DETECÇÕES
+# =============================================
+
+def draw_detections(frame, detections, names):
+    """
+    Desenha caixas e rótulos diretamente sobre ``frame`` (BGR) e o retorna.
+
+    Usa o ``Renderer`` compartilhado para ``names`` (rótulos a partir de blocos pré-renderizados).
+
+    Args:
+        frame (np.ndarray): Imagem BGR que será anotada no próprio buffer.
+        detections (Detections): Detecções do frame.
+        names (dict | list): Nomes das classes indexados pelo id.
+    """
+    from renderer import get_renderer
+    return get_renderer(names).draw(frame, detections)
@@ -1,68 +1,331 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import numpy as np
-from ultralytics import YOLO
+import yaml
+from PIL import Image
+
+import metrics
+import result_cache
+import sinks
+from backends import BACKENDS, load_backend
+from detections import Detections, nms
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+DATA_CONFIG = "../configs/data.yaml"          # Layout de pastas (train/valid/test)
+SPLIT_CONFIG = "../configs/data_split.yaml"   # Listas geradas pelo organizer.py; preferidas quando existem
+DATASET_DIR = "../dataset"          # Usado quando o "path" do data.yaml não existe nesta máquina
+EVAL_CACHE_DIR = "../cache/eval"    # Predições por (pesos, split, imgsz), separadas do cache do app
+RAW_CONF = 0.001                    # Confiança das predições armazenadas (padrão do cálculo de mAP)
+RAW_IOU = 0.9                       # NMS frouxo na inferência; o IoU avaliado é reaplicado na pontuação
+BATCH = 8
+CONFS = [0.001, 0.25]               # Limiares de confiança avaliados
+IOUS = [0.6]                        # Limiares de IoU do NMS avaliados
+REPORT = "eval_report.json"
+EXIF_ORIENTATION = 0x0112           # Tag EXIF da orientação da câmera
+
 
 # =============================================
-# FUNÇÃO UTILITÁRIA
+# DATASET
 # =============================================
-def to_scalar(x):
+
+def default_data_config():
     """
-    Converte valores NumPy para escalares do Python.
-    
-    Args:
-        x (np.ndarray | float): Valor numérico ou array.
-    
+    YAML padrão da avaliação: o das listas do organizer.py, se já gerado.
+
+    As originais sorteadas para valid/test continuam em ``train/images``; com o layout de
+    pastas elas seriam avaliadas como treino e o modelo as teria visto no treinamento.
+    """
+    return SPLIT_CONFIG if os.path.exists(SPLIT_CONFIG) else DATA_CONFIG
+
+
+def resolve_split(data_config, split):
+    """
+    Imagens de um split do data.yaml (pasta de imagens ou lista .txt).
+
     Returns:
-        float: Valor escalar.
+        tuple[list[str], list[str]]: Caminhos das imagens e nomes das classes.
     """
-    if isinstance(x, np.ndarray):
-        return x.item() if x.size == 1 else x.mean().item()
-    return float(x)
+    with open(data_config) as f:
+        config = yaml.safe_load(f)
+    raiz = config.get("path") or ""
+    if not os.path.isdir(raiz):
+        raiz = DATASET_DIR
+    chave = {"valid": "val"}.get(split, split)
+    origem = config[chave]
+    origem = origem if os.path.isabs(origem) else os.path.join(raiz, origem)
+
+    if origem.endswith(".txt"):
+        pasta = os.path.dirname(origem)
+        with open(origem) as f:
+            imagens = [os.path.join(pasta, linha.strip()) for linha in f if linha.strip()]
+    else:
+        imagens = [img for img, _ in metrics.dataset_items(origem)]
+    names = config["names"]
+    return imagens, list(names.values()) if isinstance(names, dict) else list(names)
+
+
+def label_path(image_path):
+    """Rótulo YOLO de uma imagem (pasta images/ trocada por labels/)."""
+    pasta, nome = os.path.split(image_path)
+    return os.path.join(os.path.dirname(pasta), "labels", os.path.splitext(nome)[0] + ".txt")
+
+
+def image_size(caminho):
+    """
+    Largura e altura lidas do cabeçalho da imagem, sem decodificar os pixels.
+
+    Segue a orientação EXIF, como o ``cv2.imread`` e a Ultralytics fazem ao carregar a imagem.
+
+    Returns:
+        tuple[int, int] | None: None se o arquivo não puder ser lido como imagem.
+    """
+    try:
+        with Image.open(caminho) as img:
+            largura, altura = img.size
+            if img.getexif().get(EXIF_ORIENTATION) in (5, 6, 7, 8):  # Rotação de 90 ou 270 graus
+                largura, altura = altura, largura
+    except (OSError, SyntaxError, ValueError):
+        return None
+    return largura, altura
+
+
+def load_ground_truth(imagens):
+    """
+    Rótulos em pixels das imagens legíveis (as dimensões vêm só do cabeçalho).
+
+    Returns:
+        tuple[list[str], list]: Imagens legíveis e os rótulos de cada uma; as ilegíveis são
+        informadas e ficam fora da avaliação.
+    """
+    legiveis, verdade, ilegiveis = [], [], []
+    for imagem in imagens:
+        tamanho = image_size(imagem)
+        if tamanho is None:
+            ilegiveis.append(imagem)
+            continue
+        legiveis.append(imagem)
+        verdade.append(metrics.load_yolo_labels(label_path(imagem), *tamanho))
+    if ilegiveis:
+        print(f"⚠️  Imagens ilegíveis fora da avaliação: {len(ilegiveis)}, ex.: {ilegiveis[0]}")
+    return legiveis, verdade
+
 
 # =============================================
-# AVALIAÇÃO DO MODELO YOLOv8
+# PREDIÇÕES EM CACHE
 # =============================================
 
-# Caminho para o modelo treinado
-model_path = "/home/vinicius_lazzeri/Documents/detector-veiculos/scripts/runs/detect/train/weights/best.pt"
+def backend_for(weights):
+    """Backend de um artefato pelo formato (``.pt``, ``.onnx`` ou pasta ``_openvino_model``)."""
+    if weights.endswith(".onnx"):
+        return "onnx"
+    if os.path.isdir(weights):
+        return "openvino"
+    return "torch"
 
-# Inicializa o modelo
-model = YOLO(model_path)
 
-# Executa a avaliação no conjunto de teste
-metrics = model.val(
-    data="../configs/data.yaml",   # Caminho para o arquivo de configuração do dataset
-    split='test',                  # Subconjunto a ser avaliado
-    conf=0.25,                     # Threshold de confiança
-    iou=0.6,                       # Threshold de IoU
-    save=True,                     # Salvar previsões
-    save_txt=False,               
-    save_json=True                # Salvar métricas em JSON
-)
+def predictions_key(backend, imagens, split, imgsz):
+    lista = hashlib.blake2b("\n".join(os.path.basename(i) for i in imagens).encode(), digest_size=20).hexdigest()
+    return result_cache.cache_key(lista, backend, split=split, imgsz=imgsz, conf=RAW_CONF, iou=RAW_IOU)
+
+
+def predict_split(backend, imagens, split, imgsz, cache, batch=BATCH):
+    """
+    Predições (confiança baixa, NMS frouxo) e latência por estágio, vindas do cache se possível.
+
+    A latência de pré-processamento, inferência e pós-processamento vem de
+    ``Results.speed`` da Ultralytics; ela é a medida na execução que gerou a entrada.
+
+    Returns:
+        tuple[list[Detections], dict, bool]: Predições por imagem, latências e se houve acerto no cache.
+    """
+    key = predictions_key(backend, imagens, split, imgsz)
+    entrada = cache.get(key) if cache is not None else None
+    if entrada is not None:
+        return entrada[1], entrada[2]["speed"], True
+
+    backend.predict(imagens[:1], conf=RAW_CONF, iou=RAW_IOU, imgsz=imgsz)  # Aquecimento
+    predicoes, estagios = [], np.zeros(3)
+    inicio = time.perf_counter()
+    for i in range(0, len(imagens), batch):
+        for r in backend.predict(imagens[i:i + batch], conf=RAW_CONF, iou=RAW_IOU, imgsz=imgsz):
+            predicoes.append(Detections.from_result(r))
+            estagios += (r.speed["preprocess"], r.speed["inference"], r.speed["postprocess"])
+    total = time.perf_counter() - inicio
+
+    estagios /= max(len(imagens), 1)
+    speed = {
+        "preprocess_ms": round(float(estagios[0]), 3),
+        "inference_ms": round(float(estagios[1]), 3),
+        "postprocess_ms": round(float(estagios[2]), 3),
+        "total_ms": round(total / max(len(imagens), 1) * 1000, 3),
+        "imagens_por_s": round(len(imagens) / total, 2) if total > 0 else 0.0,
+        "batch": batch,
+    }
+    if cache is not None:
+        cache.put(key, np.arange(len(imagens)), predicoes, {"speed": speed})
+    return predicoes, speed, False
+
 
 # =============================================
-# MÉTRICAS GERAIS
+# PONTUAÇÃO (SEM NOVA INFERÊNCIA)
 # =============================================
-print("\n📊 Resultados (em média):")
-print(f"Precision média:     {to_scalar(metrics.box.p):.4f}")
-print(f"Recall média:        {to_scalar(metrics.box.r):.4f}")
-print(f"mAP@0.5 média:       {to_scalar(metrics.box.map50):.4f}")
-print(f"mAP@0.5:0.95 média:  {to_scalar(metrics.box.map):.4f}")
+
+def score(predicoes, verdade, names, conf, iou):
+    """
+    Reaplica confiança e NMS às predições armazenadas e calcula as métricas por classe.
+
+    Como as predições foram geradas com NMS frouxo, o NMS no IoU avaliado reproduz
+    (salvo casos raros de supressão encadeada) o resultado de inferir com ele.
+    """
+    tps, confs, classes = [], [], []
+    for det, (gt_xyxy, gt_cls) in zip(predicoes, verdade):
+        det = nms(det.filter_conf(conf), iou)
+        tps.append(metrics.match_thresholds(det, gt_xyxy, gt_cls))
+        confs.append(det.conf)
+        classes.append(det.cls)
+    n_gt = np.bincount(np.concatenate([c for _, c in verdade]), minlength=len(names)).astype(np.float64)
+    r = metrics.ap_per_class(np.concatenate(tps), np.concatenate(confs), np.concatenate(classes), n_gt)
+
+    presentes = n_gt > 0
+    ap50, ap = r["ap"][:, 0], r["ap"].mean(axis=1)
+    por_classe = {
+        nome: {"precision": round(float(r["precision"][c]), 4), "recall": round(float(r["recall"][c]), 4),
+               "map50": round(float(ap50[c]), 4), "map": round(float(ap[c]), 4),
+               "tp": int(r["tp"][c]), "fp": int(r["fp"][c]), "fn": int(n_gt[c] - r["tp"][c]), "labels": int(n_gt[c])}
+        for c, nome in enumerate(names)
+    }
+    return {
+        "conf": conf,
+        "iou": iou,
+        "precision": round(float(r["precision"][presentes].mean()), 4),
+        "recall": round(float(r["recall"][presentes].mean()), 4),
+        "map50": round(float(ap50[presentes].mean()), 4),
+        "map": round(float(ap[presentes].mean()), 4),
+        "por_classe": por_classe,
+    }
+
+
+def _score_task(args):
+    return score(*args)
+
 
 # =============================================
-# MÉTRICAS POR CLASSE (Matriz de Confusão)
+# EXECUÇÃO DIRETA DO SCRIPT
 # =============================================
-conf_matrix = metrics.confusion_matrix.matrix  # Matriz de confusão
-class_names = metrics.names                    # Nomes das classes
 
-print("\n🔍 Detalhamento por classe (Precision/Recall calculados):")
-for class_idx, class_name in enumerate(class_names):
-    tp = conf_matrix[class_idx, class_idx]                         # Verdadeiros Positivos
-    fp = conf_matrix[:, class_idx].sum() - tp                      # Falsos Positivos
-    fn = conf_matrix[class_idx, :].sum() - tp                      # Falsos Negativos
+def save_predictions(predicoes, imagens, names, output_dir, backend, conf, iou):
+    """Grava as predições (no menor limiar de confiança e no primeiro IoU avaliados) como resultados COCO."""
+    os.makedirs(output_dir, exist_ok=True)
+    destino = os.path.join(output_dir, f"{backend.name}-{result_cache.weights_hash(backend.weights)[:8]}.json")
+    with sinks.CocoSink(destino, names) as sink:
+        for det, imagem in zip(predicoes, imagens):
+            sink.write(nms(det.filter_conf(conf), iou), source=imagem)
+    print(f"💾 Predições ({sink.boxes} caixas) salvas em {destino}")
+    return destino
+
+
+def print_report(modelo):
+    s = modelo["speed"]
+    print(f"\n📦 {modelo['label']} ({modelo['backend']}, imgsz {modelo['imgsz']})"
+          f"{' [predições do cache]' if modelo['cache_hit'] else ''}")
+    print(f"⏱️  pré {s['preprocess_ms']:.1f} ms | inferência {s['inference_ms']:.1f} ms | "
+          f"pós {s['postprocess_ms']:.1f} ms | {s['imagens_por_s']:.1f} img/s")
+    for a in modelo["avaliacoes"]:
+        print(f"📊 conf {a['conf']:<5} iou {a['iou']:<4} | P {a['precision']:.4f} | R {a['recall']:.4f} | "
+              f"mAP50 {a['map50']:.4f} | mAP50-95 {a['map']:.4f}")
+    ultima = modelo["avaliacoes"][-1]
+    print(f"\n🔍 Por classe (conf {ultima['conf']}, iou {ultima['iou']}):")
+    for nome, c in ultima["por_classe"].items():
+        print(f"{nome:<15} | Precision: {c['precision']:.3f} | Recall: {c['recall']:.3f} | mAP50: {c['map50']:.3f} | "
+              f"TP: {c['tp']} | FP: {c['fp']} | FN: {c['fn']}")
+
+
+def compare(relatorio, baseline_path):
+    """Diferenças de mAP em relação a um relatório anterior (mesmo rótulo, conf e iou)."""
+    with open(baseline_path) as f:
+        anterior = {(m["label"], a["conf"], a["iou"]): a for m in json.load(f)["modelos"] for a in m["avaliacoes"]}
+    print(f"\n📈 Comparação com {baseline_path}:")
+    for m in relatorio["modelos"]:
+        for a in m["avaliacoes"]:
+            base = anterior.get((m["label"], a["conf"], a["iou"]))
+            if base:
+                print(f"{m['label']:<20} conf {a['conf']:<5} iou {a['iou']:<4} | "
+                      f"Δ mAP50 {a['map50'] - base['map50']:+.4f} | Δ mAP50-95 {a['map'] - base['map']:+.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Avalia checkpoints/backends com predições em cache e métricas por classe.")
+    parser.add_argument("--weights", nargs="*", default=[], help="Checkpoints a avaliar (.pt, .onnx ou pasta OpenVINO)")
+    parser.add_argument("--backends", nargs="*", default=[], choices=BACKENDS,
+                        help="Backends configurados em configs/inference.yaml (padrão: o configurado)")
+    parser.add_argument("--data", default=default_data_config(), help="Padrão: configs/data_split.yaml, se existir")
+    parser.add_argument("--split", default="test")
+    parser.add_argument("--imgsz", type=int, default=None)
+    parser.add_argument("--conf", type=float, nargs="+", default=CONFS, help="Limiares de confiança avaliados")
+    parser.add_argument("--iou", type=float, nargs="+", default=IOUS, help="Limiares de IoU do NMS avaliados")
+    parser.add_argument("--batch", type=int, default=BATCH)
+    parser.add_argument("--workers", type=int, default=None, help="Processos para pontuar as combinações de limiares")
+    parser.add_argument("--cache-dir", default=EVAL_CACHE_DIR)
+    parser.add_argument("--no-cache", action="store_true", help="Refaz a inferência (e mede a latência de novo)")
+    parser.add_argument("--output", default=REPORT, help="Relatório em JSON")
+    parser.add_argument("--baseline", default=None, help="Relatório anterior para comparar o mAP")
+    parser.add_argument("--save-predictions", default=None,
+                        help="Diretório que recebe as predições de cada modelo como resultados COCO (JSON)")
+    args = parser.parse_args()
+
+    imagens, names = resolve_split(args.data, args.split)
+    imagens, verdade = load_ground_truth(imagens)
+    print(f"📂 {args.split}: {len(imagens)} imagens | {sum(len(c) for _, c in verdade)} objetos")
+    cache = None if args.no_cache else result_cache.DetectionCache(args.cache_dir)
+
+    # Sem argumentos: o backend e os pesos configurados (o que o app usa)
+    alvos = [(backend_for(w), w) for w in args.weights] + [(b, None) for b in args.backends]
+    alvos = alvos or [(None, None)]
+
+    relatorio = {"data": args.data, "split": args.split, "imagens": len(imagens), "modelos": []}
+    combinacoes = [(c, i) for c in args.conf for i in args.iou]
+    for nome, weights in alvos:
+        backend = load_backend(nome, weights=weights, tiling=False, cascade=False, imgsz=args.imgsz)
+        imgsz = backend.params["imgsz"]
+        predicoes, speed, hit = predict_split(backend, imagens, args.split, imgsz, cache, args.batch)
+
+        tarefas = [(predicoes, verdade, names, c, i) for c, i in combinacoes]
+        if len(tarefas) > 1 and args.workers != 1:
+            with ProcessPoolExecutor(min(args.workers or os.cpu_count() or 1, len(tarefas))) as pool:
+                avaliacoes = list(pool.map(_score_task, tarefas))
+        else:
+            avaliacoes = [_score_task(t) for t in tarefas]
+
+        modelo = {
+            "label": weights or f"{backend.name}:{backend.weights}",
+            "backend": backend.name,
+            "weights": backend.weights,
+            "weights_hash": result_cache.weights_hash(backend.weights),
+            "imgsz": imgsz,
+            "speed": speed,
+            "cache_hit": hit,
+            "avaliacoes": avaliacoes,
+        }
+        if args.save_predictions:
+            modelo["predictions"] = save_predictions(predicoes, imagens, names, args.save_predictions, backend,
+                                                     min(args.conf), args.iou[0])
+        relatorio["modelos"].append(modelo)
+        print_report(modelo)
+
+    with open(args.output, "w") as f:
+        json.dump(relatorio, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Relatório salvo em {args.output}")
+    if args.baseline:
+        compare(relatorio, args.baseline)
 
-    # Cálculo das métricas com tratamento de divisão por zero
-    precision = tp / (tp + fp) if (tp + fp) > 0 else 0.0
-    recall = tp / (tp + fn) if (tp + fn) > 0 else 0.0
 
-    # Exibição formatada
-    print(f"{class_name:<15} | Precision: {precision:.3f} | Recall: {recall:.3f} | TP: {tp} | FP: {fp} | FN: {fn}")
+if __name__ == "__main__":
+    main()
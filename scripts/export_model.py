@@ -0,0 +1,50 @@
+import argparse
+
+from ultralytics import YOLO
+
+from backends import INFERENCE_CONFIG, load_config
+
+# =============================================
+# EXPORTAÇÃO DO MODELO PARA BACKENDS DE CPU
+# =============================================
+# Gera os artefatos ONNX e OpenVINO (opcionalmente quantizado em INT8) a partir do
+# best.pt treinado. Os caminhos gerados seguem o padrão esperado em configs/inference.yaml.
+
+def export(weights, formats, imgsz=640, int8=False, data="../configs/data.yaml"):
+    """
+    Exporta ``weights`` para cada formato pedido.
+
+    Args:
+        weights (str): Caminho do modelo PyTorch (.pt).
+        formats (list[str]): Formatos de saída ("onnx" e/ou "openvino").
+        imgsz (int): Resolução de entrada do modelo exportado.
+        int8 (bool): Quantiza o modelo OpenVINO em INT8 (calibrado com o dataset de ``data``).
+        data (str): YAML do dataset usado na calibração INT8.
+
+    Returns:
+        dict: Caminho do artefato gerado para cada formato.
+    """
+    model = YOLO(weights)
+    artefatos = {}
+    for fmt in formats:
+        kwargs = {"format": fmt, "imgsz": imgsz, "dynamic": True, "device": "cpu"}  # dynamic: permite lotes de tamanho variável
+        if fmt == "onnx":
+            kwargs["simplify"] = True
+        if fmt == "openvino" and int8:
+            kwargs.update(int8=True, data=data)
+        artefatos[fmt] = model.export(**kwargs)
+        print(f"📦 {fmt}: {artefatos[fmt]}")
+    return artefatos
+
+
+if __name__ == "__main__":
+    config = load_config()
+    parser = argparse.ArgumentParser(description="Exporta o detector para ONNX/OpenVINO.")
+    parser.add_argument("--weights", default=config["weights"]["torch"])
+    parser.add_argument("--formats", nargs="+", default=["onnx", "openvino"], choices=["onnx", "openvino"])
+    parser.add_argument("--imgsz", type=int, default=config["imgsz"])
+    parser.add_argument("--int8", action="store_true", help="Quantização INT8 para o OpenVINO")
+    args = parser.parse_args()
+
+    export(args.weights, args.formats, args.imgsz, args.int8)
+    print(f"\nAjuste 'backend' e 'weights' em {INFERENCE_CONFIG} e valide com: python check_parity.py")
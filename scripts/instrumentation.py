@@ -0,0 +1,372 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+
+from detections import Detections
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+FPS_WINDOW = 5.0            # Janela do FPS móvel (segundos)
+PROFILE_INTERVAL = 0.005    # Intervalo entre amostras do profiler (segundos)
+PROFILE_TOP = 15            # Funções listadas no resumo do profiler
+PROM_PREFIX = "detector"
+
+
+# =============================================
+# MÉTRICAS DO CAMINHO QUENTE
+# =============================================
+
+class Instrumentation:
+    """
+    Temporizadores por estágio, contadores, FPS móvel e profundidade de filas.
+
+    Os estágios podem ser atualizados de threads diferentes (decodificação, inferência
+    e codificação do ``VideoEngine``); cada atualização toma uma trava curta. Quem não
+    quer métricas usa ``NULL_INSTRUMENTATION``, cujos métodos não fazem nada, e o custo
+    no caminho quente fica em uma chamada vazia por frame.
+
+    Args:
+        fps_window (float): Janela do FPS móvel (segundos).
+    """
+
+    enabled = True
+
+    def __init__(self, fps_window=FPS_WINDOW):
+        self.fps_window = fps_window
+        self.inicio = time.time()
+        self._lock = threading.Lock()
+        self._estagios = {}     # nome -> [chamadas, itens, total_s, max_s]
+        self._contadores = Counter()
+        self._medidores = {}    # nome -> [último, máximo]
+        self._eventos = {}      # nome -> deque[(instante, n)] para o FPS móvel
+        self.profiler = None
+
+    # ------------------------------
+    # Registro
+    # ------------------------------
+    def observe(self, estagio, segundos, n=1):
+        """Registra ``segundos`` gastos em ``estagio`` processando ``n`` itens."""
+        with self._lock:
+            e = self._estagios.get(estagio)
+            if e is None:
+                e = self._estagios[estagio] = [0, 0, 0.0, 0.0]
+            e[0] += 1
+            e[1] += n
+            e[2] += segundos
+            if segundos > e[3]:
+                e[3] = segundos
+
+    @contextmanager
+    def timer(self, estagio, n=1):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(estagio, time.perf_counter() - inicio, n)
+
+    def count(self, nome, n=1):
+        with self._lock:
+            self._contadores[nome] += n
+
+    def gauge(self, nome, valor):
+        """Valor instantâneo (ex.: profundidade de uma fila); guarda o último e o máximo."""
+        with self._lock:
+            m = self._medidores.get(nome)
+            if m is None:
+                self._medidores[nome] = [valor, valor]
+            else:
+                m[0] = valor
+                if valor > m[1]:
+                    m[1] = valor
+
+    def tick(self, nome="frames", n=1):
+        """Conta ``n`` eventos agora, para o FPS móvel de ``nome``."""
+        agora = time.perf_counter()
+        with self._lock:
+            eventos = self._eventos.get(nome)
+            if eventos is None:
+                eventos = self._eventos[nome] = deque()
+            eventos.append((agora, n))
+            while eventos and agora - eventos[0][0] > self.fps_window:
+                eventos.popleft()
+            self._contadores[nome] += n
+
+    # ------------------------------
+    # Leitura
+    # ------------------------------
+    def fps(self, nome="frames"):
+        """Eventos por segundo na janela móvel."""
+        with self._lock:
+            eventos = list(self._eventos.get(nome, ()))
+        if len(eventos) < 2:
+            return 0.0
+        duracao = eventos[-1][0] - eventos[0][0]
+        return sum(n for _, n in eventos[1:]) / duracao if duracao > 0 else 0.0
+
+    def snapshot(self):
+        """
+        Estado atual em um dicionário simples (JSON).
+
+        Returns:
+            dict: ``estagios`` (chamadas, itens, total, média por item e máximo por chamada),
+            ``contadores``, ``medidores`` (último e máximo) e ``fps`` móvel.
+        """
+        with self._lock:
+            estagios = {
+                nome: {
+                    "chamadas": chamadas,
+                    "itens": itens,
+                    "total_s": round(total, 4),
+                    "media_ms": round(total * 1000 / itens, 3) if itens else 0.0,
+                    "max_ms": round(maximo * 1000, 3),
+                }
+                for nome, (chamadas, itens, total, maximo) in self._estagios.items()
+            }
+            contadores = dict(self._contadores)
+            medidores = {nome: {"valor": v, "max": m} for nome, (v, m) in self._medidores.items()}
+            nomes_fps = list(self._eventos)
+        return {
+            "uptime_s": round(time.time() - self.inicio, 3),
+            "estagios": estagios,
+            "contadores": contadores,
+            "medidores": medidores,
+            "fps": {nome: round(self.fps(nome), 2) for nome in nomes_fps},
+        }
+
+    def merge(self, snapshot):
+        """Soma um ``snapshot`` de outro processo (o FPS móvel não é combinável e fica de fora)."""
+        with self._lock:
+            for nome, s in snapshot["estagios"].items():
+                e = self._estagios.setdefault(nome, [0, 0, 0.0, 0.0])
+                e[0] += s["chamadas"]
+                e[1] += s["itens"]
+                e[2] += s["total_s"]
+                e[3] = max(e[3], s["max_ms"] / 1000)
+            self._contadores.update(snapshot["contadores"])
+            for nome, m in snapshot["medidores"].items():
+                atual = self._medidores.setdefault(nome, [m["valor"], m["max"]])
+                atual[0] = m["valor"]
+                atual[1] = max(atual[1], m["max"])
+
+    # ------------------------------
+    # Profiler por amostragem
+    # ------------------------------
+    @contextmanager
+    def profiling(self, enabled=True, interval=PROFILE_INTERVAL):
+        """Amostra as pilhas de todas as threads enquanto o bloco executa (resultado em ``self.profiler``)."""
+        if not enabled:
+            yield None
+            return
+        self.profiler = SamplingProfiler(interval)
+        self.profiler.start()
+        try:
+            yield self.profiler
+        finally:
+            self.profiler.stop()
+
+    # ------------------------------
+    # Exportação
+    # ------------------------------
+    def to_prometheus(self, prefix=PROM_PREFIX, labels=None):
+        """Texto no formato de exposição do Prometheus."""
+        s = self.snapshot()
+        rotulos = dict(labels or {})
+
+        def fmt(**extra):
+            todos = {**rotulos, **extra}
+            if not todos:
+                return ""
+            return "{" + ",".join(f'{k}="{v}"' for k, v in sorted(todos.items())) + "}"
+
+        linhas = [f"# TYPE {prefix}_stage_seconds_total counter"]
+        linhas += [f"{prefix}_stage_seconds_total{fmt(stage=n)} {e['total_s']}" for n, e in s["estagios"].items()]
+        linhas.append(f"# TYPE {prefix}_stage_items_total counter")
+        linhas += [f"{prefix}_stage_items_total{fmt(stage=n)} {e['itens']}" for n, e in s["estagios"].items()]
+        linhas.append(f"# TYPE {prefix}_stage_max_seconds gauge")
+        linhas += [f"{prefix}_stage_max_seconds{fmt(stage=n)} {e['max_ms'] / 1000}" for n, e in s["estagios"].items()]
+        linhas.append(f"# TYPE {prefix}_events_total counter")
+        linhas += [f"{prefix}_events_total{fmt(name=n)} {v}" for n, v in s["contadores"].items()]
+        linhas.append(f"# TYPE {prefix}_gauge gauge")
+        linhas += [f"{prefix}_gauge{fmt(name=n)} {m['valor']}" for n, m in s["medidores"].items()]
+        linhas.append(f"# TYPE {prefix}_gauge_max gauge")
+        linhas += [f"{prefix}_gauge_max{fmt(name=n)} {m['max']}" for n, m in s["medidores"].items()]
+        linhas.append(f"# TYPE {prefix}_fps gauge")
+        linhas += [f"{prefix}_fps{fmt(name=n)} {v}" for n, v in s["fps"].items()]
+        return "\n".join(linhas) + "\n"
+
+    def write_jsonl(self, path, **campos):
+        """Acrescenta o ``snapshot`` (com um instante e ``campos`` extras) como uma linha JSON."""
+        with open(path, "a") as f:
+            f.write(json.dumps({"time": time.time(), **campos, **self.snapshot()}) + "\n")
+
+    def export(self, path, **campos):
+        """Grava no formato indicado pela extensão: ``.prom``/``.txt`` (Prometheus) ou JSONL."""
+        if path.endswith((".prom", ".txt")):
+            tmp = path + ".tmp"
+            with open(tmp, "w") as f:
+                f.write(self.to_prometheus(labels=campos))
+            os.replace(tmp, path)
+        else:
+            self.write_jsonl(path, **campos)
+
+
+class _NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class NullInstrumentation:
+    """Instrumentação desativada: mesma interface de ``Instrumentation``, sem custo."""
+
+    enabled = False
+    profiler = None
+    _timer = _NullTimer()
+
+    def observe(self, estagio, segundos, n=1):
+        pass
+
+    def timer(self, estagio, n=1):
+        return self._timer
+
+    def count(self, nome, n=1):
+        pass
+
+    def gauge(self, nome, valor):
+        pass
+
+    def tick(self, nome="frames", n=1):
+        pass
+
+    def fps(self, nome="frames"):
+        return 0.0
+
+    @contextmanager
+    def profiling(self, enabled=True, interval=PROFILE_INTERVAL):
+        yield None
+
+    def snapshot(self):
+        return {}
+
+
+NULL_INSTRUMENTATION = NullInstrumentation()
+
+
+def make(enabled=True, **kwargs):
+    """``Instrumentation`` ativa ou a instância vazia compartilhada."""
+    return Instrumentation(**kwargs) if enabled else NULL_INSTRUMENTATION
+
+
+# =============================================
+# ESTÁGIOS INTERNOS DO MODELO
+# =============================================
+
+class InstrumentedBackend:
+    """
+    Envolve um backend e registra pré-processamento, inferência e pós-processamento.
+
+    Com um ``InferenceBackend`` os tempos vêm de ``Results.speed`` da Ultralytics; com
+    backends sem ``predict`` próprio (ex.: ``TiledBackend``, ``CascadeBackend``) a chamada
+    inteira conta como ``modelo``.
+    Os demais atributos (``names``, ``params``, ``weights``...) vêm do backend envolvido.
+    """
+
+    ESTAGIOS = ("preprocess", "inference", "postprocess")
+
+    def __init__(self, backend, instrumentation):
+        self._backend = backend
+        self.instrumentation = instrumentation
+
+    def detect(self, frames, **kwargs):
+        # Procura na classe: os wrappers delegam atributos e ``predict`` pularia os blocos/cascata
+        if not hasattr(type(self._backend), "predict"):
+            with self.instrumentation.timer("modelo", len(frames)):
+                return self._backend.detect(frames, **kwargs)
+        resultados = self._backend.predict(frames, **kwargs)
+        for estagio in self.ESTAGIOS:
+            total = sum(r.speed[estagio] for r in resultados) / 1000
+            self.instrumentation.observe(f"modelo_{estagio}", total, len(resultados))
+        return [Detections.from_result(r) for r in resultados]
+
+    def __getattr__(self, nome):
+        return getattr(self._backend, nome)
+
+
+# =============================================
+# PROFILER POR AMOSTRAGEM
+# =============================================
+
+class SamplingProfiler:
+    """
+    Amostra periodicamente as pilhas de todas as threads (``sys._current_frames``).
+
+    Não instrumenta as funções: o custo é o da thread de amostragem, e só existe
+    enquanto o profiler está ativo. Conta amostras por função no topo da pilha
+    (tempo próprio) e por função presente na pilha (tempo acumulado).
+
+    Args:
+        interval (float): Intervalo entre amostras (segundos).
+    """
+
+    def __init__(self, interval=PROFILE_INTERVAL):
+        self.interval = interval
+        self.amostras = 0
+        self.pilhas = Counter()     # Pilha completa (tupla de funções, da raiz ao topo) -> amostras
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._loop, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _loop(self):
+        proprio = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == proprio:
+                    continue
+                pilha = []
+                while frame is not None:
+                    codigo = frame.f_code
+                    pilha.append(f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})")
+                    frame = frame.f_back
+                self.pilhas[tuple(reversed(pilha))] += 1
+            self.amostras += 1
+
+    def top(self, n=PROFILE_TOP):
+        """
+        Funções com mais amostras.
+
+        Returns:
+            list[dict]: ``funcao``, fração das amostras no topo da pilha (``proprio``) e
+            em qualquer posição da pilha (``acumulado``).
+        """
+        total = sum(self.pilhas.values()) or 1
+        proprio, acumulado = Counter(), Counter()
+        for pilha, amostras in self.pilhas.items():
+            proprio[pilha[-1]] += amostras
+            for funcao in set(pilha):
+                acumulado[funcao] += amostras
+        return [
+            {"funcao": f, "proprio": round(c / total, 4), "acumulado": round(acumulado[f] / total, 4)}
+            for f, c in proprio.most_common(n)
+        ]
+
+    def write_collapsed(self, path):
+        """Pilhas no formato "collapsed" (``a;b;c amostras``), aceito por flamegraph.pl e speedscope."""
+        with open(path, "w") as f:
+            for pilha, amostras in self.pilhas.most_common():
+                f.write(";".join(pilha) + f" {amostras}\n")
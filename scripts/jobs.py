@@ -0,0 +1,218 @@
+import json
+import os
+import sqlite3
+import time
+import uuid
+from contextlib import contextmanager
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+JOBS_DB = "../jobs/jobs.db"       # Fila de trabalhos compartilhada entre o app e os workers
+UPLOADS_DIR = "../jobs/uploads"   # Entradas enviadas pelo app aguardando processamento
+STALE_SECONDS = 120               # Trabalhos "running" sem atualização há mais tempo voltam para a fila
+WORKER_TIMEOUT = 30               # Worker sem sinal de vida há mais tempo é considerado inativo
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINAL_STATUSES = (DONE, FAILED, CANCELLED)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    input_path TEXT NOT NULL,
+    input_hash TEXT,
+    params TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    result TEXT,
+    error TEXT,
+    cancel_requested INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    updated_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at);
+CREATE TABLE IF NOT EXISTS workers (
+    id TEXT PRIMARY KEY,
+    pid INTEGER,
+    slots INTEGER,
+    last_seen REAL NOT NULL
+);
+"""
+
+
+class JobCancelled(Exception):
+    """Levantada dentro do processamento quando o cancelamento do trabalho é solicitado."""
+
+
+# =============================================
+# FILA DE TRABALHOS EM SQLITE
+# =============================================
+
+class JobQueue:
+    """
+    Fila de trabalhos persistente em SQLite (modo WAL), segura entre processos.
+
+    O app enfileira trabalhos e consulta o estado pelo id; os workers reivindicam os
+    trabalhos de forma atômica (``BEGIN IMMEDIATE``), publicam o progresso e verificam
+    pedidos de cancelamento. Cada chamada abre a própria conexão, então a mesma
+    instância pode ser usada por várias threads.
+
+    Args:
+        path (str): Caminho do banco SQLite.
+    """
+
+    def __init__(self, path=JOBS_DB):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        db.row_factory = sqlite3.Row
+        try:
+            yield db
+        finally:
+            db.close()
+
+    @staticmethod
+    def _job(row):
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    # ------------------------------
+    # Lado do app
+    # ------------------------------
+    def submit(self, kind, input_path, params, input_hash=None):
+        """Enfileira um trabalho e retorna o seu id."""
+        job_id = uuid.uuid4().hex[:12]
+        agora = time.time()
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO jobs (id, kind, status, input_path, input_hash, params, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, QUEUED, input_path, input_hash, json.dumps(params), agora, agora),
+            )
+        return job_id
+
+    def get(self, job_id):
+        with self._connect() as db:
+            return self._job(db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone())
+
+    def list(self, limit=50):
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self._job(r) for r in rows]
+
+    def position(self, job_id):
+        """Quantos trabalhos estão na fila à frente deste."""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND created_at < "
+                "(SELECT created_at FROM jobs WHERE id = ?)", (QUEUED, job_id)).fetchone()
+        return row[0]
+
+    def cancel(self, job_id):
+        """
+        Cancela na hora se ainda estiver na fila; se estiver rodando, pede ao worker que pare.
+
+        Returns:
+            bool: True se o trabalho foi cancelado na hora (nenhum worker chegou a pegá-lo).
+        """
+        agora = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            cur = db.execute("UPDATE jobs SET status = ?, finished_at = ?, updated_at = ? WHERE id = ? AND status = ?",
+                             (CANCELLED, agora, agora, job_id, QUEUED))
+            db.execute("UPDATE jobs SET cancel_requested = 1, updated_at = ? WHERE id = ? AND status = ?",
+                       (agora, job_id, RUNNING))
+            db.execute("COMMIT")
+        return cur.rowcount == 1
+
+    def active_workers(self):
+        """Workers que deram sinal de vida recentemente."""
+        with self._connect() as db:
+            rows = db.execute("SELECT * FROM workers WHERE last_seen >= ?",
+                              (time.time() - WORKER_TIMEOUT,)).fetchall()
+        return [dict(r) for r in rows]
+
+    # ------------------------------
+    # Lado do worker
+    # ------------------------------
+    def heartbeat(self, worker_id, slots):
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO workers (id, pid, slots, last_seen) VALUES (?, ?, ?, ?)",
+                       (worker_id, os.getpid(), slots, time.time()))
+
+    def unregister(self, worker_id):
+        with self._connect() as db:
+            db.execute("DELETE FROM workers WHERE id = ?", (worker_id,))
+
+    def claim(self, worker_id):
+        """Reivindica atomicamente o trabalho mais antigo da fila (ou None)."""
+        agora = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute("SELECT id FROM jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            db.execute("UPDATE jobs SET status = ?, worker = ?, started_at = ?, updated_at = ? WHERE id = ?",
+                       (RUNNING, worker_id, agora, agora, row["id"]))
+            db.execute("COMMIT")
+        return self.get(row["id"])
+
+    def progress(self, job_id, progress):
+        """Publica o progresso (0-1) e retorna True se o cancelamento foi solicitado."""
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET progress = ?, updated_at = ? WHERE id = ?", (progress, time.time(), job_id))
+            row = db.execute("SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return bool(row and row[0])
+
+    def finish(self, job_id, status, result=None, error=None):
+        agora = time.time()
+        with self._connect() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, progress = CASE WHEN ? = ? THEN 1 ELSE progress END, "
+                "finished_at = ?, updated_at = ? WHERE id = ?",
+                (status, json.dumps(result) if result is not None else None, error, status, DONE, agora, agora, job_id),
+            )
+
+    def release(self, job_id):
+        """Devolve à fila um trabalho interrompido pelo encerramento do worker."""
+        with self._connect() as db:
+            db.execute("UPDATE jobs SET status = ?, worker = NULL, progress = 0, updated_at = ? WHERE id = ?",
+                       (QUEUED, time.time(), job_id))
+
+    def requeue_stale(self, stale_seconds=STALE_SECONDS):
+        """
+        Devolve à fila trabalhos órfãos (worker encerrado no meio do processamento).
+
+        Órfãos com cancelamento já solicitado são apenas marcados como cancelados.
+
+        Returns:
+            int: Quantidade de trabalhos devolvidos à fila.
+        """
+        agora = time.time()
+        limite = agora - stale_seconds
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            db.execute("UPDATE jobs SET status = ?, finished_at = ?, updated_at = ? "
+                       "WHERE status = ? AND updated_at < ? AND cancel_requested = 1",
+                       (CANCELLED, agora, agora, RUNNING, limite))
+            cur = db.execute("UPDATE jobs SET status = ?, worker = NULL, progress = 0, updated_at = ? "
+                             "WHERE status = ? AND updated_at < ?",
+                             (QUEUED, agora, RUNNING, limite))
+            db.execute("COMMIT")
+            return cur.rowcount
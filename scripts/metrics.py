@@ -0,0 +1,162 @@
+import os
+
+import numpy as np
+
+from detections import box_iou
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+SMALL_AREA = 32 ** 2   # Objetos pequenos: área < 32x32 px na resolução original (convenção do COCO)
+IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)  # Limiares do mAP@0.5:0.95
+RECALL_POINTS = np.linspace(0, 1, 101)       # Interpolação de 101 pontos do COCO
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+# =============================================
+# RÓTULOS NO FORMATO YOLO
+# =============================================
+
+def dataset_items(images_dir, labels_dir=None):
+    """
+    Pares (imagem, rótulo) de um split no layout do YOLO (``images/`` e ``labels/`` lado a lado).
+
+    Returns:
+        list[tuple[str, str]]: Caminhos ordenados; o rótulo pode não existir (imagem sem objetos).
+    """
+    labels_dir = labels_dir or os.path.join(os.path.dirname(os.path.normpath(images_dir)), "labels")
+    nomes = sorted(n for n in os.listdir(images_dir) if n.lower().endswith(IMAGE_EXTENSIONS))
+    return [(os.path.join(images_dir, n), os.path.join(labels_dir, os.path.splitext(n)[0] + ".txt")) for n in nomes]
+
+
+def load_yolo_labels(label_path, width, height):
+    """
+    Lê um rótulo YOLO (classe cx cy w h normalizados) em pixels.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Caixas (N, 4) xyxy float32 e classes (N,) int32.
+    """
+    if not os.path.exists(label_path) or os.path.getsize(label_path) == 0:
+        return np.zeros((0, 4), np.float32), np.zeros(0, np.int32)
+    dados = np.loadtxt(label_path, ndmin=2, dtype=np.float32)
+    cls = dados[:, 0].astype(np.int32)
+    cxcy = dados[:, 1:3] * (width, height)
+    meia = dados[:, 3:5] * (width, height) / 2
+    return np.concatenate([cxcy - meia, cxcy + meia], axis=1).astype(np.float32), cls
+
+
+# =============================================
+# CORRESPONDÊNCIA ENTRE PREDIÇÕES E RÓTULOS
+# =============================================
+
+def match_detections(detections, gt_xyxy, gt_cls, iou_threshold=0.5):
+    """
+    Associa predições a rótulos da mesma classe, cada rótulo no máximo uma vez.
+
+    Os pares acima do limiar são resolvidos em ordem decrescente de IoU, sem laços
+    em Python (mesma estratégia da validação da Ultralytics).
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Predições verdadeiras (N_pred,) e rótulos encontrados (N_gt,).
+    """
+    tp = np.zeros(len(detections), bool)
+    encontrados = np.zeros(len(gt_cls), bool)
+    if len(detections) == 0 or len(gt_cls) == 0:
+        return tp, encontrados
+    iou = box_iou(detections.xyxy, gt_xyxy)
+    iou[detections.cls[:, None] != gt_cls[None, :]] = 0
+    pares = np.argwhere(iou >= iou_threshold)
+    if len(pares):
+        pares = pares[np.argsort(-iou[pares[:, 0], pares[:, 1]], kind="stable")]
+        pares = pares[np.sort(np.unique(pares[:, 0], return_index=True)[1])]  # Mantém a ordem por IoU
+        pares = pares[np.unique(pares[:, 1], return_index=True)[1]]
+        tp[pares[:, 0]] = True
+        encontrados[pares[:, 1]] = True
+    return tp, encontrados
+
+
+def match_thresholds(detections, gt_xyxy, gt_cls, thresholds=IOU_THRESHOLDS):
+    """
+    ``match_detections`` em vários limiares de IoU.
+
+    Returns:
+        np.ndarray: Predições verdadeiras (N_pred, T) em cada limiar.
+    """
+    tp = np.zeros((len(detections), len(thresholds)), bool)
+    for t, limiar in enumerate(thresholds):
+        tp[:, t] = match_detections(detections, gt_xyxy, gt_cls, limiar)[0]
+    return tp
+
+
+# =============================================
+# PRECISÃO MÉDIA POR CLASSE
+# =============================================
+
+def ap_per_class(tp, conf, pred_cls, n_gt):
+    """
+    Precisão, recall e AP de todas as classes de uma vez, sem laço sobre as classes.
+
+    As predições são ordenadas por classe e confiança; as somas acumuladas de cada
+    classe saem de uma soma global menos o valor no início do segmento da classe. A
+    envoltória de precisão usa um deslocamento por classe em ``maximum.accumulate``; a
+    interpolação de 101 pontos do COCO busca com uma chave inteira (classe, posição do
+    recall), que mantém os segmentos independentes em ``searchsorted`` sem arredondar
+    o recall nos pontos exatos.
+
+    Args:
+        tp (np.ndarray): Predições verdadeiras (N, T) por limiar de IoU.
+        conf (np.ndarray): Confiança das predições (N,).
+        pred_cls (np.ndarray): Classe das predições (N,).
+        n_gt (np.ndarray): Rótulos por classe (C,).
+
+    Returns:
+        dict: ``ap`` (C, T), ``precision``, ``recall``, ``tp`` e ``fp`` (C,) no primeiro limiar
+        considerando todas as predições.
+    """
+    num_classes, num_t = len(n_gt), tp.shape[1]
+    ordem = np.lexsort((-conf, pred_cls))
+    tp, cls = tp[ordem].astype(np.float64), pred_cls[ordem].astype(np.int64)
+    inicio = np.searchsorted(cls, np.arange(num_classes), side="left")
+    fim = np.searchsorted(cls, np.arange(num_classes), side="right")
+
+    # Somas acumuladas dentro de cada classe
+    acumulado = np.cumsum(tp, axis=0)
+    base = np.vstack([np.zeros((1, num_t)), acumulado])[inicio[cls]]
+    tp_classe = acumulado - base
+    rank = (np.arange(len(cls)) - inicio[cls] + 1)[:, None]
+    precisao = tp_classe / rank
+    recall = tp_classe / np.maximum(n_gt[cls], 1)[:, None]
+
+    # Envoltória: máximo da precisão dali até o fim da classe (percorrendo ao contrário)
+    deslocamento = (num_classes - cls)[:, None] * 2.0
+    envoltoria = np.maximum.accumulate((precisao + deslocamento)[::-1], axis=0)[::-1] - deslocamento
+
+    # Precisão interpolada em 101 níveis de recall. A chave é (classe, posição do valor entre
+    # todos os recalls e consultas) em inteiros: busca dentro do segmento de cada classe sem
+    # somar deslocamentos ao recall em ponto flutuante
+    ap = np.zeros((num_classes, num_t))
+    classes_consulta = np.repeat(np.arange(num_classes, dtype=np.int64), len(RECALL_POINTS))
+    for t in range(num_t):
+        niveis = np.unique(np.concatenate([recall[:, t], RECALL_POINTS]))
+        passo = len(niveis)
+        chave = cls * passo + np.searchsorted(niveis, recall[:, t])
+        consultas = classes_consulta * passo + np.tile(np.searchsorted(niveis, RECALL_POINTS), num_classes)
+        idx = np.searchsorted(chave, consultas, side="left").reshape(num_classes, -1)
+        valido = idx < fim[:, None]
+        valores = np.where(valido, envoltoria[np.minimum(idx, max(len(cls) - 1, 0)), t] if len(cls) else 0.0, 0.0)
+        ap[:, t] = valores.mean(axis=1)
+
+    tp_total = np.bincount(cls, weights=tp[:, 0], minlength=num_classes)
+    contagem = (fim - inicio).astype(np.float64)
+    return {
+        "ap": ap,
+        "precision": np.divide(tp_total, contagem, out=np.zeros(num_classes), where=contagem > 0),
+        "recall": np.divide(tp_total, n_gt, out=np.zeros(num_classes), where=n_gt > 0),
+        "tp": tp_total,
+        "fp": contagem - tp_total,
+    }
+
+
+def box_area(xyxy):
+    return (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
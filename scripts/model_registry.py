@@ -0,0 +1,112 @@
+import os
+import threading
+import time
+
+import numpy as np
+
+from backends import load_backend
+
+# =============================================
+# REGISTRO DE MODELOS DO PROCESSO
+# =============================================
+# Os modelos ficam em um dicionário do módulo, que vive enquanto o processo viver:
+# não depende do st.cache_resource (limpo no reset do app) nem das sessões do
+# Streamlit. O launcher serve.py carrega e aquece o modelo assim que o processo
+# sobe, antes da primeira sessão; o app só recebe a instância pronta.
+
+_INICIO = time.perf_counter()   # Referência quando /proc não está disponível
+_modelos = {}
+_tempos = {}
+_primeira_requisicao = {}
+_lock = threading.Lock()           # Serializa as cargas
+_tempos_lock = threading.Lock()    # Protege os tempos, que são lidos durante uma carga
+
+
+def process_age():
+    """Segundos desde o início do processo (pelo /proc no Linux; senão, desde a importação deste módulo)."""
+    try:
+        with open("/proc/self/stat") as f:
+            inicio = int(f.read().rsplit(")", 1)[1].split()[19]) / os.sysconf("SC_CLK_TCK")
+        with open("/proc/uptime") as f:
+            return float(f.read().split()[0]) - inicio
+    except (OSError, ValueError, IndexError):
+        return time.perf_counter() - _INICIO
+
+
+def warm_up(backend, imgsz=None):
+    """Inferência em um frame vazio: inicializa o runtime, aloca os buffers e compila os kernels."""
+    lado = imgsz or backend.params["imgsz"]
+    backend.detect([np.zeros((lado, lado, 3), np.uint8)])
+
+
+def get_model(name=None, weights=None, warmup=True):
+    """
+    Backend carregado (e aquecido) uma única vez por processo.
+
+    Chamadas concorrentes esperam a carga em andamento em vez de carregar o modelo de novo.
+
+    Args:
+        name (str | None): Backend (padrão: o de ``configs/inference.yaml``).
+        weights (str | None): Artefato, sobrescrevendo o configurado.
+        warmup (bool): Roda uma inferência em um frame vazio logo após a carga.
+
+    Returns:
+        InferenceBackend: Backend no frame inteiro (a inferência em blocos é aplicada por quem usa).
+    """
+    chave = (name, weights)
+    with _lock:
+        if chave in _modelos:
+            return _modelos[chave]
+
+        tempos = {"inicio_carga_em_s": round(process_age(), 3)}
+        inicio = time.perf_counter()
+        # As importações pesadas ficam no load_backend (só ao construir o backend) e entram na carga.
+        # A cascata não vale aqui: o app usa predict (ultralytics), que iria direto ao modelo completo
+        backend = load_backend(name, weights=weights, tiling=False, cascade=False)
+        tempos["carga_s"] = round(time.perf_counter() - inicio, 3)
+
+        if warmup:
+            inicio = time.perf_counter()
+            warm_up(backend)
+            tempos["aquecimento_s"] = round(time.perf_counter() - inicio, 3)
+        tempos["pronto_em_s"] = round(process_age(), 3)
+
+        with _tempos_lock:
+            _modelos[chave] = backend
+            _tempos[chave] = tempos
+        print(f"⏱️  Modelo {backend.name} pronto em {tempos['pronto_em_s']:.2f} s desde o início do processo "
+              f"(carga com importações {tempos['carga_s']:.2f} s, "
+              f"aquecimento {tempos.get('aquecimento_s', 0):.2f} s)", flush=True)
+        return backend
+
+
+def preload(name=None, weights=None):
+    """Carrega e aquece o modelo em uma thread, sem bloquear a subida do servidor."""
+    def carrega():
+        try:
+            get_model(name, weights)
+        except Exception as e:
+            # O app tenta de novo (e mostra o erro) na primeira sessão
+            print(f"❌ Falha ao pré-carregar o modelo: {e}", flush=True)
+
+    thread = threading.Thread(target=carrega, name="preload-modelo", daemon=True)
+    thread.start()
+    return thread
+
+
+def record_request(tempo):
+    """Registra a latência da primeira detecção atendida pelo processo (as seguintes são ignoradas)."""
+    with _tempos_lock:
+        if not _primeira_requisicao:
+            _primeira_requisicao["primeira_requisicao_s"] = round(tempo, 3)
+            _primeira_requisicao["primeira_requisicao_em_s"] = round(process_age(), 3)
+
+
+def startup_timings():
+    """Tempos de inicialização do processo (por modelo carregado) e da primeira detecção."""
+    with _tempos_lock:
+        resumo = {"processo_s": round(process_age(), 3), **_primeira_requisicao}
+        for chave, tempos in _tempos.items():
+            modelo = _modelos[chave]
+            resumo[f"{modelo.name}:{modelo.weights}"] = dict(tempos)
+        return resumo
@@ -1,142 +1,430 @@
+import argparse
+import hashlib
+import json
 import os
-import shutil
-import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
 import cv2
 import numpy as np
+import yaml
+
+from result_cache import hash_bytes
 
 # =============================================
-# CONFIGURAÇÕES INICIAIS
+# CONFIGURAÇÕES PADRÃO
 # =============================================
 
-dataset_dir = "/home/vinicius_lazzeri/Documents/detector-veiculos/dataset"  # Caminho raiz do dataset
-train_images_dir = os.path.join(dataset_dir, "train/images")              # Pasta de imagens de treino
-train_labels_dir = os.path.join(dataset_dir, "train/labels")              # Pasta de labels de treino
+DATASET_DIR = "../dataset"            # Raiz do dataset (as imagens novas entram em train/images e train/labels)
+DATA_CONFIG = "../configs/data.yaml"  # Classes do dataset (copiadas para o YAML dos splits)
+SPLIT_CONFIG = "../configs/data_split.yaml"  # YAML gerado, apontando para as listas de cada split
+MANIFEST_NAME = "manifest.jsonl"  # Hash, split e linhagem de cada imagem (memória entre execuções)
+SEED = 42                         # Sal dos hashes que decidem split e aumentos
+
+# Proporções para divisão do dataset (o que sobra após val/test permanece como treino)
+VAL_RATIO = 0.20    # 20% validação
+TEST_RATIO = 0.05   # 5% teste
 
-augmentation_percentage = 0.25  # Percentual de imagens que serão aumentadas artificialmente
+# Fração das imagens de treino que recebe cada tipo de aumento (25% no total)
+AUGMENTATION_RATIOS = {
+    "noise": 0.06,
+    "blur": 0.05,
+    "lighting": 0.06,
+    "flip": 0.04,
+    "jpeg": 0.02,
+    "motion_blur": 0.02,
+}
+
+IMAGE_EXTENSIONS = (".jpg", ".png")
+SPLIT_DIRS = ("train", "valid", "test")  # Pastas do dataset; imagens em valid/ e test/ mantêm o split da pasta
+LEGACY_AUG = re.compile(r"_aug\d+$")     # Aumentadas da versão antiga (tipo desconhecido): "<original>_aug<N>"
+NOISE_SIGMA = 0.1 ** 0.5 * 255  # Desvio do ruído gaussiano (variância 0.1 em escala [0, 1])
 
-# Proporções para divisão do dataset
-train_ratio = 0.75  # 75% treino (não é usado diretamente, pois o que sobra após val/test permanece como treino)
-val_ratio = 0.20    # 20% validação
-test_ratio = 0.05   # 5% teste
 
 # =============================================
-# FUNÇÕES DE AUGMENTATION BÁSICAS
+# FUNÇÕES DE AUGMENTATION
 # =============================================
+# Cada função recebe a imagem e um gerador seedado e retorna a imagem aumentada.
+# Transformações geométricas também ajustam as caixas dos labels (LABEL_TRANSFORMS).
 
-def add_noise(image):
+def add_noise(image, rng):
     """Adiciona ruído gaussiano à imagem para simular baixa qualidade de captura."""
-    row, col, ch = image.shape
-    mean = 0
-    var = 0.1
-    sigma = var ** 0.5
-    gauss = np.random.normal(mean, sigma, (row, col, ch)) * 255
-    noisy = np.clip(image + gauss, 0, 255).astype(np.uint8)
-    return noisy
-
-def add_blur(image):
+    ruido = rng.standard_normal(image.shape, dtype=np.float32)
+    ruido *= NOISE_SIGMA
+    ruido += image
+    return np.clip(ruido, 0, 255, out=ruido).astype(np.uint8)
+
+def add_blur(image, rng):
     """Aplica desfoque gaussiano para simular perda de foco."""
     return cv2.GaussianBlur(image, (5, 5), 0)
 
-def adjust_lighting(image):
+def adjust_lighting(image, rng):
     """Altera brilho e contraste para simular variações de iluminação."""
-    alpha = random.uniform(0.7, 1.3)  # Contraste
-    beta = random.randint(-30, 30)   # Brilho
+    alpha = rng.uniform(0.7, 1.3)      # Contraste
+    beta = int(rng.integers(-30, 31))  # Brilho
     return cv2.convertScaleAbs(image, alpha=alpha, beta=beta)
 
+def horizontal_flip(image, rng):
+    """Espelha a imagem na horizontal (sentido oposto da via)."""
+    return cv2.flip(image, 1)
+
+def jpeg_artifacts(image, rng):
+    """Recomprime com qualidade baixa para simular artefatos de câmeras de trânsito."""
+    qualidade = int(rng.integers(15, 40))
+    _, dados = cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, qualidade])
+    return cv2.imdecode(dados, cv2.IMREAD_COLOR)
+
+def motion_blur(image, rng):
+    """Desfoque linear horizontal para simular veículos em movimento com obturador lento."""
+    tamanho = int(rng.integers(5, 12))
+    kernel = np.zeros((tamanho, tamanho), np.float32)
+    kernel[tamanho // 2, :] = 1.0 / tamanho
+    return cv2.filter2D(image, -1, kernel)
+
+AUGMENTATIONS = {
+    "noise": add_noise,
+    "blur": add_blur,
+    "lighting": adjust_lighting,
+    "flip": horizontal_flip,
+    "jpeg": jpeg_artifacts,
+    "motion_blur": motion_blur,
+}
+
+def flip_labels(linhas):
+    """Espelha as caixas YOLO (cx -> 1 - cx)."""
+    saida = []
+    for linha in linhas:
+        partes = linha.split()
+        if len(partes) >= 5:
+            partes[1] = f"{1 - float(partes[1]):.6f}"
+        saida.append(" ".join(partes))
+    return saida
+
+LABEL_TRANSFORMS = {"flip": flip_labels}
+
+
+# =============================================
+# DECISÕES DERIVADAS DO HASH DO CONTEÚDO
+# =============================================
+# Split e aumentos dependem só do conteúdo da imagem e da semente: a mesma imagem
+# recebe sempre as mesmas decisões, independente da ordem, do nome ou de quantas
+# outras existem. Cópias idênticas caem no mesmo split (sem vazamento entre splits):
+# uma cópia de imagem com split fixo (valid/, test/ ou adotada na migração) herda o dela.
+
+def _unit(*partes):
+    """Número em [0, 1) derivado de um hash estável das partes."""
+    digest = hashlib.blake2b("|".join(map(str, partes)).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") / 2 ** 64
+
+
+def assign_split(content_hash, seed=SEED, val_ratio=VAL_RATIO, test_ratio=TEST_RATIO):
+    u = _unit("split", seed, content_hash)
+    if u < val_ratio:
+        return "valid"
+    if u < val_ratio + test_ratio:
+        return "test"
+    return "train"
+
+
+def choose_augmentations(content_hash, seed=SEED, ratios=AUGMENTATION_RATIOS):
+    """Tipos de aumento sorteados para uma imagem de treino, com a semente de cada um."""
+    escolhidos = []
+    for tipo, ratio in ratios.items():
+        if tipo not in AUGMENTATIONS:
+            raise ValueError(f"Aumento desconhecido: {tipo} (opções: {', '.join(AUGMENTATIONS)})")
+        if _unit("aug", seed, tipo, content_hash) < ratio:
+            escolhidos.append((tipo, int(_unit("rng", seed, tipo, content_hash) * 2 ** 63)))
+    return escolhidos
+
+
+# =============================================
+# MANIFESTO
+# =============================================
+
+def list_originals(images_dir):
+    """Imagens originais (sem sufixo "_aug"), em ordem estável."""
+    if not os.path.isdir(images_dir):
+        return []
+    return sorted(f for f in os.listdir(images_dir) if f.endswith(IMAGE_EXTENSIONS) and "_aug" not in f)
+
+
+def list_legacy(images_dir):
+    """Aumentadas geradas pela versão antiga do organizador (``<original>_aug<N>``)."""
+    if not os.path.isdir(images_dir):
+        return []
+    return sorted(f for f in os.listdir(images_dir)
+                  if f.endswith(IMAGE_EXTENSIONS) and LEGACY_AUG.search(os.path.splitext(f)[0]))
+
+
+def load_manifest(dataset_dir):
+    """Entradas do manifesto por nome de imagem (vazio na primeira execução)."""
+    caminho = os.path.join(dataset_dir, MANIFEST_NAME)
+    if not os.path.exists(caminho):
+        return {}
+    with open(caminho) as f:
+        return {e["image"]: e for e in map(json.loads, filter(str.strip, f))}
+
+
+def write_split_files(dataset_dir, entradas, data_config=DATA_CONFIG, split_config=SPLIT_CONFIG):
+    """Grava o manifesto, as listas de cada split e o YAML que aponta para elas."""
+    caminho = os.path.join(dataset_dir, MANIFEST_NAME)
+    with open(caminho + ".tmp", "w") as f:
+        f.writelines(json.dumps(e) + "\n" for e in entradas)
+    os.replace(caminho + ".tmp", caminho)
+
+    listas = {}
+    for split in ("train", "valid", "test"):
+        caminho = os.path.join(dataset_dir, f"{split}.txt")
+        with open(caminho, "w") as f:
+            # Caminhos iniciados por "./" são resolvidos pelo YOLO a partir da pasta da lista
+            f.writelines(f"./{e.get('dir', 'train')}/images/{e['image']}\n" for e in entradas if e["split"] == split)
+        listas[split] = os.path.abspath(caminho)
+
+    with open(data_config) as f:
+        config = yaml.safe_load(f)
+    config.update(path=os.path.abspath(dataset_dir), train=listas["train"], val=listas["valid"], test=listas["test"])
+    with open(split_config, "w") as f:
+        yaml.safe_dump(config, f, sort_keys=False, allow_unicode=True)
+
+
+def _remove_files(images_dir, labels_dir, image_name):
+    base_name = os.path.splitext(image_name)[0]
+    for caminho in (os.path.join(images_dir, image_name), os.path.join(labels_dir, f"{base_name}.txt")):
+        if os.path.exists(caminho):
+            os.unlink(caminho)
+
+
+# =============================================
+# TRABALHADORES
+# =============================================
+
+def _init_worker():
+    # Um processo por núcleo: as operações do OpenCV não precisam de threads próprias
+    cv2.setNumThreads(1)
+
+
+def augment_one(images_dir, labels_dir, img_file, img, content_hash, tipo, seed):
+    """
+    Gera uma imagem aumentada (e o label correspondente) a partir da imagem já decodificada.
+
+    Somente a transformação sorteada é calculada. O nome de saída é determinístico,
+    então executar de novo sobrescreve os mesmos arquivos.
+
+    Returns:
+        dict: Entrada do manifesto, com a linhagem (origem, tipo e semente).
+    """
+    base_name = os.path.splitext(img_file)[0]
+    aug_img = AUGMENTATIONS[tipo](img, np.random.default_rng(seed))
+    aug_name = f"{base_name}_aug-{tipo}.jpg"
+    _, dados = cv2.imencode(".jpg", aug_img)
+    dados = dados.tobytes()
+    with open(os.path.join(images_dir, aug_name), "wb") as f:
+        f.write(dados)
+
+    label_path = os.path.join(labels_dir, f"{base_name}.txt")
+    if os.path.exists(label_path):
+        with open(label_path) as f:
+            linhas = f.read().splitlines()
+        if tipo in LABEL_TRANSFORMS:
+            linhas = LABEL_TRANSFORMS[tipo](linhas)
+        with open(os.path.join(labels_dir, f"{base_name}_aug-{tipo}.txt"), "w") as f:
+            f.write("\n".join(linhas) + ("\n" if linhas else ""))
+
+    return {"image": aug_name, "hash": hash_bytes(dados), "split": "train", "source": img_file,
+            "source_hash": content_hash, "augmentation": tipo, "seed": seed}
+
+
+def process_one(dataset_dir, pasta, img_file, settings, split=None):
+    """
+    Processa uma imagem original nova ou alterada: hash, split e aumentos.
+
+    Os bytes são lidos uma única vez, para o hash e para a decodificação. Toda original
+    é decodificada (não só as sorteadas para aumento), para que uma imagem corrompida
+    seja registrada no manifesto com ``error`` e fique fora das listas.
+
+    Args:
+        pasta (str): Pasta do dataset onde a imagem está (``train``, ``valid`` ou ``test``).
+        split (str | None): Split fixo (o da pasta); None reusa o de uma cópia idêntica já
+            conhecida (``settings["known"]``) ou sorteia pelo hash.
+
+    Returns:
+        list[dict]: Entrada da original seguida das aumentadas.
+    """
+    images_dir = os.path.join(dataset_dir, pasta, "images")
+    labels_dir = os.path.join(dataset_dir, pasta, "labels")
+    caminho = os.path.join(images_dir, img_file)
+    st = os.stat(caminho)
+    with open(caminho, "rb") as f:
+        dados = f.read()
+    content_hash = hash_bytes(dados)
+    entrada = {"image": img_file, "dir": pasta, "hash": content_hash, "split": split, "source": None,
+               "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    img = cv2.imdecode(np.frombuffer(dados, np.uint8), cv2.IMREAD_COLOR) if dados else None  # Vazio levanta erro
+    if img is None:
+        return [{**entrada, "split": None, "error": "imagem ilegível"}]
+    if split is None:
+        # Cópia de uma imagem com split fixo (ou já decidido) fica no mesmo split que ela
+        entrada["split"] = settings["known"].get(content_hash) or assign_split(
+            content_hash, settings["seed"], settings["val_ratio"], settings["test_ratio"])
+    else:
+        entrada["fixed_split"] = True
+    entradas = [entrada]
+    if entrada["split"] != "train":
+        return entradas  # Aumentos só no treino
+
+    for tipo, seed in choose_augmentations(content_hash, settings["seed"], settings["ratios"]):
+        entradas.append({**augment_one(images_dir, labels_dir, img_file, img, content_hash, tipo, seed), "dir": pasta})
+    return entradas
+
+
+def _process_chunk(dataset_dir, tarefas, settings):
+    return [e for pasta, f, split in tarefas for e in process_one(dataset_dir, pasta, f, settings, split)]
+
+
+def known_splits(entradas):
+    """Split de cada hash de original já decidido; o split fixo (da pasta) prevalece."""
+    originais = [e for e in entradas if e.get("source") is None and e.get("hash") and e["split"] in SPLIT_DIRS]
+    known = {e["hash"]: e["split"] for e in originais if not e.get("fixed_split")}
+    known.update((e["hash"], e["split"]) for e in originais if e.get("fixed_split"))
+    return known
+
+
 # =============================================
 # FUNÇÃO PRINCIPAL: PROCESSA E DIVIDE O DATASET
 # =============================================
 
-def process_and_split():
-    # Lista imagens originais (sem sufixo "_aug")
-    original_images = [f for f in os.listdir(train_images_dir) if f.endswith((".jpg", ".png")) and "_aug" not in f]
-    num_original = len(original_images)
-    print(f"📊 Imagens originais: {num_original}")
-
-    # Define quantas imagens serão aumentadas
-    num_augment = int(augmentation_percentage * num_original)
-    augmented_count = 0
-
-    # Aplica aumentos artificiais em imagens selecionadas aleatoriamente
-    for img_file in random.sample(original_images, num_augment):
-        base_name = os.path.splitext(img_file)[0]
-        img_path = os.path.join(train_images_dir, img_file)
-        label_path = os.path.join(train_labels_dir, f"{base_name}.txt")
-
-        img = cv2.imread(img_path)
-        if img is None:
-            continue
-
-        # Seleciona aleatoriamente um tipo de aumento
-        aug_img = random.choice([
-            add_noise(img),
-            add_blur(img),
-            adjust_lighting(img)
-        ])
-
-        # Salva imagem aumentada
-        aug_name = f"{base_name}_aug{augmented_count}.jpg"
-        cv2.imwrite(os.path.join(train_images_dir, aug_name), aug_img)
-
-        # Copia o label correspondente (se existir)
-        if os.path.exists(label_path):
-            shutil.copy(label_path, os.path.join(train_labels_dir, f"{base_name}_aug{augmented_count}.txt"))
-
-        augmented_count += 1
-
-    print(f"🔧 Imagens aumentadas: {augmented_count}")
-
-    # Reagrupa todas as imagens após aumento
-    all_images = [f for f in os.listdir(train_images_dir) if f.endswith((".jpg", ".png"))]
-    random.shuffle(all_images)
-
-    # Define quantidade de imagens para validação e teste
-    total_images = len(all_images)
-    num_val = int(val_ratio * total_images)
-    num_test = int(test_ratio * total_images)
-    num_train = total_images - num_val - num_test  # Resto permanece no treino
-
-    # Cria pastas para conjuntos de validação e teste
-    splits = {
-        "val": os.path.join(dataset_dir, "valid"),
-        "test": os.path.join(dataset_dir, "test"),
-    }
-    for split in splits.values():
-        os.makedirs(os.path.join(split, "images"), exist_ok=True)
-        os.makedirs(os.path.join(split, "labels"), exist_ok=True)
-
-    # Move as imagens e labels selecionadas para val/test
-    for i, img_file in enumerate(all_images):
-        base_name = os.path.splitext(img_file)[0]
-        img_path = os.path.join(train_images_dir, img_file)
-        label_path = os.path.join(train_labels_dir, f"{base_name}.txt")
-
-        if i < num_val:
-            split = "val"
-        elif i < num_val + num_test:
-            split = "test"
-        else:
-            continue  # Mantém no treino
-
-        # Move imagem para pasta correspondente
-        shutil.move(img_path, os.path.join(splits[split], "images", img_file))
-        # Move label (se existir)
-        if os.path.exists(label_path):
-            shutil.move(label_path, os.path.join(splits[split], "labels", f"{base_name}.txt"))
+def process_and_split(dataset_dir=DATASET_DIR, ratios=AUGMENTATION_RATIOS, seed=SEED, workers=None,
+                      val_ratio=VAL_RATIO, test_ratio=TEST_RATIO, split_config=SPLIT_CONFIG, rebuild=False,
+                      purge_legacy=False):
+    """
+    Atualiza o dataset de forma incremental a partir do manifesto.
 
-    # Exibe estatísticas finais da divisão
-    total_train_final = len(os.listdir(train_images_dir))
-    total_val_final = len(os.listdir(os.path.join(splits["val"], "images")))
-    total_test_final = len(os.listdir(os.path.join(splits["test"], "images")))
+    Só as originais novas ou alteradas (tamanho ou data diferentes do manifesto) são
+    lidas, com hash, split e aumentos decididos; as demais mantêm as decisões gravadas.
+    Originais removidas levam junto as suas aumentadas.
+
+    As imagens em ``valid/`` e ``test/`` mantêm o split da pasta. Na primeira execução
+    sobre um dataset já dividido pela versão antiga (sem manifesto e com imagens em
+    ``valid/`` ou ``test/``), as originais de ``train/`` também são adotadas como treino,
+    em vez de serem divididas de novo. As aumentadas antigas (``_aug<N>``, de tipo
+    desconhecido) ficam fora das listas: registradas no manifesto ou, com
+    ``purge_legacy``, apagadas.
+    """
+    inicio = time.perf_counter()
+    manifesto = load_manifest(dataset_dir)
+    originais = {pasta: list_originals(os.path.join(dataset_dir, pasta, "images")) for pasta in SPLIT_DIRS}
+    presentes = {f for arquivos in originais.values() for f in arquivos}
+    # Migração do layout antigo: o treino atual já é o que sobrou da divisão anterior
+    migracao = not manifesto and bool(originais["valid"] or originais["test"])
+
+    # Aumentadas antigas: refeitas a cada execução a partir do disco
+    manifesto = {f: e for f, e in manifesto.items() if not e.get("legacy")}
+    legado, apagadas = [], 0
+    for pasta in SPLIT_DIRS:
+        for nome in list_legacy(os.path.join(dataset_dir, pasta, "images")):
+            if purge_legacy:
+                _remove_files(os.path.join(dataset_dir, pasta, "images"), os.path.join(dataset_dir, pasta, "labels"), nome)
+                apagadas += 1
+            else:
+                origem = LEGACY_AUG.sub("", os.path.splitext(nome)[0])
+                legado.append({"image": nome, "dir": pasta, "split": None, "source": None, "legacy": True,
+                               "legacy_source": origem})
+
+    # Novas ou alteradas; as demais são reconhecidas pelo tamanho e data de modificação
+    pendentes = []
+    for pasta, arquivos in originais.items():
+        for img_file in arquivos:
+            registro = manifesto.get(img_file)
+            st = os.stat(os.path.join(dataset_dir, pasta, "images", img_file))
+            if (rebuild or registro is None or registro.get("dir", "train") != pasta
+                    or registro.get("size") != st.st_size or registro.get("mtime_ns") != st.st_mtime_ns):
+                # Split da pasta em valid/test; em train, mantém o adotado na migração
+                fixo = pasta != "train" or migracao or bool(registro and registro.get("fixed_split"))
+                pendentes.append((pasta, img_file, pasta if fixo else None))
 
+    # Entradas a descartar: originais removidas/alteradas e as aumentadas derivadas delas
+    descartar = {f for f, e in manifesto.items() if e.get("source") is None and f not in presentes}
+    descartar.update(f for _, f, _ in pendentes if f in manifesto)
+    removidas = sum(1 for f in descartar if f not in presentes)
+    for nome, e in list(manifesto.items()):
+        if nome in descartar or e.get("source") in descartar:
+            if e.get("source") is not None:
+                pasta = e.get("dir", "train")
+                _remove_files(os.path.join(dataset_dir, pasta, "images"), os.path.join(dataset_dir, pasta, "labels"), nome)
+            del manifesto[nome]
+    print(f"📊 Imagens originais: {len(presentes)} (train {len(originais['train'])}, valid {len(originais['valid'])}, "
+          f"test {len(originais['test'])}) | novas ou alteradas: {len(pendentes)} | removidas: {removidas}")
+    if migracao:
+        print("📦 Dataset já dividido pela versão antiga: as imagens de train/, valid/ e test/ mantêm o split atual")
+    if legado:
+        print(f"🗑️  Aumentadas antigas (_aug<N>): {len(legado)} registradas no manifesto, fora das listas "
+              "(--purge-legacy apaga)")
+    if apagadas:
+        print(f"🗑️  Aumentadas antigas (_aug<N>) apagadas: {apagadas}")
+
+    # Hash, split e aumentos das pendentes em paralelo, em blocos de arquivos por processo.
+    # As de split fixo vão primeiro: as demais reusam o split de uma cópia idêntica a elas
+    if pendentes:
+        settings = {"seed": seed, "ratios": ratios, "val_ratio": val_ratio, "test_ratio": test_ratio}
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+            for fixo in (True, False):
+                etapa = [t for t in pendentes if (t[2] is not None) == fixo]
+                if not etapa:
+                    continue
+                settings["known"] = known_splits(manifesto.values())
+                tamanho = max(1, -(-len(etapa) // (workers * 4)))
+                blocos = [etapa[i:i + tamanho] for i in range(0, len(etapa), tamanho)]
+                for resultado in pool.map(_process_chunk, [dataset_dir] * len(blocos), blocos,
+                                          [settings] * len(blocos)):
+                    manifesto.update((e["image"], e) for e in resultado)
+
+    processadas = {f for _, f, _ in pendentes}
+    ilegiveis = [nome for nome in processadas if manifesto[nome].get("error")]
+    if ilegiveis:
+        print(f"⚠️  Imagens ilegíveis (registradas com erro, fora das listas): {len(ilegiveis)}, ex.: {sorted(ilegiveis)[0]}")
+    manifesto.update((e["image"], e) for e in legado)
+    entradas = [manifesto[nome] for nome in sorted(manifesto)]
+    novas_aug = sum(1 for e in entradas if e.get("source") in processadas)
+    print(f"🔧 Imagens aumentadas nesta execução: {novas_aug}")
+
+    write_split_files(dataset_dir, entradas, split_config=split_config)
+
+    # Exibe estatísticas finais da divisão
+    total_images = sum(1 for e in entradas if e["split"] in SPLIT_DIRS)
+    contagem = {s: sum(1 for e in entradas if e["split"] == s) for s in ("train", "valid", "test")}
     print("\n✅ DIVISÃO FINALIZADA:")
-    print(f"Train: {total_train_final} imagens ({total_train_final / total_images * 100:.1f}%)")
-    print(f"Valid: {total_val_final} imagens ({total_val_final / total_images * 100:.1f}%)")
-    print(f"Test:  {total_test_final} imagens ({total_test_final / total_images * 100:.1f}%)")
+    print(f"Train: {contagem['train']} imagens ({contagem['train'] / max(total_images, 1) * 100:.1f}%)")
+    print(f"Valid: {contagem['valid']} imagens ({contagem['valid'] / max(total_images, 1) * 100:.1f}%)")
+    print(f"Test:  {contagem['test']} imagens ({contagem['test'] / max(total_images, 1) * 100:.1f}%)")
+    print(f"⏱️  {time.perf_counter() - inicio:.1f} s | manifesto: {os.path.join(dataset_dir, MANIFEST_NAME)} | "
+          f"config: {split_config}")
+
 
 # =============================================
 # EXECUÇÃO DIRETA DO SCRIPT
 # =============================================
 if __name__ == "__main__":
+    def ratio_arg(valor):
+        nome, _, ratio = valor.partition("=")
+        return nome, float(ratio)
+
+    parser = argparse.ArgumentParser(description="Aumenta e divide o dataset em train/valid/test (incremental).")
+    parser.add_argument("--dataset", default=DATASET_DIR)
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--workers", type=int, default=None, help="Processos trabalhadores (padrão: núcleos da CPU)")
+    parser.add_argument("--aug", type=ratio_arg, action="append", default=[], metavar="TIPO=FRAÇÃO",
+                        help=f"Sobrescreve a fração de um aumento ({', '.join(AUGMENTATIONS)}); 0 desativa")
+    parser.add_argument("--val", type=float, default=VAL_RATIO)
+    parser.add_argument("--test", type=float, default=TEST_RATIO)
+    parser.add_argument("--split-config", default=SPLIT_CONFIG, help="YAML gerado para o treino")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="Ignora o manifesto e decide tudo de novo (necessário ao mudar semente ou frações)")
+    parser.add_argument("--purge-legacy", action="store_true",
+                        help="Apaga as aumentadas da versão antiga (_aug<N>) em vez de só registrá-las")
+    args = parser.parse_args()
+
     print("=== PROCESSANDO DATASET ===")
-    process_and_split()
+    process_and_split(args.dataset, {**AUGMENTATION_RATIOS, **dict(args.aug)}, args.seed, args.workers,
+                      args.val, args.test, args.split_config, args.rebuild, args.purge_legacy)
@@ -1,12 +1,22 @@
 import os
 import random
-from ultralytics import YOLO
+import cv2
+import numpy as np
+from backends import load_backend
+from detections import draw_detections
+import result_cache
+import sinks
 
-# Carrega o modelo YOLO treinado (melhor versão salva durante o treinamento)
-model = YOLO("/home/vinicius_lazzeri/Documents/detector-veiculos/scripts/runs/detect/train/weights/best.pt")
+# Carrega o modelo treinado no backend definido em configs/inference.yaml
+backend = load_backend()
+
+# Cache em disco: imagens já processadas com os mesmos pesos e parâmetros não passam de novo pelo modelo
+cache = result_cache.DetectionCache()
 
 # Define o caminho para o diretório de imagens de teste
 test_img_dir = "../dataset/test/images"
+output_dir = "runs/detect/predict"  # Pasta onde as imagens anotadas são salvas
+os.makedirs(output_dir, exist_ok=True)
 
 # Lista todas as imagens com extensões suportadas (.jpg ou .png)
 all_images = [f for f in os.listdir(test_img_dir) if f.endswith(('.jpg', '.png'))]
@@ -15,10 +25,24 @@ all_images = [f for f in os.listdir(test_img_dir) if f.endswith(('.jpg', '.png')
 selected_images = random.sample(all_images, 12)
 selected_paths = [os.path.join(test_img_dir, f) for f in selected_images]
 
-# Realiza a inferência com o modelo YOLO nas imagens selecionadas
-results = model.predict(
-    source=selected_paths,  # Lista de caminhos para as imagens selecionadas
+# Lê cada arquivo uma única vez: os bytes servem para o hash do cache e para a decodificação
+raw_bytes = [open(p, "rb").read() for p in selected_paths]
+images = [cv2.imdecode(np.frombuffer(b, np.uint8), cv2.IMREAD_COLOR) for b in raw_bytes]
+
+# Realiza a inferência (somente nas imagens que não estão no cache)
+detections, hits = result_cache.detect_images(
+    cache,
+    backend,
+    images,
+    [result_cache.hash_bytes(b) for b in raw_bytes],
     conf=0.5,                # Threshold de confiança mínima para considerar uma detecção válida
-    save=True,               # Salva as imagens com as predições (bounding boxes, scores etc.)
-    show=False               # Define se as imagens devem ser exibidas na tela (False = não exibe)
 )
+
+# Salva as imagens com as predições (bounding boxes, scores etc.) e as detecções em JSONL, ao lado delas
+with sinks.open_sink(os.path.join(output_dir, "detections.jsonl"), backend.names) as sink:
+    for name, path, image, dets in zip(selected_images, selected_paths, images, detections):
+        cv2.imwrite(os.path.join(output_dir, name), draw_detections(image, dets, backend.names))
+        sink.write(dets, source=path)
+
+print(f"🖼️  {len(images)} imagens salvas em {output_dir} | cache: {hits} acertos, {len(images) - hits} inferências")
+print(f"🗄️  {cache.stats()}")
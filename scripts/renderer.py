@@ -0,0 +1,145 @@
+import cv2
+import numpy as np
+
+from detections import PALETTE
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.5
+BOX_THICKNESS = 2
+TEXT_COLOR = (255, 255, 255)
+GLYPH_CHARS = "0123456789.# -"   # Caracteres dos rótulos variáveis (confiança e id da trilha)
+LABEL_CACHE_SIZE = 4096          # Rótulos (classe + confiança) e prefixos de trilha mantidos prontos
+
+
+# =============================================
+# RENDERIZADOR DE ANOTAÇÕES
+# =============================================
+
+class Renderer:
+    """
+    Desenha caixas e rótulos no próprio buffer do frame, na ordem de cores BGR.
+
+    Os rótulos são montados a partir de blocos pré-renderizados: o nome de cada classe
+    e os caracteres de ``GLYPH_CHARS`` são desenhados uma única vez, já sobre a cor da
+    classe. Desenhar um rótulo é então copiar esses blocos para o frame (atribuição de
+    fatias), sem ``getTextSize``/``putText`` por detecção. Os rótulos "classe +
+    confiança" e os prefixos "#id" de cada trilha também ficam prontos depois da
+    primeira vez (só há 100 confianças, e as trilhas persistem por muitos frames).
+
+    Como o frame nunca muda de ordem de cores entre a decodificação e a codificação,
+    nenhuma conversão é necessária: quem exibe no Streamlit usa ``channels="BGR"``.
+
+    Args:
+        names (dict | list): Nomes das classes indexados pelo id.
+        draw (bool): False ativa o modo somente dados: ``draw`` devolve o frame intacto.
+        font_scale (float): Escala da fonte dos rótulos.
+        thickness (int): Espessura das caixas.
+    """
+
+    def __init__(self, names, draw=True, font_scale=FONT_SCALE, thickness=BOX_THICKNESS):
+        self.names = names
+        self.enabled = draw
+        self.font_scale = font_scale
+        self.thickness = thickness
+
+        (_, th), base = cv2.getTextSize("Ag", FONT, font_scale, 1)
+        self.altura = th + 2 * base           # Altura da faixa do rótulo
+        self._linha_base = th + base          # Linha de base do texto dentro da faixa
+        numero_classes = len(names)
+        self._cores = [PALETTE[c % len(PALETTE)] for c in range(numero_classes)]
+        self._glifos = [{ch: self._render(ch, cor) for ch in GLYPH_CHARS} for cor in self._cores]
+        self._nomes = [self._render(f"{names[c]} ", cor, margem=2) for c, cor in enumerate(self._cores)]
+        self._margem = [np.empty((self.altura, 2, 3), np.uint8) for _ in self._cores]
+        for bloco, cor in zip(self._margem, self._cores):
+            bloco[:] = cor
+        self._rotulos = {}
+        self._prefixos = {}
+
+    def _render(self, texto, cor, margem=0):
+        """Bloco BGR com ``texto`` em branco sobre a cor da classe (``margem`` px à esquerda)."""
+        (largura, _), _ = cv2.getTextSize(texto, FONT, self.font_scale, 1)
+        bloco = np.empty((self.altura, largura + margem, 3), np.uint8)
+        bloco[:] = cor
+        cv2.putText(bloco, texto, (margem, self._linha_base), FONT, self.font_scale, TEXT_COLOR, 1, cv2.LINE_AA)
+        return bloco
+
+    def _texto(self, texto, c):
+        return [self._glifos[c][ch] for ch in texto]
+
+    def label(self, c, conf):
+        """Bloco pronto do rótulo "classe confiança" (montado uma única vez por par)."""
+        chave = (c, int(round(conf * 100)))
+        bloco = self._rotulos.get(chave)
+        if bloco is None:
+            bloco = np.hstack([self._nomes[c], *self._texto(f"{chave[1] / 100:.2f}", c), self._margem[c]])
+            if len(self._rotulos) >= LABEL_CACHE_SIZE:
+                self._rotulos.clear()
+            self._rotulos[chave] = bloco
+        return bloco
+
+    def prefix(self, c, track_id):
+        """Bloco pronto do prefixo "#id " de uma trilha."""
+        chave = (c, track_id)
+        bloco = self._prefixos.get(chave)
+        if bloco is None:
+            bloco = np.hstack([self._margem[c], *self._texto(f"#{track_id} ", c)])
+            if len(self._prefixos) >= LABEL_CACHE_SIZE:
+                self._prefixos.clear()
+            self._prefixos[chave] = bloco
+        return bloco
+
+    @staticmethod
+    def _blit(frame, bloco, x, y):
+        """Copia ``bloco`` para o frame em (x, y), recortando o que sair da imagem."""
+        h, w = frame.shape[:2]
+        if x >= w or y >= h:
+            return 0
+        largura = min(bloco.shape[1], w - x)
+        altura = min(bloco.shape[0], h - y)
+        frame[y:y + altura, x:x + largura] = bloco[:altura, :largura]
+        return largura
+
+    def draw(self, frame, detections):
+        """
+        Anota ``frame`` (BGR) no próprio buffer e o retorna.
+
+        Args:
+            frame (np.ndarray): Imagem BGR contígua e gravável.
+            detections (Detections): Detecções do frame.
+        """
+        if not self.enabled or len(detections) == 0:
+            return frame
+        h, w = frame.shape[:2]
+        caixas = np.clip(detections.xyxy, 0, [w - 1, h - 1, w - 1, h - 1]).astype(np.int32).tolist()
+        classes = detections.cls.tolist()
+        confs = detections.conf.tolist()
+        track_ids = detections.track_id.tolist() if detections.track_id is not None else [-1] * len(classes)
+
+        for (x1, y1, x2, y2), c, p, tid in zip(caixas, classes, confs, track_ids):
+            c = c % len(self._cores)
+            # Caixas alinhadas aos eixos: o antisserrilhado não muda o traço e custa mais
+            cv2.rectangle(frame, (x1, y1), (x2, y2), self._cores[c], self.thickness, cv2.LINE_8)
+
+            # Faixa do rótulo acima da caixa, ou dentro dela quando não cabe acima
+            y = y1 - self.altura if y1 - self.altura >= 0 else y1
+            x = x1
+            if tid >= 0:
+                x += self._blit(frame, self.prefix(c, tid), x, y)
+            self._blit(frame, self.label(c, p), x, y)
+        return frame
+
+
+_renderers = {}
+
+
+def get_renderer(names, draw=True):
+    """Renderizador compartilhado para um conjunto de nomes de classes (os blocos são montados uma vez)."""
+    chave = (tuple(names.values()) if isinstance(names, dict) else tuple(names), draw)
+    renderer = _renderers.get(chave)
+    if renderer is None:
+        renderer = _renderers[chave] = Renderer(names, draw=draw)
+    return renderer
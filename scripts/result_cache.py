@@ -0,0 +1,422 @@
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import Counter
+from multiprocessing import util as mp_util
+
+import numpy as np
+
+from detections import Detections
+
+try:
+    import fcntl  # Trava de arquivo para as estatísticas compartilhadas entre processos (POSIX)
+except ImportError:
+    fcntl = None
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+CACHE_DIR = "../cache/detections"          # Diretório do cache em disco
+CACHE_MAX_BYTES = 2 * 1024 ** 3            # Tamanho máximo antes da remoção LRU (2 GB)
+CACHE_CONF_FLOOR = 0.1                     # Confiança usada na inferência; limiares maiores são aplicados na leitura
+                                           # (exceto com a união WBF dos blocos, ver conf_floor)
+HASH_CHUNK = 1024 * 1024                   # Leitura em blocos de 1 MB para calcular o hash dos arquivos
+STATS_FILE = "stats.json"
+RESYNC_EVERY = 256                         # Gravações entre recontagens do tamanho em disco (outros processos também gravam)
+EVICT_TARGET = 0.9                         # Fração do limite que resta depois de uma remoção LRU
+STATS_FLUSH_EVERY = 64                     # Eventos acumulados em memória antes de atualizar o arquivo de estatísticas
+STATS_FLUSH_INTERVAL = 5.0                 # ... ou segundos desde a última atualização
+
+
+# =============================================
+# HASH DE CONTEÚDO
+# =============================================
+
+def hash_bytes(data):
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def hash_file(path):
+    """Hash do conteúdo de um arquivo (ou de todos os arquivos de uma pasta, como os modelos OpenVINO)."""
+    h = hashlib.blake2b(digest_size=20)
+    arquivos = [path]
+    if os.path.isdir(path):
+        arquivos = sorted(os.path.join(raiz, n) for raiz, _, nomes in os.walk(path) for n in nomes)
+    for arquivo in arquivos:
+        with open(arquivo, "rb") as f:
+            while bloco := f.read(HASH_CHUNK):
+                h.update(bloco)
+    return h.hexdigest()
+
+
+_weights_hashes = {}
+
+
+def weights_hash(path):
+    """Hash dos pesos, memorizado por caminho, tamanho e data de modificação."""
+    st = os.stat(path)
+    chave = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if chave not in _weights_hashes:
+        _weights_hashes[chave] = hash_file(path)
+    return _weights_hashes[chave]
+
+
+def conf_floor(conf, backend=None):
+    """
+    Confiança usada na inferência armazenada no cache.
+
+    Como o NMS só suprime caixas por outras de confiança maior, filtrar depois por um
+    limiar maior dá o mesmo resultado de inferir com ele. Assim, mudar o limiar de
+    exibição acima do piso reaproveita a mesma entrada do cache.
+
+    Com a inferência em blocos unida por WBF isso não vale: as caixas de confiança baixa
+    entram na média das coordenadas fundidas. Nesse caso a inferência usa o próprio
+    ``conf``, que entra na chave (a união já faz parte do nome do ``TiledBackend``).
+    """
+    if getattr(backend, "merge", None) == "wbf":
+        return conf
+    return min(conf, CACHE_CONF_FLOOR)
+
+
+def cache_key(input_hash, backend, **params):
+    """
+    Chave do cache: hash da entrada, hash dos pesos, backend e parâmetros de inferência.
+
+    Args:
+        input_hash (str): Hash do conteúdo da imagem/vídeo.
+        backend (InferenceBackend): Backend usado (nome e pesos entram na chave).
+        **params: Parâmetros que alteram a saída (conf, iou, imgsz, stride...).
+    """
+    dados = {
+        "input": input_hash,
+        "weights": weights_hash(backend.weights),
+        "backend": backend.name,
+        "params": {k: params[k] for k in sorted(params)},
+    }
+    return hashlib.sha256(json.dumps(dados, sort_keys=True).encode()).hexdigest()
+
+
+# =============================================
+# CACHE EM DISCO
+# =============================================
+
+class DetectionCache:
+    """
+    Cache de detecções endereçado por conteúdo, com remoção LRU por tamanho.
+
+    Cada entrada é um ``.npz`` compactado em formato colunar: as caixas de todos os
+    frames ficam concatenadas (``xyxy``, ``conf``, ``cls``) e ``offsets`` delimita as
+    caixas de cada frame listado em ``indices``. O acesso atualiza a data de
+    modificação do arquivo, que serve de ordem para a remoção LRU.
+
+    O tamanho ocupado é mantido como um total corrente: o diretório só é percorrido na
+    primeira gravação, quando o total passa de ``max_bytes`` e a cada ``RESYNC_EVERY``
+    gravações (para incorporar o que outros processos gravaram). Acertos e faltas são
+    acumulados em memória e somados ao arquivo de estatísticas em lotes.
+
+    Args:
+        root (str): Diretório do cache.
+        max_bytes (int): Tamanho máximo total das entradas.
+    """
+
+    def __init__(self, root=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total = None              # Bytes ocupados (estimativa local entre recontagens)
+        self._gravacoes = 0
+        self._pendentes = Counter()     # Eventos ainda não somados ao arquivo de estatísticas
+        self._ultima_gravacao_stats = time.monotonic()
+        os.makedirs(root, exist_ok=True)
+        # Grava os eventos pendentes ao sair (inclusive nos processos do ProcessPoolExecutor)
+        mp_util.Finalize(self, self.flush_stats, exitpriority=10)
+
+    def _path(self, key):
+        return os.path.join(self.root, key[:2], f"{key}.npz")
+
+    def get(self, key):
+        """
+        Returns:
+            tuple[np.ndarray, list[Detections], dict] | None: Índices dos frames, suas detecções e
+            os metadados gravados junto, ou None se a chave não estiver no cache.
+        """
+        path = self._path(key)
+        try:
+            with np.load(path) as dados:
+                indices, offsets = dados["indices"], dados["offsets"]
+                xyxy, conf, cls = dados["xyxy"], dados["conf"], dados["cls"].astype(np.int32)
+                meta = json.loads(str(dados["meta"]))
+            os.utime(path)
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            self._registra("misses")
+            return None
+
+        self._registra("hits")
+        frames = [
+            Detections(xyxy[a:b], conf[a:b], cls[a:b])
+            for a, b in zip(offsets[:-1], offsets[1:])
+        ]
+        return indices, frames, meta
+
+    def put(self, key, indices, frames, meta=None):
+        """Grava as detecções de ``frames`` (um ``Detections`` por índice em ``indices``) e metadados opcionais."""
+        offsets = np.zeros(len(frames) + 1, np.int64)
+        offsets[1:] = np.cumsum([len(d) for d in frames])
+        vazio = Detections.empty()
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            anterior = os.path.getsize(path)  # Regravação da mesma chave não soma duas vezes
+        except OSError:
+            anterior = 0
+
+        # Escrita atômica: grava em um temporário e renomeia
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez_compressed(
+                f,
+                indices=np.asarray(indices, np.int32),
+                offsets=offsets,
+                xyxy=np.concatenate([vazio.xyxy] + [d.xyxy for d in frames]).astype(np.float32),
+                conf=np.concatenate([vazio.conf] + [d.conf for d in frames]).astype(np.float32),
+                cls=np.concatenate([vazio.cls] + [d.cls for d in frames]).astype(np.int16),
+                meta=np.array(json.dumps(meta or {})),
+            )
+        tamanho = os.path.getsize(tmp)
+        os.replace(tmp, path)
+
+        with self._lock:
+            self._gravacoes += 1
+            recontar = self._total is None or self._gravacoes % RESYNC_EVERY == 0
+            if not recontar:
+                self._total += tamanho - anterior
+        if recontar or self._total > self.max_bytes:
+            self._evict()
+
+    def _entradas(self):
+        entradas = []
+        for raiz, _, nomes in os.walk(self.root):
+            for nome in nomes:
+                if nome.endswith(".npz"):
+                    st = os.stat(os.path.join(raiz, nome))
+                    entradas.append((st.st_mtime, st.st_size, os.path.join(raiz, nome)))
+        return entradas
+
+    def _evict(self):
+        """
+        Recontagem do tamanho em disco e, acima de ``max_bytes``, remoção das entradas menos
+        usadas até ``EVICT_TARGET`` do limite (a folga evita percorrer o diretório a cada gravação).
+        """
+        entradas = sorted(self._entradas())
+        total = sum(tamanho for _, tamanho, _ in entradas)
+        limite = self.max_bytes * EVICT_TARGET if total > self.max_bytes else self.max_bytes
+        removidas = 0
+        for _, tamanho, path in entradas:
+            if total <= limite:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= tamanho
+            removidas += 1
+        with self._lock:
+            self._total = total
+        if removidas:
+            self._registra("evictions", removidas)
+
+    # ------------------------------
+    # Estatísticas
+    # ------------------------------
+    def _registra(self, campo, n=1):
+        """Acumula um contador; o arquivo só é atualizado a cada lote de eventos ou intervalo."""
+        with self._lock:
+            self._pendentes[campo] += n
+            cheio = (sum(self._pendentes.values()) >= STATS_FLUSH_EVERY
+                     or time.monotonic() - self._ultima_gravacao_stats >= STATS_FLUSH_INTERVAL)
+        if cheio:
+            self.flush_stats()
+
+    def flush_stats(self):
+        """Soma os contadores pendentes ao arquivo de estatísticas (compartilhado entre processos)."""
+        path = os.path.join(self.root, STATS_FILE)
+        with self._lock:
+            pendentes, self._pendentes = self._pendentes, Counter()
+            self._ultima_gravacao_stats = time.monotonic()
+            if not pendentes:
+                return
+            with open(path, "a+") as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                try:
+                    stats = json.loads(f.read() or "{}")
+                except json.JSONDecodeError:
+                    stats = {}
+                for campo, n in pendentes.items():
+                    stats[campo] = stats.get(campo, 0) + n
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(stats))
+
+    def stats(self):
+        """Acertos, faltas, taxa de acerto, remoções, número de entradas e bytes ocupados."""
+        self.flush_stats()
+        path = os.path.join(self.root, STATS_FILE)
+        try:
+            with open(path) as f:
+                stats = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            stats = {}
+        entradas = self._entradas()
+        hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "evictions": stats.get("evictions", 0),
+            "entries": len(entradas),
+            "bytes": sum(tamanho for _, tamanho, _ in entradas),
+        }
+
+
+# =============================================
+# BACKENDS DE GRAVAÇÃO E REPRODUÇÃO
+# =============================================
+
+class RecordingBackend:
+    """
+    Envolve um backend: infere no piso de confiança do cache, guarda a saída bruta e
+    devolve as detecções filtradas pelo limiar pedido.
+    """
+
+    def __init__(self, backend, conf):
+        self.backend = backend
+        self.conf = conf
+        self.floor = conf_floor(conf, backend)
+        self.gravadas = []
+
+    @property
+    def names(self):
+        return self.backend.names
+
+    def detect(self, frames, **kwargs):
+        kwargs["conf"] = self.floor
+        brutas = self.backend.detect(frames, **kwargs)
+        self.gravadas.extend(brutas)
+        return [d.filter_conf(self.conf) for d in brutas]
+
+
+class ReplayBackend:
+    """Reproduz, em ordem, detecções lidas do cache (aplicando o limiar de confiança)."""
+
+    def __init__(self, frames, names, conf):
+        self._frames = iter(frames)
+        self._names = names
+        self.conf = conf
+
+    @property
+    def names(self):
+        return self._names
+
+    def detect(self, frames, **kwargs):
+        return [next(self._frames).filter_conf(self.conf) for _ in frames]
+
+
+class ReplaySampler:
+    """
+    Amostrador que marca exatamente os frames gravados no cache, sem recalcular o
+    portão de movimento. As contagens de frames pulados vêm dos metadados gravados.
+    """
+
+    def __init__(self, indices, pulados_stride=0, pulados_movimento=0):
+        self._indices = set(int(i) for i in indices)
+        self.pulados_stride = pulados_stride
+        self.pulados_movimento = pulados_movimento
+
+    def should_infer(self, idx, frame):
+        return idx in self._indices
+
+
+# =============================================
+# INFERÊNCIA COM CACHE
+# =============================================
+
+def _params(backend, conf, **extra):
+    return {"conf": conf_floor(conf, backend), "iou": backend.params["iou"], "imgsz": backend.params["imgsz"], **extra}
+
+
+def detect_images(cache, backend, images, input_hashes, conf):
+    """
+    Detecta em um lote de imagens consultando o cache; só as faltas vão ao modelo, em um único lote.
+
+    Returns:
+        tuple[list[Detections], int]: Detecções filtradas por ``conf`` e o número de acertos no cache.
+    """
+    keys = [cache_key(h, backend, **_params(backend, conf)) for h in input_hashes]
+    brutas = [None] * len(images)
+    faltas = []
+    for i, key in enumerate(keys):
+        entrada = cache.get(key)
+        if entrada is not None:
+            brutas[i] = entrada[1][0]
+        else:
+            faltas.append(i)
+
+    if faltas:
+        novas = backend.detect([images[i] for i in faltas], conf=conf_floor(conf, backend))
+        for i, bruta in zip(faltas, novas):
+            cache.put(keys[i], [0], [bruta])
+            brutas[i] = bruta
+    return [d.filter_conf(conf) for d in brutas], len(images) - len(faltas)
+
+
+def detect_image(cache, backend, image, input_hash, conf):
+    """
+    Detecta em uma imagem consultando o cache antes de rodar o modelo.
+
+    Returns:
+        tuple[Detections, bool]: Detecções filtradas por ``conf`` e se houve acerto no cache.
+    """
+    detections, hits = detect_images(cache, backend, [image], [input_hash], conf)
+    return detections[0], hits == 1
+
+
+def run_video(cache, backend, video_path, output_path, conf, stride=1, motion_threshold=0.0,
+              progress_callback=None, input_hash=None, **engine_kwargs):
+    """
+    Processa um vídeo com o ``VideoEngine``, reaproveitando as detecções do cache.
+
+    No acerto, o vídeo é apenas decodificado, redesenhado e codificado (rastreamento e
+    contagem são refeitos sobre as detecções gravadas). Na falta, as detecções brutas
+    são gravadas ao final para as próximas execuções.
+
+    Args:
+        input_hash (str | None): Hash já calculado do vídeo (evita reler o arquivo).
+
+    Returns:
+        tuple[EngineStats, bool]: Estatísticas do motor e se houve acerto no cache.
+    """
+    from video_engine import VideoEngine
+
+    key = cache_key(input_hash or hash_file(video_path), backend,
+                    **_params(backend, conf, stride=stride, motion_threshold=motion_threshold))
+    entrada = cache.get(key)
+    if entrada is not None:
+        indices, frames, meta = entrada
+        engine = VideoEngine(ReplayBackend(frames, backend.names, conf),
+                             sampler=ReplaySampler(indices, meta.get("pulados_stride", 0),
+                                                   meta.get("pulados_movimento", 0)),
+                             **engine_kwargs)
+        return engine.run(video_path, output_path, progress_callback), True
+
+    gravador = RecordingBackend(backend, conf)
+    engine = VideoEngine(gravador, stride=stride, motion_threshold=motion_threshold, **engine_kwargs)
+    stats = engine.run(video_path, output_path, progress_callback)
+    cache.put(key, engine.inferidos, gravador.gravadas,
+              {"pulados_stride": stats.pulados_stride, "pulados_movimento": stats.pulados_movimento})
+    return stats, False
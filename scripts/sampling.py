@@ -0,0 +1,87 @@
+import cv2
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+STRIDE = 1               # Inferência a cada k frames (1 = todos os frames)
+MOTION_THRESHOLD = 0.0   # Fração mínima de pixels alterados para rodar a inferência (0 = desativado)
+MOTION_PIXEL_DIFF = 25   # Diferença mínima de intensidade (0-255) para considerar um pixel alterado
+MOTION_SIZE = (160, 90)  # Resolução reduzida usada na comparação entre frames
+
+
+# =============================================
+# PORTÃO DE MOVIMENTO
+# =============================================
+
+class MotionGate:
+    """
+    Detector de mudança barato baseado em diferença de frames em baixa resolução.
+
+    O frame é comparado com o último frame que passou pelo portão (e não com o
+    anterior), de modo que movimentos lentos acumulam diferença até disparar.
+    """
+
+    def __init__(self, threshold=MOTION_THRESHOLD, pixel_diff=MOTION_PIXEL_DIFF, size=MOTION_SIZE):
+        self.threshold = threshold
+        self.pixel_diff = pixel_diff
+        self.size = size
+        self._referencia = None
+        self.ultimo_score = 0.0
+
+    def _miniatura(self, frame):
+        small = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+
+    def changed(self, frame):
+        """Retorna True quando a cena mudou o suficiente desde o último frame aceito."""
+        gray = self._miniatura(frame)
+        if self._referencia is None:
+            self._referencia = gray
+            self.ultimo_score = 1.0
+            return True
+
+        diff = cv2.absdiff(gray, self._referencia)
+        self.ultimo_score = cv2.countNonZero(cv2.threshold(diff, self.pixel_diff, 255, cv2.THRESH_BINARY)[1]) / diff.size
+        if self.ultimo_score >= self.threshold:
+            self._referencia = gray
+            return True
+        return False
+
+
+# =============================================
+# AMOSTRAGEM DE FRAMES
+# =============================================
+
+class FrameSampler:
+    """
+    Decide em quais frames a inferência deve ser executada.
+
+    Combina um passo fixo (apenas frames múltiplos de ``stride``) com um portão de
+    movimento opcional. Os frames não inferidos reutilizam as últimas detecções.
+
+    Args:
+        stride (int): Executa a inferência a cada ``stride`` frames.
+        motion_threshold (float): Fração de pixels alterados para disparar a inferência (0 desativa o portão).
+    """
+
+    def __init__(self, stride=STRIDE, motion_threshold=MOTION_THRESHOLD):
+        if stride < 1:
+            raise ValueError("stride deve ser maior ou igual a 1")
+        self.stride = stride
+        self.gate = MotionGate(motion_threshold) if motion_threshold > 0 else None
+        self.pulados_stride = 0
+        self.pulados_movimento = 0
+
+    def should_infer(self, idx, frame):
+        if idx % self.stride != 0:
+            self.pulados_stride += 1
+            return False
+        if self.gate is not None and not self.gate.changed(frame):
+            self.pulados_movimento += 1
+            return False
+        return True
+
+    @property
+    def pulados(self):
+        return self.pulados_stride + self.pulados_movimento
@@ -0,0 +1,211 @@
+import math
+import time
+from collections import deque
+from dataclasses import dataclass, field
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+MAX_BATCH = 8               # Frames (de streams diferentes) por chamada de inferência
+ADJUST_INTERVAL = 2.0       # Intervalo entre reavaliações da carga (segundos)
+HIGH_UTILIZATION = 0.9      # Acima disso, com streams abaixo do alvo, degrada um nível
+LOW_UTILIZATION = 0.55      # Abaixo disso, recupera um nível (histerese contra oscilação)
+BUDGET_TOLERANCE = 0.85     # Fração do FPS alvo abaixo da qual um stream está atrasado
+RATE_WINDOW = 5.0           # Janela do FPS atendido de cada stream (segundos)
+
+# Níveis de degradação: fração do FPS alvo e resolução de entrada (None: a do modelo).
+# A fração vale integralmente para prioridade 1; streams de prioridade p recebem fração ** (1 / p).
+DEGRADATION_LEVELS = [
+    (1.0, None),
+    (0.75, None),
+    (0.5, None),
+    (0.5, 512),
+    (0.35, 416),
+    (0.25, 320),
+]
+
+
+@dataclass
+class StreamSlot:
+    """Estado de escalonamento de um stream."""
+    name: str
+    priority: float = 1.0
+    max_fps: float = None           # Orçamento de FPS (None: o FPS da fonte)
+    source_fps: float = 0.0
+    virtual_time: float = 0.0       # Atendimentos ponderados pela prioridade (fila justa ponderada)
+    next_due: float = 0.0           # Instante a partir do qual o stream pode ser atendido de novo
+    served: int = 0
+    deferred: int = 0               # Vezes em que estava elegível mas ficou fora do lote (lote cheio)
+    registered: float = field(default_factory=time.monotonic)
+    _atendimentos: deque = field(default_factory=deque)
+
+    def target_fps(self, fraction=1.0):
+        """FPS alvo no nível de degradação atual (0 = sem limite conhecido)."""
+        limites = [f for f in (self.max_fps, self.source_fps) if f]
+        return min(limites) * fraction ** (1.0 / self.priority) if limites else 0.0
+
+    def pacing_fps(self, fraction=1.0):
+        """Taxa imposta pelo escalonador: só com orçamento ou degradação (a fonte já limita o resto)."""
+        return self.target_fps(fraction) if self.max_fps or fraction < 1.0 else 0.0
+
+    def served_fps(self, now):
+        while self._atendimentos and self._atendimentos[0] < now - RATE_WINDOW:
+            self._atendimentos.popleft()
+        janela = min(RATE_WINDOW, now - self.registered)
+        return len(self._atendimentos) / janela if janela > 0 else 0.0
+
+
+class Scheduler:
+    """
+    Escolhe quais streams entram em cada lote de inferência do modelo compartilhado.
+
+    - Justiça e prioridade: fila justa ponderada. Cada atendimento soma ``1 / prioridade``
+      ao tempo virtual do stream e o lote é formado pelos menores tempos virtuais, de
+      modo que um stream de prioridade 2 recebe o dobro dos slots de um de prioridade 1
+      quando o modelo não dá conta de todos, e nenhum fica sem atendimento.
+    - Orçamento de FPS: um stream só volta a ser elegível ``1 / fps_alvo`` segundos
+      depois do último atendimento; os frames que chegam antes disso são descartados
+      pelo buffer do stream.
+    - Degradação: a cada ``adjust_interval`` segundos, se o modelo ficou ocupado mais que
+      ``high`` do tempo e algum stream não atingiu o alvo, desce um nível de
+      ``DEGRADATION_LEVELS`` (menos FPS e depois menor ``imgsz``); abaixo de ``low`` sobe
+      um nível. Streams de maior prioridade perdem menos FPS em cada nível.
+
+    Args:
+        max_batch (int): Frames por chamada de inferência.
+        imgsz (int): Resolução de entrada sem degradação.
+        degrade (bool): False mantém o nível 0 (só justiça, prioridade e orçamento).
+        levels (list[tuple[float, int | None]]): Níveis de degradação (fração do FPS, imgsz).
+    """
+
+    def __init__(self, max_batch=MAX_BATCH, imgsz=640, degrade=True, levels=DEGRADATION_LEVELS,
+                 high=HIGH_UTILIZATION, low=LOW_UTILIZATION, adjust_interval=ADJUST_INTERVAL):
+        self.max_batch = max_batch
+        self.base_imgsz = imgsz
+        self.degrade = degrade
+        self.levels = levels
+        self.high = high
+        self.low = low
+        self.adjust_interval = adjust_interval
+        self.level = 0
+        self.slots = {}
+        self.batches = 0
+        self.mudancas = []              # (instante, nível) de cada mudança de nível
+        self._ocupado = 0.0             # Tempo de inferência desde a última reavaliação
+        self._utilizacao = 0.0
+        self._ultima_avaliacao = time.monotonic()
+
+    def register(self, name, priority=1.0, max_fps=None):
+        if priority <= 0:
+            raise ValueError(f"Prioridade do stream {name} deve ser positiva")
+        if name in self.slots:
+            raise ValueError(f"Stream já registrado: {name}")
+        self.slots[name] = StreamSlot(name, float(priority), max_fps)
+
+    @property
+    def fraction(self):
+        return self.levels[self.level][0]
+
+    @property
+    def imgsz(self):
+        """Resolução de entrada no nível atual (múltiplo de 32, nunca maior que a do modelo)."""
+        imgsz = self.levels[self.level][1]
+        return min(imgsz, self.base_imgsz) if imgsz else self.base_imgsz
+
+    # ------------------------------
+    # Seleção e registro dos lotes
+    # ------------------------------
+    def select(self, pending, now=None):
+        """
+        Streams atendidos no próximo lote.
+
+        Args:
+            pending (dict[str, float]): Streams com frame pendente e o FPS da fonte de cada um.
+
+        Returns:
+            tuple[list[str], float]: Streams escolhidos (ordem do lote) e, se nenhum estiver
+            dentro do orçamento, os segundos até o próximo ficar elegível.
+        """
+        now = time.monotonic() if now is None else now
+        elegiveis = []
+        espera = math.inf
+        for name, source_fps in pending.items():
+            slot = self.slots[name]
+            slot.source_fps = source_fps or 0.0
+            if slot.next_due <= now:
+                elegiveis.append(slot)
+            else:
+                espera = min(espera, slot.next_due - now)
+
+        if elegiveis:
+            # Quem volta de um período ocioso não acumula crédito sobre os demais
+            piso = min(s.virtual_time for s in elegiveis)
+            for s in elegiveis:
+                s.virtual_time = max(s.virtual_time, piso)
+        elegiveis.sort(key=lambda s: (s.virtual_time, -s.priority))
+        escolhidos = elegiveis[:self.max_batch]
+        for s in escolhidos:
+            alvo = s.pacing_fps(self.fraction)
+            if alvo > 0:
+                intervalo = 1.0 / alvo
+                # Mantém a taxa média sem acumular rajadas depois de um atraso
+                s.next_due = max(s.next_due + intervalo, now + intervalo * 0.5)
+        # Adiado: estava dentro do orçamento mas ficou fora do lote (esperar o próprio orçamento não conta)
+        for s in elegiveis[self.max_batch:]:
+            s.deferred += 1
+        return [s.name for s in escolhidos], (0.0 if escolhidos else espera)
+
+    def done(self, names, duration, now=None):
+        """Registra um lote concluído: tempo virtual, FPS atendido e carga do modelo."""
+        now = time.monotonic() if now is None else now
+        self.batches += 1
+        self._ocupado += duration
+        for name in names:
+            slot = self.slots[name]
+            slot.served += 1
+            slot.virtual_time += 1.0 / slot.priority
+            slot._atendimentos.append(now)
+        if now - self._ultima_avaliacao >= self.adjust_interval:
+            self._adjust(now)
+
+    def _adjust(self, now):
+        self._utilizacao = min(self._ocupado / (now - self._ultima_avaliacao), 1.0)
+        self._ocupado = 0.0
+        self._ultima_avaliacao = now
+        if not self.degrade:
+            return
+        atrasados = [s for s in self.slots.values()
+                     if s.target_fps(self.fraction) and s.served_fps(now) < BUDGET_TOLERANCE * s.target_fps(self.fraction)]
+        if self._utilizacao > self.high and atrasados and self.level < len(self.levels) - 1:
+            self.level += 1
+            self.mudancas.append((time.time(), self.level))
+        elif self._utilizacao < self.low and self.level > 0:
+            self.level -= 1
+            self.mudancas.append((time.time(), self.level))
+
+    # ------------------------------
+    # Métricas
+    # ------------------------------
+    def stream_stats(self, name, now=None):
+        now = time.monotonic() if now is None else now
+        slot = self.slots[name]
+        return {
+            "prioridade": slot.priority,
+            "fps_orcamento": slot.max_fps,
+            "fps_alvo": round(slot.target_fps(self.fraction), 2),
+            "fps_atendido": round(slot.served_fps(now), 2),
+            "atendimentos": slot.served,
+            "adiados": slot.deferred,
+        }
+
+    def resumo(self):
+        return {
+            "nivel": self.level,
+            "fracao_fps": self.fraction,
+            "imgsz": self.imgsz,
+            "utilizacao": round(self._utilizacao, 3),
+            "lotes": self.batches,
+            "mudancas_de_nivel": len(self.mudancas),
+            "streams": {name: self.stream_stats(name) for name in self.slots},
+        }
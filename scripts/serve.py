@@ -0,0 +1,41 @@
+import argparse
+import os
+
+import model_registry
+
+# =============================================
+# LAUNCHER DO APP COM MODELO PRÉ-AQUECIDO
+# =============================================
+# Sobe o servidor do Streamlit no mesmo processo em que o modelo é carregado. A carga
+# e a inferência de aquecimento começam em uma thread antes do servidor, de modo que
+# a primeira sessão (e toda sessão depois de um reset) recebe o modelo já pronto.
+# Equivale a "streamlit run app.py", com as mesmas opções de servidor.
+
+APP = "app.py"
+PORT = 8501
+ADDRESS = "0.0.0.0"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Executa o app com o modelo carregado e aquecido na subida.")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--address", default=ADDRESS)
+    parser.add_argument("--backend", default=None, help="Sobrescreve o backend de configs/inference.yaml")
+    parser.add_argument("--no-preload", action="store_true", help="Carrega o modelo só na primeira sessão")
+    args = parser.parse_args()
+
+    if args.backend:
+        # O app e o registro leem o backend padrão da mesma variável
+        os.environ["DETECTOR_BACKEND"] = args.backend
+    if not args.no_preload:
+        model_registry.preload()
+
+    from streamlit.web import bootstrap
+
+    flag_options = {"server_port": args.port, "server_address": args.address}
+    bootstrap.load_config_options(flag_options=flag_options)
+    bootstrap.run(APP, False, [], flag_options)
+
+
+if __name__ == "__main__":
+    main()
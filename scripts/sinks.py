@@ -0,0 +1,262 @@
+import json
+import os
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+BUFFER_FRAMES = 1024    # Frames acumulados antes de cada escrita em bloco
+FORMATS = {".jsonl": "jsonl", ".parquet": "parquet", ".json": "coco"}
+EXTENSIONS = {fmt: ext for ext, fmt in FORMATS.items()}
+MIME_TYPES = {"jsonl": "application/x-ndjson", "parquet": "application/vnd.apache.parquet", "coco": "application/json"}
+
+
+# =============================================
+# SINKS DE DETECÇÕES
+# =============================================
+
+class DetectionSink(ABC):
+    """
+    Destino de detecções por frame com escrita em bloco, independente do desenho.
+
+    ``write`` só guarda a referência às detecções do frame; a cada ``buffer_frames``
+    frames o bloco é serializado e gravado por uma thread própria, enquanto o próximo
+    bloco se acumula (no máximo um bloco em escrita, o que limita a memória). O arquivo
+    é gravado em ``<path>.tmp`` e só aparece em ``path`` no ``close``.
+
+    Args:
+        path (str): Arquivo de saída.
+        names (dict | list): Nomes das classes indexados pelo id.
+        buffer_frames (int): Frames por bloco.
+    """
+
+    format = None
+
+    def __init__(self, path, names, buffer_frames=BUFFER_FRAMES):
+        self.path = path
+        self.names = names
+        self.buffer_frames = buffer_frames
+        self.frames = 0
+        self.boxes = 0
+        self._tmp = path + ".tmp"
+        self._buffer = []
+        self._writer = ThreadPoolExecutor(1, thread_name_prefix=f"sink-{self.format}")
+        self._pendente = None
+        self._file = open(self._tmp, "wb")
+
+    def write(self, detections, frame=0, timestamp=None, source=None, inferred=True):
+        """
+        Registra as detecções de um frame.
+
+        Args:
+            detections (Detections): Detecções do frame (com ``track_id`` opcional).
+            frame (int): Índice do frame (0 para imagens).
+            timestamp (float | None): Segundos desde o início do vídeo (ou instante de captura).
+            source (str | None): Arquivo ou stream de origem.
+            inferred (bool): False quando o frame reaproveitou as detecções do último inferido.
+        """
+        self._buffer.append((frame, timestamp, source, inferred, detections))
+        self.frames += 1
+        self.boxes += len(detections)
+        if len(self._buffer) >= self.buffer_frames:
+            self._flush()
+
+    def _flush(self):
+        bloco, self._buffer = self._buffer, []
+        if self._pendente is not None:
+            self._pendente.result()  # Propaga erros de escrita e limita a um bloco em voo
+        self._pendente = self._writer.submit(self._write_block, bloco) if bloco else None
+
+    @abstractmethod
+    def _write_block(self, bloco):
+        """Serializa e grava um bloco de frames (chamado na thread de escrita)."""
+
+    def _finish(self):
+        """Fecha a estrutura do formato (chamado na thread de escrita, após o último bloco)."""
+
+    def close(self):
+        """Grava o que falta e publica o arquivo em ``path``."""
+        self._flush()
+        if self._pendente is not None:
+            self._pendente.result()
+        self._writer.submit(self._finish).result()
+        self._writer.shutdown()
+        self._file.close()
+        os.replace(self._tmp, self.path)
+
+    def abort(self):
+        """Descarta a saída parcial."""
+        self._buffer = []
+        self._writer.shutdown(wait=True, cancel_futures=True)
+        self._file.close()
+        if os.path.exists(self._tmp):
+            os.unlink(self._tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class JsonlSink(DetectionSink):
+    """Uma linha JSON por frame: ``{source, frame, timestamp, inferido, detections: [...]}``."""
+
+    format = "jsonl"
+
+    def _write_block(self, bloco):
+        names = self.names
+        linhas = []
+        for frame, timestamp, source, inferred, d in bloco:
+            caixas = np.round(d.xyxy.astype(np.float64), 1).tolist()
+            confs = np.round(d.conf.astype(np.float64), 4).tolist()
+            registros = [
+                {"class_id": c, "class_name": names[c], "confidence": p, "box": b}
+                for c, p, b in zip(d.cls.tolist(), confs, caixas)
+            ]
+            if d.track_id is not None:
+                for registro, tid in zip(registros, d.track_id.tolist()):
+                    registro["track_id"] = tid
+            linhas.append(json.dumps({"source": source, "frame": frame, "timestamp": timestamp,
+                                      "inferido": inferred, "detections": registros}))
+        self._file.write(("\n".join(linhas) + "\n").encode())
+
+
+class ParquetSink(DetectionSink):
+    """
+    Tabela colunar (Parquet), uma linha por caixa e um row group por bloco.
+
+    Colunas: ``source``, ``frame``, ``timestamp``, ``inferido``, ``class_id``,
+    ``class_name`` (dicionário), ``confidence``, ``x1``, ``y1``, ``x2``, ``y2`` e
+    ``track_id`` (nulo sem rastreamento). Requer ``pyarrow`` (instalado com o Streamlit).
+    """
+
+    format = "parquet"
+
+    def __init__(self, path, names, buffer_frames=BUFFER_FRAMES, compression="zstd"):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        super().__init__(path, names, buffer_frames)
+        self._pa = pa
+        self._nomes = pa.array([names[c] for c in range(len(names))], pa.string())
+        self.schema = pa.schema([
+            ("source", pa.dictionary(pa.int32(), pa.string())),
+            ("frame", pa.int64()),
+            ("timestamp", pa.float64()),
+            ("inferido", pa.bool_()),
+            ("class_id", pa.int16()),
+            ("class_name", pa.dictionary(pa.int16(), pa.string())),
+            ("confidence", pa.float32()),
+            ("x1", pa.float32()), ("y1", pa.float32()), ("x2", pa.float32()), ("y2", pa.float32()),
+            ("track_id", pa.int64()),
+        ])
+        self._parquet = pq.ParquetWriter(self._file, self.schema, compression=compression)
+
+    def _write_block(self, bloco):
+        pa = self._pa
+        contagens = np.array([len(d) for *_, d in bloco], np.int64)
+        if contagens.sum() == 0:
+            return
+        repete = lambda valores, dtype=None: np.repeat(np.asarray(valores, dtype), contagens)
+        xyxy = np.concatenate([d.xyxy for *_, d in bloco]).astype(np.float32, copy=False)
+        cls = np.concatenate([d.cls for *_, d in bloco]).astype(np.int16)
+        track = np.concatenate([d.track_id if d.track_id is not None else np.full(len(d), -1, np.int64)
+                                for *_, d in bloco]).astype(np.int64)
+
+        fontes = [s or "" for _, _, s, _, _ in bloco]
+        unicas, indices = np.unique(fontes, return_inverse=True)
+        timestamps = np.array([np.nan if t is None else t for _, t, _, _, _ in bloco], np.float64)
+        tabela = pa.Table.from_arrays([
+            pa.DictionaryArray.from_arrays(pa.array(repete(indices, np.int32)), pa.array(unicas.tolist(), pa.string())),
+            pa.array(repete([f for f, *_ in bloco], np.int64)),
+            pa.array(repete(timestamps), mask=np.isnan(repete(timestamps))),
+            pa.array(repete([i for _, _, _, i, _ in bloco], bool)),
+            pa.array(cls),
+            pa.DictionaryArray.from_arrays(pa.array(cls), self._nomes),
+            pa.array(np.concatenate([d.conf for *_, d in bloco]).astype(np.float32, copy=False)),
+            *(pa.array(np.ascontiguousarray(xyxy[:, k])) for k in range(4)),
+            pa.array(track, mask=track < 0),
+        ], schema=self.schema)
+        self._parquet.write_table(tabela)
+
+    def _finish(self):
+        self._parquet.close()
+
+
+class CocoSink(DetectionSink):
+    """
+    Resultados no formato do COCO: lista de ``{image_id, category_id, bbox [x, y, w, h], score}``.
+
+    Em imagens (frame 0 sem ``timestamp``) o ``image_id`` é o nome do arquivo de origem
+    (numérico quando possível, como na Ultralytics); em vídeos, o índice do frame.
+    ``category_id`` é o id da classe somado a ``category_offset``.
+    """
+
+    format = "coco"
+
+    def __init__(self, path, names, buffer_frames=BUFFER_FRAMES, category_offset=0):
+        super().__init__(path, names, buffer_frames)
+        self.category_offset = category_offset
+        self._primeiro = True
+        self._file.write(b"[")
+
+    @staticmethod
+    def _image_id(frame, timestamp, source):
+        if source is None or frame or timestamp is not None:
+            return frame
+        stem = os.path.splitext(os.path.basename(source))[0]
+        return int(stem) if stem.isnumeric() else stem
+
+    def _write_block(self, bloco):
+        entradas = []
+        for frame, timestamp, source, _, d in bloco:
+            image_id = self._image_id(frame, timestamp, source)
+            xyxy = d.xyxy.astype(np.float64)
+            xywh = np.round(np.concatenate([xyxy[:, :2], xyxy[:, 2:] - xyxy[:, :2]], axis=1), 2).tolist()
+            confs = np.round(d.conf.astype(np.float64), 5).tolist()
+            for c, p, b in zip((d.cls + self.category_offset).tolist(), confs, xywh):
+                entradas.append(json.dumps({"image_id": image_id, "category_id": c, "bbox": b, "score": p}))
+        if entradas:
+            self._file.write((("" if self._primeiro else ",\n") + ",\n".join(entradas)).encode())
+            self._primeiro = False
+
+    def _finish(self):
+        self._file.write(b"]\n")
+
+
+SINKS = {"jsonl": JsonlSink, "parquet": ParquetSink, "coco": CocoSink}
+
+
+def open_sink(path, names, fmt=None, **kwargs):
+    """
+    Cria a sink do formato pedido ou, sem ``fmt``, do indicado pela extensão de ``path``.
+
+    Raises:
+        ValueError: Formato desconhecido.
+    """
+    fmt = fmt or FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in SINKS:
+        raise ValueError(f"Formato de exportação desconhecido: {path} (opções: {', '.join(SINKS)})")
+    return SINKS[fmt](path, names, **kwargs)
+
+
+def frame_writer(sink, fps=None, source=None):
+    """
+    ``frame_callback`` do ``VideoEngine`` que grava cada frame na sink.
+
+    Args:
+        fps (float | None): Taxa do vídeo, para o ``timestamp`` de cada frame.
+        source (str | None): Origem gravada em cada registro.
+    """
+    def grava(idx, detections, inferido):
+        sink.write(detections, frame=idx, timestamp=idx / fps if fps else None, source=source, inferred=inferido)
+    return grava
@@ -0,0 +1,504 @@
+import os
+import threading
+import time
+from collections import deque
+
+import cv2
+import numpy as np
+
+from instrumentation import NULL_INSTRUMENTATION, Instrumentation
+from renderer import get_renderer
+from scheduler import Scheduler
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+MAX_BATCH = 8               # Streams agrupados em uma única chamada de inferência
+WAIT_TIMEOUT = 0.5          # Espera máxima da inferência por um frame novo (segundos)
+RECONNECT_DELAY = 1.0       # Primeira espera antes de reabrir uma fonte ao vivo (dobra a cada falha)
+RECONNECT_MAX = 10.0        # Espera máxima entre tentativas de reconexão (segundos)
+LATENCY_WINDOW = 512        # Latências recentes usadas nos percentis de cada stream
+REPORT_INTERVAL = 5.0       # Intervalo entre resumos no terminal (segundos)
+STREAMS_CONFIG = "../configs/streams.yaml"  # Câmeras, prioridades e orçamentos de FPS (--config)
+LIVE_PREFIXES = ("rtsp://", "rtsps://", "rtmp://", "http://", "https://", "udp://", "tcp://")
+
+
+def parse_source(source):
+    """
+    Identifica o tipo de uma fonte.
+
+    Args:
+        source (str | int): URL (RTSP/HTTP/...), índice de dispositivo ou arquivo local.
+
+    Returns:
+        tuple[str | int, bool]: Alvo para o ``cv2.VideoCapture`` e se a fonte é ao vivo.
+
+    Raises:
+        FileNotFoundError: Arquivo local inexistente.
+    """
+    if isinstance(source, int) or str(source).isdigit():
+        return int(source), True
+    if str(source).lower().startswith(LIVE_PREFIXES):
+        return source, True
+    if not os.path.exists(source):
+        raise FileNotFoundError(f"Fonte não encontrada: {source}")
+    return source, False
+
+
+# =============================================
+# BUFFER DO ÚLTIMO FRAME
+# =============================================
+
+class LatestFrame:
+    """
+    Buffer de um único frame: o mais recente substitui o anterior ainda não consumido.
+
+    Quem consome sempre recebe o frame mais novo e os que envelheceram na espera são
+    descartados (e contados), o que limita a latência quando a inferência não acompanha
+    a fonte. A condição é compartilhada por todos os streams de um ``StreamRunner``,
+    para que a inferência acorde com um frame novo de qualquer um deles.
+    """
+
+    def __init__(self, condition):
+        self._cond = condition
+        self._item = None
+        self.descartados = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._item is not None:
+                self.descartados += 1
+            self._item = item
+            self._cond.notify_all()
+
+    def wake(self):
+        """Acorda quem espera na condição (fim do stream)."""
+        with self._cond:
+            self._cond.notify_all()
+
+    def take(self):
+        """Retira o frame pendente (ou None). Chame com a condição adquirida."""
+        item, self._item = self._item, None
+        return item
+
+    @property
+    def pending(self):
+        return self._item is not None
+
+
+# =============================================
+# STREAM
+# =============================================
+
+class LiveStream:
+    """
+    Uma fonte de vídeo lida continuamente por uma thread própria.
+
+    Fontes ao vivo (RTSP/HTTP/dispositivo) são reabertas com espera crescente quando a
+    leitura falha. Arquivos locais são reproduzidos em tempo real, como substitutos de
+    uma câmera: cada frame só "chega" no seu instante e, se a leitura atrasar, os
+    frames vencidos são pulados sem decodificação (``grab``).
+
+    A latência de cada frame vai da chegada até a publicação do resultado (inferência,
+    rastreamento, desenho e gravação na sink incluídos).
+
+    Args:
+        name (str): Nome do stream (métricas, arquivos de saída e interface).
+        source (str | int): URL, índice de dispositivo ou arquivo reproduzido em tempo real.
+        tracker (IoUKalmanTracker | None): Rastreador do stream.
+        counter (VehicleCounter | None): Contador por linhas/zonas alimentado pelas trilhas.
+        sink (DetectionSink | None): Recebe as detecções de cada frame processado.
+        loop (bool): Arquivos locais recomeçam ao terminar.
+        on_result (callable | None): Chamado como ``on_result(stream, resultado)`` a cada frame processado.
+        priority (float): Peso do stream no escalonamento do modelo compartilhado.
+        max_fps (float | None): Orçamento de FPS do stream (None: o FPS da fonte).
+    """
+
+    def __init__(self, name, source, tracker=None, counter=None, sink=None, loop=False, on_result=None,
+                 priority=1.0, max_fps=None):
+        self.name = name
+        self.source = source
+        self.priority = priority
+        self.max_fps = max_fps
+        self.target, self.live = parse_source(source)
+        self.tracker = tracker
+        self.counter = counter
+        self.sink = sink
+        self.loop = loop
+        self.on_result = on_result
+        self.instrumentation = Instrumentation()
+        self.fps_fonte = 0.0
+        self.ultimo = None          # Último resultado publicado (dict), lido pela interface
+        self.erro = None
+        self.lidos = 0
+        self.processados = 0
+        self.pulados_leitura = 0    # Frames vencidos pulados pela reprodução em tempo real
+        self.reconexoes = 0
+        self._latencias = deque(maxlen=LATENCY_WINDOW)
+        self.buffer = None
+        self._stop = None
+        self._thread = None
+
+    # ------------------------------
+    # Leitura
+    # ------------------------------
+    def start(self, condition, stop):
+        self.buffer = LatestFrame(condition)
+        self._stop = stop
+        self._thread = threading.Thread(target=self._read_loop, name=f"stream-{self.name}", daemon=True)
+        self._thread.start()
+
+    @property
+    def ativo(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _read_loop(self):
+        espera = RECONNECT_DELAY
+        try:
+            while not self._stop.is_set():
+                cap = cv2.VideoCapture(self.target)
+                if not cap.isOpened():
+                    if not self.live:
+                        self.erro = "Vídeo inválido - não pode ser aberto"
+                        return
+                    self.reconexoes += 1
+                    self.instrumentation.count("reconexoes")
+                    self._stop.wait(espera)
+                    espera = min(espera * 2, RECONNECT_MAX)
+                    continue
+                espera = RECONNECT_DELAY
+                self.fps_fonte = cap.get(cv2.CAP_PROP_FPS) or 0.0
+                try:
+                    self._read_frames(cap)
+                finally:
+                    cap.release()
+                if not self.live and not self.loop:
+                    return
+                if self.live:
+                    self.reconexoes += 1
+                    self.instrumentation.count("reconexoes")
+        except Exception as e:
+            self.erro = str(e)
+        finally:
+            # Acorda a inferência para que ela perceba o fim do stream
+            self.buffer.wake()
+
+    def _read_frames(self, cap):
+        replay = not self.live and self.fps_fonte > 0
+        intervalo = 1.0 / self.fps_fonte if replay else 0.0
+        inicio = time.monotonic()
+        posicao = 0  # Frames do arquivo já consumidos (reprodução em tempo real)
+        while not self._stop.is_set():
+            chegada = None
+            if replay:
+                chegada = inicio + posicao * intervalo
+                atraso = time.monotonic() - chegada
+                if atraso < 0:
+                    self._stop.wait(-atraso)
+                elif atraso > intervalo:
+                    # Frame vencido: avança sem decodificar
+                    if not cap.grab():
+                        return
+                    posicao += 1
+                    self.lidos += 1
+                    self.pulados_leitura += 1
+                    continue
+            ok, frame = cap.read()
+            if not ok:
+                return
+            agora = time.monotonic()
+            timestamp = posicao * intervalo if replay else time.time()
+            self.buffer.put((self.lidos, frame, chegada or agora, timestamp))
+            posicao += 1
+            self.lidos += 1
+            self.instrumentation.tick("recebidos")
+
+    # ------------------------------
+    # Resultados
+    # ------------------------------
+    def publish(self, item, detections, renderer):
+        """Rastreia, conta, desenha e grava um frame processado (thread de inferência)."""
+        idx, frame, chegada, timestamp = item
+        instr = self.instrumentation
+        if self.tracker is not None:
+            with instr.timer("tracking"):
+                detections = self.tracker.update(detections)
+        if self.counter is not None:
+            self.counter.update(idx, detections, frame.shape)
+        if renderer.enabled:
+            with instr.timer("plot"):
+                if self.counter is not None:
+                    self.counter.draw(frame)
+                renderer.draw(frame, detections)
+        if self.sink is not None:
+            with instr.timer("write"):
+                self.sink.write(detections, frame=idx, timestamp=timestamp, source=str(self.source))
+
+        latencia = time.monotonic() - chegada
+        self._latencias.append(latencia)
+        instr.observe("latencia", latencia)
+        instr.tick("processados")
+        self.processados += 1
+        self.ultimo = {"frame": frame, "detections": detections, "idx": idx, "latencia_s": latencia}
+        if self.on_result is not None:
+            self.on_result(self, self.ultimo)
+
+    @property
+    def descartados(self):
+        """Frames que chegaram e nunca foram processados (substituídos no buffer ou pulados na leitura)."""
+        return (self.buffer.descartados if self.buffer else 0) + self.pulados_leitura
+
+    def resumo(self):
+        """Latência ponta a ponta, taxa de descarte e FPS efetivo do stream."""
+        latencias = np.array(self._latencias) * 1000 if self._latencias else np.zeros(1)
+        return {
+            "stream": self.name,
+            "source": str(self.source),
+            "ativo": self.ativo,
+            "erro": self.erro,
+            "frames_recebidos": self.lidos,
+            "frames_processados": self.processados,
+            "frames_descartados": self.descartados,
+            "taxa_descarte": round(self.descartados / self.lidos, 4) if self.lidos else 0.0,
+            "fps_fonte": round(self.fps_fonte, 2),
+            "fps_efetivo": round(self.instrumentation.fps("processados"), 2),
+            "latencia_p50_ms": round(float(np.percentile(latencias, 50)), 1),
+            "latencia_p95_ms": round(float(np.percentile(latencias, 95)), 1),
+            "latencia_max_ms": round(float(latencias.max()), 1),
+            "reconexoes": self.reconexoes,
+            "contagens": self.counter.snapshot() if self.counter is not None else None,
+        }
+
+
+# =============================================
+# EXECUÇÃO DE VÁRIOS STREAMS COM UM MODELO
+# =============================================
+
+class StreamRunner:
+    """
+    Processa vários streams ao vivo com um único modelo compartilhado.
+
+    Uma thread de inferência espera um frame novo de qualquer stream, junta o último
+    frame dos streams escolhidos pelo ``Scheduler`` (justiça ponderada pela prioridade,
+    orçamento de FPS e, se ativada, degradação sob sobrecarga) em uma única chamada de
+    ``model.detect`` e publica os resultados. Os frames que chegam enquanto a inferência
+    roda substituem os anteriores no buffer de cada stream, de modo que a latência fica
+    limitada a cerca de um lote.
+
+    Args:
+        model (InferenceBackend): Backend de inferência (ou objeto com ``detect`` e ``names``).
+        streams (list[LiveStream]): Streams iniciais (outros podem ser adicionados antes do ``start``).
+        max_batch (int): Frames por chamada de inferência (quando ``scheduler`` não é informado).
+        scheduler (Scheduler | None): Política de escalonamento (padrão: sem degradação).
+        predict_kwargs (dict | None): Parâmetros que sobrescrevem os do backend (conf, iou, imgsz...).
+        draw (bool): False ativa o modo somente dados (sem desenho).
+        instrumentation (Instrumentation | None): Métricas da inferência compartilhada.
+    """
+
+    def __init__(self, model, streams=(), max_batch=MAX_BATCH, scheduler=None, predict_kwargs=None, draw=True,
+                 instrumentation=None):
+        self.model = model
+        self.streams = list(streams)
+        self.scheduler = scheduler or Scheduler(max_batch, imgsz=model.params["imgsz"], degrade=False)
+        self.predict_kwargs = predict_kwargs or {}
+        self.renderer = get_renderer(model.names, draw=draw)
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
+        self.erro = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, stream):
+        self.streams.append(stream)
+
+    def start(self):
+        for s in self.streams:
+            self.scheduler.register(s.name, s.priority, s.max_fps)
+        for s in self.streams:
+            s.start(self._cond, self._stop)
+        self._thread = threading.Thread(target=self._inference_loop, name="stream-inference", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Encerra a leitura e a inferência e fecha as sinks dos streams."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join()
+        for s in self.streams:
+            if s._thread is not None:
+                s._thread.join()
+            if s.sink is not None:
+                s.sink.close()
+
+    @property
+    def ativo(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def run(self, duration=None, report=None, interval=REPORT_INTERVAL):
+        """
+        Executa até ``duration`` segundos, até todos os streams terminarem ou até Ctrl+C.
+
+        Args:
+            report (callable | None): Chamado como ``report(resumos)`` a cada ``interval`` segundos.
+        """
+        self.start()
+        fim = time.monotonic() + duration if duration else None
+        try:
+            while self.ativo and (fim is None or time.monotonic() < fim):
+                self._stop.wait(min(interval, fim - time.monotonic()) if fim else interval)
+                if report is not None:
+                    report(self.resumo())
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+        if self.erro:
+            raise Exception(self.erro)
+        return self.resumo()
+
+    def _lote(self):
+        """
+        Espera um frame pendente dentro do orçamento e retira os frames do próximo lote.
+
+        Returns:
+            list[tuple[LiveStream, tuple]] | None: Lote, ou None quando a execução terminou.
+        """
+        por_nome = {s.name: s for s in self.streams}
+        with self._cond:
+            while not self._stop.is_set():
+                pendentes = {s.name: s.fps_fonte for s in self.streams if s.buffer.pending}
+                if not pendentes and not any(s.ativo for s in self.streams):
+                    return None
+                escolhidos, espera = self.scheduler.select(pendentes) if pendentes else ([], WAIT_TIMEOUT)
+                if escolhidos:
+                    return [(por_nome[n], por_nome[n].buffer.take()) for n in escolhidos]
+                self._cond.wait(min(espera, WAIT_TIMEOUT))
+        return None
+
+    def _inference_loop(self):
+        instr = self.instrumentation
+        try:
+            while (lote := self._lote()) is not None:
+                # Sob sobrecarga o escalonador pode reduzir a resolução de entrada
+                kwargs = self.predict_kwargs
+                if self.scheduler.imgsz != self.scheduler.base_imgsz:
+                    kwargs = {**kwargs, "imgsz": self.scheduler.imgsz}
+                inicio = time.perf_counter()
+                detections = self.model.detect([item[1] for _, item in lote], **kwargs)
+                duracao = time.perf_counter() - inicio
+                self.scheduler.done([s.name for s, _ in lote], duracao)
+                instr.observe("inference", duracao, len(lote))
+                instr.gauge("lote", len(lote))
+                for (stream, item), d in zip(lote, detections):
+                    stream.publish(item, d, self.renderer)
+                instr.tick("frames", len(lote))
+        except Exception as e:
+            self.erro = str(e)
+            self._stop.set()
+
+    def resumo(self):
+        """Resumo de cada stream, com a prioridade, o FPS alvo e o atendido pelo escalonador."""
+        return [{**s.resumo(), **self.scheduler.stream_stats(s.name)} for s in self.streams]
+
+
+# =============================================
+# EXECUÇÃO DIRETA DO SCRIPT
+# =============================================
+
+def main():
+    import argparse
+    import json
+
+    import yaml
+
+    import sinks
+    from backends import BACKENDS, load_backend
+    from cascade import cli_cascade
+    from counting import COUNTING_CONFIG, VehicleCounter
+    from tiling import cli_tiling
+    from tracker import IoUKalmanTracker
+
+    parser = argparse.ArgumentParser(description="Detecção ao vivo em câmeras (RTSP/HTTP/dispositivo) ou arquivos "
+                                                 "reproduzidos em tempo real, com um modelo compartilhado.")
+    parser.add_argument("sources", nargs="*", help="URLs, índices de dispositivo ou arquivos (reproduzidos em tempo real)")
+    parser.add_argument("--config", default=None,
+                        help=f"YAML com os streams, prioridades e orçamentos de FPS (ex.: {STREAMS_CONFIG})")
+    parser.add_argument("--max-fps", type=float, default=None, help="Orçamento de FPS dos streams da linha de comando")
+    parser.add_argument("--degrade", action="store_true",
+                        help="Sob sobrecarga reduz o FPS e depois o imgsz em vez de só descartar frames")
+    parser.add_argument("--backend", default=None, choices=BACKENDS, help="Padrão: configs/inference.yaml")
+    parser.add_argument("--weights", default=None, help="Artefato do modelo (padrão: o do backend configurado)")
+    parser.add_argument("--conf", type=float, default=None)
+    parser.add_argument("--batch", type=int, default=MAX_BATCH, help="Streams por chamada de inferência")
+    parser.add_argument("--tile-size", type=int, default=None,
+                        help="Inferência em blocos com este lado (0 desativa; padrão: configs/inference.yaml)")
+    parser.add_argument("--adaptive-tiles", action="store_true", help="Blocos só ao redor dos candidatos")
+    parser.add_argument("--cascade", action="store_true",
+                        help="Modelo rápido em todos os frames e o completo só nos inconclusivos (seção cascade)")
+    parser.add_argument("--duration", type=float, default=None, help="Encerra depois de N segundos (padrão: Ctrl+C)")
+    parser.add_argument("--loop", action="store_true", help="Arquivos locais recomeçam ao terminar")
+    parser.add_argument("--track", action="store_true", help="Rastreia os veículos e conta por linhas/zonas")
+    parser.add_argument("--counting", default=COUNTING_CONFIG, help="YAML com as linhas/zonas de contagem")
+    parser.add_argument("--records-dir", default=None, help="Diretório que recebe as detecções de cada stream")
+    parser.add_argument("--format", default="jsonl", choices=list(sinks.SINKS), help="Formato das detecções")
+    parser.add_argument("--metrics", default=None, help="Resumo de cada stream a cada intervalo, em JSONL")
+    args = parser.parse_args()
+
+    config = {}
+    if args.config:
+        with open(args.config) as f:
+            config = yaml.safe_load(f) or {}
+    opcoes = {"max_batch": args.batch, "degrade": args.degrade, **(config.get("scheduler") or {})}
+    streams = [{"name": f"stream{i}", "source": source, "max_fps": args.max_fps} for i, source in enumerate(args.sources)]
+    streams += config.get("streams") or []
+    if not streams:
+        parser.error("Informe as fontes ou --config")
+
+    model = load_backend(args.backend, weights=args.weights, conf=args.conf,
+                         tiling=cli_tiling(args.tile_size, args.adaptive_tiles), cascade=cli_cascade(args.cascade))
+    if args.records_dir:
+        os.makedirs(args.records_dir, exist_ok=True)
+
+    scheduler = Scheduler(opcoes["max_batch"], imgsz=model.params["imgsz"], degrade=opcoes["degrade"])
+    runner = StreamRunner(model, scheduler=scheduler, draw=False, instrumentation=Instrumentation())
+    for stream in streams:
+        nome = stream["name"]
+        tracker = counter = None
+        if args.track:
+            tracker = IoUKalmanTracker(len(model.names))
+            counter = VehicleCounter.from_config(model.names, args.counting)
+        sink = None
+        if args.records_dir:
+            sink = sinks.open_sink(os.path.join(args.records_dir, f"{nome}{sinks.EXTENSIONS[args.format]}"),
+                                   model.names, args.format)
+        runner.add(LiveStream(nome, stream["source"], tracker=tracker, counter=counter, sink=sink, loop=args.loop,
+                              priority=stream.get("priority", 1.0), max_fps=stream.get("max_fps")))
+
+    def relatorio(resumos):
+        geral = scheduler.resumo()
+        print(f"🧮 nível {geral['nivel']} | imgsz {geral['imgsz']} | utilização do modelo {geral['utilizacao']:.0%}")
+        if hasattr(model, "cascade_stats"):
+            cascata = model.cascade_stats()
+            print(f"🪜 cascata: {cascata['taxa_escalonamento']:.1%} dos frames escalados ({cascata['motivos']})")
+        for r in resumos:
+            print(f"📡 {r['stream']} (prioridade {r['prioridade']}): {r['fps_efetivo']:.1f} FPS "
+                  f"(alvo {r['fps_alvo']:.1f}, fonte {r['fps_fonte']:.1f}) | "
+                  f"latência p50 {r['latencia_p50_ms']:.0f} ms, p95 {r['latencia_p95_ms']:.0f} ms | "
+                  f"descarte {r['taxa_descarte']:.1%} | reconexões {r['reconexoes']}")
+        if args.metrics:
+            with open(args.metrics, "a") as f:
+                f.writelines(json.dumps({"time": time.time(), **r}) + "\n" for r in resumos)
+
+    resumos = runner.run(args.duration, report=relatorio)
+    final = {"streams": resumos, "escalonador": scheduler.resumo(), "inferencia": runner.instrumentation.snapshot()}
+    if hasattr(model, "cascade_stats"):
+        final["cascata"] = model.cascade_stats()
+    print(json.dumps(final, indent=2))
+
+
+if __name__ == "__main__":
+    main()
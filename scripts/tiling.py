@@ -0,0 +1,193 @@
+import numpy as np
+
+from detections import Detections, fuse_boxes, nms
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+TILE_SIZE = 640          # Lado do bloco em pixels do frame (o mesmo imgsz do treino: o bloco não é reduzido)
+OVERLAP = 0.2            # Sobreposição mínima entre blocos vizinhos (fração do bloco)
+MERGE = "nms"            # nms | wbf
+MERGE_METRIC = "ios"     # ios | iou: IoS junta o pedaço cortado na borda com a caixa completa
+MERGE_THRESHOLD = 0.6
+ADAPTIVE_CONF = 0.05     # Modo adaptativo: confiança dos candidatos da passada no frame inteiro
+ADAPTIVE_MARGIN = 0.25   # Modo adaptativo: margem ao redor dos candidatos (fração do bloco)
+
+
+def make_tiles(width, height, tile_size=TILE_SIZE, overlap=OVERLAP):
+    """
+    Grade de blocos sobrepostos cobrindo o frame inteiro.
+
+    O número de blocos por eixo é o mínimo que garante a sobreposição pedida; as
+    posições são distribuídas de forma uniforme, com o último bloco rente à borda.
+
+    Returns:
+        np.ndarray: Blocos (K, 4) no formato xyxy, int32.
+    """
+    def inicios(lado):
+        if lado <= tile_size:
+            return np.zeros(1, np.int32)
+        passo = tile_size * (1 - overlap)
+        n = int(np.ceil((lado - tile_size) / passo)) + 1
+        return np.round(np.linspace(0, lado - tile_size, n)).astype(np.int32)
+
+    xs, ys = np.meshgrid(inicios(width), inicios(height))
+    x1, y1 = xs.ravel(), ys.ravel()
+    return np.stack([x1, y1, np.minimum(x1 + tile_size, width), np.minimum(y1 + tile_size, height)], axis=1)
+
+
+def tiles_near(tiles, boxes, margin):
+    """Máscara dos blocos que intersectam alguma caixa expandida por ``margin`` pixels."""
+    if len(boxes) == 0:
+        return np.zeros(len(tiles), bool)
+    expandidas = boxes + np.array([-margin, -margin, margin, margin], np.float32)
+    intersecta = ((tiles[:, None, 0] < expandidas[None, :, 2]) & (tiles[:, None, 2] > expandidas[None, :, 0]) &
+                  (tiles[:, None, 1] < expandidas[None, :, 3]) & (tiles[:, None, 3] > expandidas[None, :, 1]))
+    return intersecta.any(axis=1)
+
+
+# =============================================
+# BACKEND COM INFERÊNCIA EM BLOCOS
+# =============================================
+
+class TiledBackend:
+    """
+    Inferência em blocos sobrepostos para frames de alta resolução com veículos pequenos.
+
+    Os frames inteiros e todos os blocos de todos os frames vão ao modelo em uma única
+    chamada em lote; as caixas dos blocos são deslocadas para as coordenadas do frame e
+    unidas às do frame inteiro (que cobre os veículos grandes, cortados entre blocos)
+    por NMS ou WBF. No modo adaptativo, a passada no frame inteiro roda primeiro com
+    confiança baixa e só os blocos ao redor dos candidatos são processados.
+
+    Expõe a mesma interface do ``InferenceBackend`` (``detect``, ``names``, ``params``),
+    então pode ser usado pelo ``VideoEngine``, pelo cache e pelos scripts de lote.
+
+    Args:
+        backend (InferenceBackend): Backend que roda o modelo.
+        tile_size (int): Lado do bloco em pixels do frame.
+        overlap (float): Sobreposição mínima entre blocos vizinhos.
+        merge (str): ``"nms"`` ou ``"wbf"``.
+        merge_metric (str): ``"ios"`` ou ``"iou"``.
+        merge_threshold (float): Sobreposição que une duas caixas da mesma classe.
+        adaptive (bool): Processa só os blocos com candidatos da passada no frame inteiro.
+        adaptive_conf (float): Confiança mínima dos candidatos no modo adaptativo.
+        adaptive_margin (float): Margem ao redor dos candidatos (fração do bloco).
+    """
+
+    def __init__(self, backend, tile_size=TILE_SIZE, overlap=OVERLAP, merge=MERGE, merge_metric=MERGE_METRIC,
+                 merge_threshold=MERGE_THRESHOLD, adaptive=False, adaptive_conf=ADAPTIVE_CONF,
+                 adaptive_margin=ADAPTIVE_MARGIN):
+        if merge not in ("nms", "wbf"):
+            raise ValueError(f"Método de união desconhecido: {merge} (opções: nms, wbf)")
+        if not 0 <= overlap < 1:
+            raise ValueError("overlap deve estar em [0, 1)")
+        self.backend = backend
+        self.tile_size = int(tile_size)
+        self.overlap = float(overlap)
+        self.merge = merge
+        self.merge_metric = merge_metric
+        self.merge_threshold = merge_threshold
+        self.adaptive = adaptive
+        self.adaptive_conf = adaptive_conf
+        self.adaptive_margin = adaptive_margin
+        self.blocos_processados = 0  # Total de blocos enviados ao modelo (mede o ganho do modo adaptativo)
+
+    @property
+    def name(self):
+        # Entra na chave do cache: resultados em blocos não se misturam com os do frame inteiro
+        modo = "adaptativo" if self.adaptive else "completo"
+        return (f"{self.backend.name}+tiles{self.tile_size}-o{self.overlap}-{self.merge}-"
+                f"{self.merge_metric}{self.merge_threshold}-{modo}")
+
+    def __getattr__(self, nome):
+        # names, params, weights, model... vêm do backend encapsulado
+        return getattr(self.backend, nome)
+
+    def _une(self, partes):
+        detections = Detections(
+            np.concatenate([d.xyxy for d in partes]),
+            np.concatenate([d.conf for d in partes]),
+            np.concatenate([d.cls for d in partes]),
+        )
+        unir = fuse_boxes if self.merge == "wbf" else nms
+        return unir(detections, self.merge_threshold, self.merge_metric)
+
+    def detect(self, frames, **kwargs):
+        """Inferência em lote retornando uma lista de ``Detections`` (uma por frame), em coordenadas do frame."""
+        if not frames:
+            return []
+        conf = kwargs.get("conf", self.backend.params["conf"])
+        grades = [make_tiles(f.shape[1], f.shape[0], self.tile_size, self.overlap) for f in frames]
+
+        if self.adaptive:
+            # Passada barata no frame inteiro; os blocos só cobrem a vizinhança dos candidatos
+            conf_candidatos = min(conf, self.adaptive_conf)
+            inteiros = self.backend.detect(frames, **{**kwargs, "conf": conf_candidatos})
+            margem = self.adaptive_margin * self.tile_size
+            selecionados = [
+                g[tiles_near(g, d.xyxy, margem)] if len(g) > 1 else g[:0]
+                for g, d in zip(grades, (d.filter_conf(self.adaptive_conf) for d in inteiros))
+            ]
+            inteiros = [d.filter_conf(conf) for d in inteiros]
+            recortes = [f[y1:y2, x1:x2] for f, g in zip(frames, selecionados) for x1, y1, x2, y2 in g]
+            resultados = self.backend.detect(recortes, **kwargs) if recortes else []
+        else:
+            # Frames pequenos (um único bloco) dispensam a divisão
+            selecionados = [g if len(g) > 1 else g[:0] for g in grades]
+            recortes = [f[y1:y2, x1:x2] for f, g in zip(frames, selecionados) for x1, y1, x2, y2 in g]
+            resultados = self.backend.detect(list(frames) + recortes, **kwargs)
+            inteiros, resultados = resultados[:len(frames)], resultados[len(frames):]
+
+        self.blocos_processados += len(recortes)
+        saida = []
+        inicio = 0
+        for inteiro, blocos in zip(inteiros, selecionados):
+            partes = [inteiro]
+            for (x1, y1, _, _), d in zip(blocos, resultados[inicio:inicio + len(blocos)]):
+                if len(d):
+                    d.xyxy = d.xyxy + np.array([x1, y1, x1, y1], np.float32)
+                    partes.append(d)
+            inicio += len(blocos)
+            saida.append(self._une(partes) if len(partes) > 1 else inteiro)
+        return saida
+
+
+def from_config(backend, config):
+    """
+    Envolve o backend em ``TiledBackend`` conforme a seção ``tiling`` de ``configs/inference.yaml``.
+
+    Returns:
+        InferenceBackend | TiledBackend: O próprio backend se a seção estiver ausente ou desativada.
+    """
+    config = dict(config or {})
+    if not config.pop("enabled", False):
+        return backend
+    return TiledBackend(backend, **config)
+
+
+def cli_tiling(tile_size=None, adaptive=False, config_path=None):
+    """
+    Seção ``tiling`` a partir das opções de linha de comando, para ``load_backend``.
+
+    Args:
+        tile_size (int | None): Ativa os blocos com este lado; 0 desativa; None mantém o arquivo.
+        adaptive (bool): Ativa os blocos no modo adaptativo.
+
+    Returns:
+        dict | bool | None: None quando nenhuma opção foi passada (vale o arquivo).
+    """
+    if tile_size is None and not adaptive:
+        return None
+    if tile_size == 0:
+        return False
+    from backends import INFERENCE_CONFIG, load_config
+
+    config = dict(load_config(config_path or INFERENCE_CONFIG).get("tiling") or {})
+    config["enabled"] = True
+    if tile_size:
+        config["tile_size"] = tile_size
+    if adaptive:
+        config["adaptive"] = True
+    return config
@@ -0,0 +1,207 @@
+import numpy as np
+
+from detections import Detections, box_iou
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+IOU_THRESHOLD = 0.3   # IoU mínimo entre trilha prevista e detecção para associá-las
+MAX_AGE = 30          # Atualizações sem detecção antes de descartar a trilha
+MIN_HITS = 3          # Associações necessárias para confirmar a trilha (e expor o id)
+
+STD_POSITION = 1 / 20   # Desvio padrão do ruído de posição, relativo ao tamanho da caixa
+STD_VELOCITY = 1 / 160  # Desvio padrão do ruído de velocidade, relativo ao tamanho da caixa
+
+# Modelo de velocidade constante para o estado [cx, cy, w, h, vx, vy, vw, vh]
+_F = np.eye(8, dtype=np.float64)
+_F[:4, 4:] = np.eye(4)
+
+
+# =============================================
+# FUNÇÕES AUXILIARES
+# =============================================
+
+def _xyxy_to_cxcywh(xyxy):
+    wh = xyxy[:, 2:] - xyxy[:, :2]
+    return np.concatenate([xyxy[:, :2] + wh * 0.5, wh], axis=1)
+
+
+def _cxcywh_to_xyxy(cxcywh):
+    half = cxcywh[:, 2:] * 0.5
+    return np.concatenate([cxcywh[:, :2] - half, cxcywh[:, :2] + half], axis=1)
+
+
+def _escala(wh, pos, vel):
+    """Desvios padrão por componente do estado (T, 8) proporcionais a largura/altura."""
+    return np.concatenate([wh * pos, wh * pos, wh * vel, wh * vel], axis=1)
+
+
+def associate(iou, threshold):
+    """
+    Associação gulosa por IoU usando pares mutuamente melhores.
+
+    A cada rodada todos os pares (trilha, detecção) que são o melhor um do outro são
+    aceitos de uma vez, em operações vetorizadas. O resultado é o mesmo da associação
+    gulosa clássica (maior IoU primeiro), mas o número de rodadas costuma ser 1 a 3.
+
+    Args:
+        iou (np.ndarray): Matriz (T, D) de IoU entre trilhas e detecções.
+        threshold (float): IoU mínimo para aceitar um par.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: Índices das trilhas e das detecções associadas.
+    """
+    custo = np.where(iou >= threshold, iou, 0.0)
+    linhas, colunas = [], []
+    if custo.size == 0:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64)
+
+    todas = np.arange(custo.shape[0])
+    while True:
+        melhor_col = custo.argmax(axis=1)
+        melhor_lin = custo.argmax(axis=0)
+        mutuo = (melhor_lin[melhor_col] == todas) & (custo[todas, melhor_col] > 0)
+        if not mutuo.any():
+            break
+        lin, col = todas[mutuo], melhor_col[mutuo]
+        linhas.append(lin)
+        colunas.append(col)
+        custo[lin, :] = 0.0
+        custo[:, col] = 0.0
+
+    if not linhas:
+        return np.zeros(0, np.int64), np.zeros(0, np.int64)
+    return np.concatenate(linhas), np.concatenate(colunas)
+
+
+# =============================================
+# RASTREADOR IoU + KALMAN
+# =============================================
+
+class IoUKalmanTracker:
+    """
+    Rastreador multiobjeto leve (estilo SORT) inteiramente vetorizado em NumPy.
+
+    Todas as trilhas são mantidas em arrays e o filtro de Kalman é aplicado em lote
+    (predição e correção via ``matmul`` em (T, 8, 8)), sem laços por caixa.
+
+    A classe de cada trilha é decidida por votação ponderada pela confiança, o que
+    estabiliza a alternância entre classes parecidas ao longo dos frames.
+
+    Args:
+        num_classes (int): Número de classes do modelo.
+        iou_threshold (float): IoU mínimo para associar trilha e detecção.
+        max_age (int): Atualizações sem detecção antes de remover a trilha.
+        min_hits (int): Associações para confirmar a trilha.
+    """
+
+    def __init__(self, num_classes, iou_threshold=IOU_THRESHOLD, max_age=MAX_AGE, min_hits=MIN_HITS):
+        self.num_classes = num_classes
+        self.iou_threshold = iou_threshold
+        self.max_age = max_age
+        self.min_hits = min_hits
+        self.reset()
+
+    def reset(self):
+        self._ids = np.zeros(0, np.int64)
+        self._mean = np.zeros((0, 8))
+        self._cov = np.zeros((0, 8, 8))
+        self._hits = np.zeros(0, np.int64)
+        self._misses = np.zeros(0, np.int64)
+        self._votos = np.zeros((0, self.num_classes))
+        self._proximo_id = 1
+        self.atualizacoes = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _predict(self):
+        if not len(self._ids):
+            return
+        std = _escala(self._mean[:, 2:4], STD_POSITION, STD_VELOCITY)
+        self._mean = self._mean @ _F.T
+        self._cov = _F @ self._cov @ _F.T
+        self._cov[:, np.arange(8), np.arange(8)] += std ** 2
+
+    def _correct(self, idx, medidas):
+        mean, cov = self._mean[idx], self._cov[idx]
+        std = mean[:, 2:4] * STD_POSITION
+        r = np.concatenate([std, std], axis=1) ** 2
+
+        s = cov[:, :4, :4].copy()
+        s[:, np.arange(4), np.arange(4)] += r
+        ganho = cov[:, :, :4] @ np.linalg.inv(s)
+        inovacao = medidas - mean[:, :4]
+        self._mean[idx] = mean + (ganho @ inovacao[:, :, None])[:, :, 0]
+        self._cov[idx] = cov - ganho @ cov[:, :4, :]
+
+    def _novas_trilhas(self, medidas, cls, conf):
+        n = len(medidas)
+        mean = np.concatenate([medidas, np.zeros((n, 4))], axis=1)
+        std = _escala(medidas[:, 2:4], 2 * STD_POSITION, 10 * STD_VELOCITY)
+        cov = np.zeros((n, 8, 8))
+        cov[:, np.arange(8), np.arange(8)] = std ** 2
+        votos = np.zeros((n, self.num_classes))
+        votos[np.arange(n), cls] = conf
+
+        ids = np.arange(self._proximo_id, self._proximo_id + n)
+        self._proximo_id += n
+        self._ids = np.concatenate([self._ids, ids])
+        self._mean = np.concatenate([self._mean, mean])
+        self._cov = np.concatenate([self._cov, cov])
+        self._hits = np.concatenate([self._hits, np.ones(n, np.int64)])
+        self._misses = np.concatenate([self._misses, np.zeros(n, np.int64)])
+        self._votos = np.concatenate([self._votos, votos])
+
+    def update(self, detections):
+        """
+        Associa as detecções do frame às trilhas existentes.
+
+        Args:
+            detections (Detections): Detecções do frame atual.
+
+        Returns:
+            Detections: As mesmas caixas com ``track_id`` preenchido (-1 para trilhas ainda
+            não confirmadas) e ``cls`` substituído pela classe votada da trilha.
+        """
+        self.atualizacoes += 1
+        self._predict()
+
+        n_det = len(detections)
+        medidas = _xyxy_to_cxcywh(detections.xyxy.astype(np.float64))
+        previstas = _cxcywh_to_xyxy(self._mean[:, :4])
+        trilhas, dets = associate(box_iou(previstas, detections.xyxy), self.iou_threshold)
+
+        # Trilhas associadas: correção do Kalman, contadores e votos de classe
+        if len(trilhas):
+            self._correct(trilhas, medidas[dets])
+            self._hits[trilhas] += 1
+            np.add.at(self._votos, (trilhas, detections.cls[dets]), detections.conf[dets])
+        perdidas = np.ones(len(self._ids), bool)
+        perdidas[trilhas] = False
+        self._misses[perdidas] += 1
+        self._misses[trilhas] = 0
+
+        # Detecções sem trilha iniciam novas trilhas (anexadas ao final dos arrays)
+        livres = np.ones(n_det, bool)
+        livres[dets] = False
+        inicio_novas = len(self._ids)
+        self._novas_trilhas(medidas[livres], detections.cls[livres], detections.conf[livres])
+
+        # Índice da trilha de cada detecção
+        trilha_da_det = np.empty(n_det, np.int64)
+        trilha_da_det[dets] = trilhas
+        trilha_da_det[livres] = np.arange(inicio_novas, len(self._ids))
+
+        confirmada = (self._hits[trilha_da_det] >= self.min_hits) | (self.atualizacoes <= self.min_hits)
+        track_id = np.where(confirmada, self._ids[trilha_da_det], -1)
+        cls = np.where(confirmada, self._votos[trilha_da_det].argmax(axis=1), detections.cls).astype(np.int32)
+
+        # Remove trilhas que ficaram tempo demais sem detecção
+        vivas = self._misses <= self.max_age
+        if not vivas.all():
+            self._ids, self._mean, self._cov = self._ids[vivas], self._mean[vivas], self._cov[vivas]
+            self._hits, self._misses, self._votos = self._hits[vivas], self._misses[vivas], self._votos[vivas]
+
+        return Detections(detections.xyxy, detections.conf, cls, track_id)
@@ -1,9 +1,18 @@
+import os
+
 from ultralytics import YOLO
 
+# Listas geradas pelo organizer.py (split pelo hash do conteúdo). As originais sorteadas para
+# valid/test continuam em train/images, então o layout de pastas do data.yaml as treinaria.
+DATA = "../configs/data_split.yaml"
+if not os.path.exists(DATA):
+    DATA = "../configs/data.yaml"
+    print("⚠️  configs/data_split.yaml não encontrado: treinando no layout de pastas (rode organizer.py antes)")
+
 model = YOLO("yolov8m.pt")
 
 results = model.train(
-    data="../configs/data.yaml",  # Caminho para o arquivo YAML que define os caminhos das imagens e classes
+    data=DATA,                    # Caminho para o arquivo YAML que define os caminhos das imagens e classes
     epochs=100,                   # Número total de épocas de treinamento (ciclos completos sobre o conjunto de dados)
     batch=4,                     # Tamanho do lote por iteração. Valores menores consomem menos VRAM, ideal para GPUs com 6GB
     imgsz=640,                    # Tamanho das imagens de entrada (redimensionadas). Maior = mais contexto, mas mais consumo de VRAM
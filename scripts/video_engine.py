@@ -0,0 +1,448 @@
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+
+import cv2
+
+from detections import Detections
+from instrumentation import NULL_INSTRUMENTATION
+from renderer import get_renderer
+from sampling import FrameSampler, MOTION_THRESHOLD, STRIDE
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+BATCH_SIZE = 8    # Quantidade de frames agrupados em uma única chamada de inferência
+QUEUE_SIZE = 32   # Capacidade máxima das filas entre os estágios (limita o uso de memória)
+
+_FIM = object()   # Sentinela que sinaliza o fim do fluxo de frames entre os estágios
+
+
+# =============================================
+# ESTATÍSTICAS POR ESTÁGIO
+# =============================================
+
+@dataclass
+class StageStats:
+    """Acumula a quantidade de frames e o tempo ocupado de um estágio do pipeline."""
+    nome: str
+    frames: int = 0
+    tempo: float = 0.0  # Tempo efetivamente gasto no trabalho do estágio (segundos)
+
+    @property
+    def fps(self):
+        return self.frames / self.tempo if self.tempo > 0 else 0.0
+
+
+@dataclass
+class EngineStats:
+    """Estatísticas de uma execução completa do motor de vídeo."""
+    decode: StageStats = field(default_factory=lambda: StageStats("decode"))
+    inference: StageStats = field(default_factory=lambda: StageStats("inference"))
+    tracking: StageStats = field(default_factory=lambda: StageStats("tracking"))
+    encode: StageStats = field(default_factory=lambda: StageStats("encode"))
+    batches: int = 0
+    pulados_stride: int = 0      # Frames sem inferência por causa do passo fixo
+    pulados_movimento: int = 0   # Frames sem inferência por ausência de movimento
+    tempo_total: float = 0.0
+
+    @property
+    def inferencias_puladas(self):
+        return self.pulados_stride + self.pulados_movimento
+
+    @property
+    def fps(self):
+        return self.encode.frames / self.tempo_total if self.tempo_total > 0 else 0.0
+
+    def resumo(self):
+        """Retorna as estatísticas em um dicionário simples (útil para logs e para a interface)."""
+        return {
+            "frames": self.encode.frames,
+            "batches": self.batches,
+            "inferencias": self.inference.frames,
+            "inferencias_puladas": self.inferencias_puladas,
+            "pulados_stride": self.pulados_stride,
+            "pulados_movimento": self.pulados_movimento,
+            "tempo_total_s": round(self.tempo_total, 3),
+            "fps_total": round(self.fps, 2),
+            "estagios": {
+                s.nome: {"frames": s.frames, "tempo_s": round(s.tempo, 3), "fps": round(s.fps, 2)}
+                for s in (self.decode, self.inference, self.tracking, self.encode)
+            },
+        }
+
+
+# =============================================
+# MOTOR DE VÍDEO EM PIPELINE
+# =============================================
+
+class VideoEngine:
+    """
+    Processa um vídeo em três estágios concorrentes:
+
+    1. Decodificação (thread): lê os frames e preenche uma fila limitada.
+    2. Inferência (thread chamadora): agrupa N frames em um único ``model.detect``.
+    3. Codificação (thread): desenha as detecções e grava os frames na ordem original.
+
+    Com ``stride`` > 1 ou ``motion_threshold`` > 0 apenas parte dos frames passa pelo
+    modelo; os demais recebem as detecções do último frame inferido, de modo que o
+    vídeo de saída e os registros por frame continuam cobrindo todos os frames.
+
+    Args:
+        model (InferenceBackend): Backend de inferência (ou objeto com ``detect`` e ``names``).
+        batch_size (int): Frames por chamada de inferência.
+        queue_size (int): Capacidade das filas entre os estágios.
+        predict_kwargs (dict | None): Parâmetros que sobrescrevem os do backend (conf, iou, imgsz...).
+        stride (int): Executa a inferência a cada ``stride`` frames.
+        motion_threshold (float): Fração de pixels alterados para disparar a inferência (0 desativa).
+        frame_callback (callable | None): Chamado na thread de codificação como
+            ``callback(idx, detections, inferido)`` para cada frame, na ordem do vídeo.
+        tracker (IoUKalmanTracker | None): Rastreador aplicado, em ordem, aos frames inferidos.
+        counter (VehicleCounter | None): Contador por linhas/zonas alimentado pelas trilhas.
+        sampler (FrameSampler | None): Amostrador pronto, no lugar do criado a partir de
+            ``stride``/``motion_threshold`` (ex.: reprodução do cache).
+        instrumentation (Instrumentation | None): Recebe os tempos por estágio (com desenho e
+            escrita separados), o FPS móvel e a profundidade das filas (padrão: desativada).
+    """
+
+    def __init__(self, model, batch_size=BATCH_SIZE, queue_size=QUEUE_SIZE, predict_kwargs=None,
+                 stride=STRIDE, motion_threshold=MOTION_THRESHOLD, frame_callback=None,
+                 tracker=None, counter=None, sampler=None, instrumentation=None):
+        if batch_size < 1:
+            raise ValueError("batch_size deve ser maior ou igual a 1")
+        if queue_size < 1:
+            raise ValueError("queue_size deve ser maior ou igual a 1")
+        self.model = model
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.predict_kwargs = dict(predict_kwargs or {})
+        self.stride = stride
+        self.motion_threshold = motion_threshold
+        self.frame_callback = frame_callback
+        self.tracker = tracker
+        self.counter = counter
+        self.sampler = sampler
+        self.instrumentation = instrumentation or NULL_INSTRUMENTATION
+
+    # ------------------------------
+    # Utilitários de fila com parada
+    # ------------------------------
+    def _put(self, q, item):
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _FIM
+
+    def _falha(self, erro):
+        self._erros.append(erro)
+        self._stop.set()
+
+    # ------------------------------
+    # Estágios
+    # ------------------------------
+    def _decoder(self, cap, sampler):
+        try:
+            idx = 0
+            while not self._stop.is_set():
+                inicio = time.perf_counter()
+                ret, frame = cap.read()
+                if not ret:
+                    self.stats.decode.tempo += time.perf_counter() - inicio
+                    break
+                # A decisão de amostragem é barata e fica fora do estágio de inferência
+                inferir = sampler.should_infer(idx, frame)
+                duracao = time.perf_counter() - inicio
+                self.stats.decode.tempo += duracao
+                self.stats.decode.frames += 1
+                self.instrumentation.observe("decode", duracao)
+                if not self._put(self._frames, (idx, frame, inferir)):
+                    break
+                idx += 1
+        except Exception as e:
+            self._falha(e)
+        finally:
+            self.stats.pulados_stride = sampler.pulados_stride
+            self.stats.pulados_movimento = sampler.pulados_movimento
+            self._put(self._frames, _FIM)
+
+    def _encoder(self, out, names):
+        instr = self.instrumentation
+        renderer = get_renderer(names)
+        try:
+            while True:
+                item = self._get(self._resultados)
+                if item is _FIM:
+                    break
+                idx, frame, detections, inferido = item
+                inicio = time.perf_counter()
+                # As posições só mudam nos frames inferidos
+                if self.counter is not None and inferido:
+                    self.counter.update(idx, detections, frame.shape)
+                if out is not None:
+                    if self.counter is not None:
+                        self.counter.draw(frame)
+                    anotado = renderer.draw(frame, detections)
+                    desenho = time.perf_counter()
+                    out.write(anotado)
+                    instr.observe("plot", desenho - inicio)
+                    instr.observe("write", time.perf_counter() - desenho)
+                if self.frame_callback is not None:
+                    self.frame_callback(idx, detections, inferido)
+                self.stats.encode.tempo += time.perf_counter() - inicio
+                self.stats.encode.frames += 1
+                instr.tick("frames")
+        except Exception as e:
+            self._falha(e)
+
+    def _infere_pendentes(self, pendentes):
+        """Roda o modelo nos frames marcados e repassa todos os pendentes ao encoder, em ordem."""
+        marcados = [frame for _, frame, inferir in pendentes if inferir]
+        self.inferidos.extend(idx for idx, _, inferir in pendentes if inferir)
+        detections = []
+        if marcados:
+            inicio = time.perf_counter()
+            detections = self.model.detect(marcados, **self.predict_kwargs)
+            duracao = time.perf_counter() - inicio
+            self.stats.inference.tempo += duracao
+            self.stats.inference.frames += len(marcados)
+            self.stats.batches += 1
+            self.instrumentation.observe("inference", duracao, len(marcados))
+
+            if self.tracker is not None:
+                inicio = time.perf_counter()
+                detections = [self.tracker.update(d) for d in detections]
+                duracao = time.perf_counter() - inicio
+                self.stats.tracking.tempo += duracao
+                self.stats.tracking.frames += len(detections)
+                self.instrumentation.observe("tracking", duracao, len(detections))
+
+        proximas = iter(detections)
+        for idx, frame, inferir in pendentes:
+            if inferir:
+                self._ultimas = next(proximas)
+            if not self._put(self._resultados, (idx, frame, self._ultimas, inferir)):
+                return False
+        return True
+
+    def _inferencia(self, total_frames, progress_callback):
+        self._ultimas = Detections.empty()
+        pendentes = []
+        marcados = 0
+        ultimo_progresso = 0.0
+        while not self._stop.is_set():
+            item = self._get(self._frames)
+            fim = item is _FIM
+            if not fim:
+                pendentes.append(item)
+                marcados += item[2]
+            # Frames pulados sem inferência pendente à frente seguem direto para o encoder;
+            # os demais aguardam o lote encher (limitado pelo tamanho da fila).
+            if not (fim or marcados == 0 or marcados >= self.batch_size or len(pendentes) >= self.queue_size):
+                continue
+
+            if pendentes:
+                # Filas cheias na entrada indicam inferência lenta; na saída, codificação lenta
+                self.instrumentation.gauge("fila_frames", self._frames.qsize())
+                self.instrumentation.gauge("fila_resultados", self._resultados.qsize())
+                self.instrumentation.count("frames_pulados", len(pendentes) - marcados)
+                if not self._infere_pendentes(pendentes):
+                    return
+                # Limita a frequência de atualização da interface
+                agora = time.perf_counter()
+                if progress_callback is not None and (fim or agora - ultimo_progresso >= 0.2):
+                    progress_callback(pendentes[-1][0] + 1, total_frames)
+                    ultimo_progresso = agora
+                pendentes = []
+                marcados = 0
+            if fim:
+                break
+
+    # ------------------------------
+    # Execução
+    # ------------------------------
+    def run(self, video_path, output_path, progress_callback=None):
+        """
+        Processa ``video_path`` e grava o vídeo anotado em ``output_path``.
+
+        Args:
+            video_path (str): Caminho do vídeo de entrada.
+            output_path (str | None): Caminho do MP4 de saída (None processa apenas as detecções,
+                sem desenhar nem codificar: modo somente dados).
+            progress_callback (callable | None): Chamado como ``callback(frames_processados, total_frames)``
+                na thread chamadora após cada lote (seguro para atualizar a interface do Streamlit).
+
+        Returns:
+            EngineStats: Estatísticas de throughput por estágio.
+        """
+        self.stats = EngineStats()
+        self.inferidos = []  # Índices dos frames que passaram pelo modelo, em ordem
+        self._stop = threading.Event()
+        self._erros = []
+        self._frames = queue.Queue(maxsize=self.queue_size)
+        self._resultados = queue.Queue(maxsize=self.queue_size)
+
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise Exception("Não foi possível abrir o vídeo")
+
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if total_frames == 0:
+            cap.release()
+            raise Exception("Vídeo não contém frames ou está corrompido")
+
+        frame_width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        frame_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = cap.get(cv2.CAP_PROP_FPS)
+
+        out = None
+        if output_path is not None:
+            fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+            out = cv2.VideoWriter(output_path, fourcc, fps, (frame_width, frame_height))
+
+        sampler = self.sampler or FrameSampler(self.stride, self.motion_threshold)
+        names = self.model.names
+        decoder = threading.Thread(target=self._decoder, args=(cap, sampler), name="video-decoder", daemon=True)
+        encoder = threading.Thread(target=self._encoder, args=(out, names), name="video-encoder", daemon=True)
+
+        inicio = time.perf_counter()
+        decoder.start()
+        encoder.start()
+        try:
+            self._inferencia(total_frames, progress_callback)
+        except BaseException as e:
+            self._falha(e)
+        finally:
+            # Garante que o encoder termine após drenar os resultados pendentes
+            self._put(self._resultados, _FIM)
+            decoder.join()
+            encoder.join()
+            cap.release()
+            if out is not None:
+                out.release()
+            self.stats.tempo_total = time.perf_counter() - inicio
+
+        if self._erros:
+            raise self._erros[0]
+        if self.stats.encode.frames == 0:
+            raise Exception("Vídeo processado está vazio ou corrompido")
+        return self.stats
+
+
+# =============================================
+# EXECUÇÃO DIRETA DO SCRIPT (MODO EM LOTE)
+# =============================================
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    import instrumentation
+    import sinks
+    from backends import BACKENDS, load_backend
+    from cascade import cli_cascade
+    from counting import COUNTING_CONFIG, VehicleCounter
+    from tiling import cli_tiling
+    from tracker import IoUKalmanTracker
+    from video_io import probe_video
+
+    parser = argparse.ArgumentParser(description="Processa um vídeo com o detector de veículos.")
+    parser.add_argument("video", help="Vídeo de entrada")
+    parser.add_argument("--output", default="detection_result.mp4", help="Vídeo anotado de saída")
+    parser.add_argument("--data-only", action="store_true",
+                        help="Somente dados: não desenha nem grava o vídeo (use com --records/--counts)")
+    parser.add_argument("--records", default=None,
+                        help="Detecções de cada frame: .jsonl, .parquet ou .json (resultados COCO)")
+    parser.add_argument("--backend", default=None, choices=BACKENDS, help="Padrão: configs/inference.yaml")
+    parser.add_argument("--weights", default=None, help="Artefato do modelo (padrão: o do backend configurado)")
+    parser.add_argument("--conf", type=float, default=None)
+    parser.add_argument("--batch", type=int, default=BATCH_SIZE)
+    parser.add_argument("--queue", type=int, default=QUEUE_SIZE)
+    parser.add_argument("--stride", type=int, default=STRIDE)
+    parser.add_argument("--motion", type=float, default=MOTION_THRESHOLD)
+    parser.add_argument("--tile-size", type=int, default=None,
+                        help="Inferência em blocos com este lado (0 desativa; padrão: configs/inference.yaml)")
+    parser.add_argument("--adaptive-tiles", action="store_true", help="Blocos só ao redor dos candidatos")
+    parser.add_argument("--cascade", action="store_true",
+                        help="Modelo rápido em todos os frames e o completo só nos inconclusivos (seção cascade)")
+    parser.add_argument("--track", action="store_true", help="Rastreia os veículos e conta por linhas/zonas")
+    parser.add_argument("--counting", default=COUNTING_CONFIG, help="YAML com as linhas/zonas de contagem")
+    parser.add_argument("--counts", default=None, help="Arquivo JSONL que recebe cada contagem assim que ocorre")
+    parser.add_argument("--metrics", default=None,
+                        help="Exporta as métricas por estágio (.prom: formato Prometheus; senão, JSONL)")
+    parser.add_argument("--profile", default=None, help="Perfila a execução e grava as pilhas (formato collapsed)")
+    args = parser.parse_args()
+
+    model = load_backend(args.backend, weights=args.weights, conf=args.conf,
+                         tiling=cli_tiling(args.tile_size, args.adaptive_tiles), cascade=cli_cascade(args.cascade))
+    instr = instrumentation.make(bool(args.metrics or args.profile))
+    if instr.enabled:
+        model = instrumentation.InstrumentedBackend(model, instr)
+    records = sinks.open_sink(args.records, model.names) if args.records else None
+    counts_file = open(args.counts, "w") if args.counts else None
+
+    def grava_contagem(evento):
+        print(f"🚗 {evento.region}: {evento.class_name} #{evento.track_id} (frame {evento.frame})")
+        if counts_file:
+            counts_file.write(json.dumps(evento.to_dict()) + "\n")
+            counts_file.flush()
+
+    tracker = counter = None
+    if args.track:
+        tracker = IoUKalmanTracker(len(model.names))
+        counter = VehicleCounter.from_config(model.names, args.counting, on_count=grava_contagem)
+
+    try:
+        engine = VideoEngine(
+            model,
+            batch_size=args.batch,
+            queue_size=args.queue,
+            stride=args.stride,
+            motion_threshold=args.motion,
+            frame_callback=sinks.frame_writer(records, probe_video(args.video).fps, args.video) if records else None,
+            tracker=tracker,
+            counter=counter,
+            instrumentation=instr,
+        )
+        with instr.profiling(bool(args.profile)) as profiler:
+            stats = engine.run(args.video, None if args.data_only else args.output)
+    except BaseException:
+        if records:
+            records.abort()
+        raise
+    else:
+        if records:
+            records.close()
+    finally:
+        if counts_file:
+            counts_file.close()
+
+    resumo = stats.resumo()
+    print(f"🎞️  Frames: {resumo['frames']} | Inferências: {resumo['inferencias']} | "
+          f"Puladas: {resumo['inferencias_puladas']} (stride: {resumo['pulados_stride']}, "
+          f"movimento: {resumo['pulados_movimento']})")
+    if counter is not None:
+        resumo["contagens"] = counter.snapshot()
+    if hasattr(model, "cascade_stats"):
+        resumo["cascata"] = model.cascade_stats()
+        print(f"🪜 Cascata: {resumo['cascata']['escalados']} de {resumo['cascata']['frames']} frames escalados "
+              f"({resumo['cascata']['taxa_escalonamento']:.1%})")
+    print(json.dumps(resumo, indent=2))
+    if args.metrics:
+        instr.export(args.metrics, video=args.video)
+        print(f"📈 Métricas salvas em {args.metrics}")
+    if profiler is not None:
+        profiler.write_collapsed(args.profile)
+        for linha in profiler.top():
+            print(f"🔬 {linha['proprio']:6.1%} próprio | {linha['acumulado']:6.1%} acumulado | {linha['funcao']}")
@@ -0,0 +1,128 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+
+import cv2
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+CHUNK_SIZE = 4 * 1024 * 1024          # Blocos de 4 MB na cópia do upload
+STATIC_DIR = "static/results"          # Servido pelo Streamlit em app/static/results (enableStaticServing)
+STATIC_URL = "app/static/results"
+STATIC_MAX_AGE = 6 * 3600              # Resultados mais antigos que isso são apagados (segundos)
+PREVIEW_MAX_BYTES = 200 * 1024 * 1024  # Acima disso o vídeo não é pré-visualizado com st.video (carregaria em memória)
+
+
+@dataclass
+class VideoInfo:
+    """Metadados de um vídeo, obtidos com uma única abertura do arquivo."""
+    path: str
+    frame_count: int
+    width: int
+    height: int
+    fps: float
+    size_bytes: int
+
+    @property
+    def duration(self):
+        return self.frame_count / self.fps if self.fps > 0 else 0.0
+
+
+# =============================================
+# ENTRADA
+# =============================================
+
+def save_upload(uploaded_file, suffix=".mp4", chunk_size=CHUNK_SIZE, directory=None):
+    """
+    Copia um arquivo enviado (ou qualquer objeto com ``read``) para um temporário em blocos.
+
+    Evita a cópia integral em memória de ``uploaded_file.read()`` e calcula o hash do
+    conteúdo na mesma passada (usado como chave do cache de detecções).
+
+    Args:
+        directory (str | None): Pasta de destino (padrão: pasta temporária do sistema).
+
+    Returns:
+        tuple[str, str]: Caminho do temporário e hash BLAKE2b do conteúdo.
+    """
+    h = hashlib.blake2b(digest_size=20)
+    if hasattr(uploaded_file, "seek"):
+        uploaded_file.seek(0)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile(suffix=suffix, dir=directory, delete=False) as tmp:
+        while bloco := uploaded_file.read(chunk_size):
+            h.update(bloco)
+            tmp.write(bloco)
+    return tmp.name, h.hexdigest()
+
+
+def probe_video(path):
+    """
+    Abre o vídeo uma única vez e retorna seus metadados.
+
+    Raises:
+        Exception: Se o vídeo não puder ser aberto ou não tiver frames.
+    """
+    cap = cv2.VideoCapture(path)
+    try:
+        if not cap.isOpened():
+            raise Exception("Vídeo inválido - não pode ser aberto")
+        info = VideoInfo(
+            path=path,
+            frame_count=int(cap.get(cv2.CAP_PROP_FRAME_COUNT)),
+            width=int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            height=int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+            fps=cap.get(cv2.CAP_PROP_FPS),
+            size_bytes=os.path.getsize(path),
+        )
+    finally:
+        cap.release()
+    if info.frame_count == 0:
+        raise Exception("Vídeo não contém frames")
+    return info
+
+
+# =============================================
+# SAÍDA SERVIDA A PARTIR DO DISCO
+# =============================================
+
+def publish(path, filename, static_dir=STATIC_DIR, static_url=STATIC_URL):
+    """
+    Move um resultado para a pasta estática do Streamlit e retorna a URL de download.
+
+    O arquivo é servido direto do disco pelo servidor (em blocos), sem passar pela
+    memória do script como acontece com ``st.download_button(data=...)``.
+    """
+    os.makedirs(static_dir, exist_ok=True)
+    nome = f"{uuid.uuid4().hex}_{filename}"
+    shutil.move(path, os.path.join(static_dir, nome))
+    return f"{static_url}/{nome}"
+
+
+def cleanup_published(static_dir=STATIC_DIR, max_age=STATIC_MAX_AGE):
+    """Apaga resultados publicados há mais de ``max_age`` segundos."""
+    if not os.path.isdir(static_dir):
+        return
+    limite = time.time() - max_age
+    for entrada in os.scandir(static_dir):
+        if entrada.is_file() and entrada.stat().st_mtime < limite:
+            try:
+                os.unlink(entrada.path)
+            except OSError:
+                pass
+
+
+def download_link(url, filename, label):
+    """HTML de um botão de download para uma URL servida pelo Streamlit."""
+    return (
+        f'<a href="{url}" download="{filename}" target="_blank" '
+        f'style="display:block;text-align:center;padding:0.5rem;border-radius:0.5rem;'
+        f'background-color:#ff4b4b;color:white;text-decoration:none;">{label}</a>'
+    )
@@ -0,0 +1,225 @@
+import argparse
+import os
+import signal
+import socket
+import tempfile
+import threading
+import traceback
+
+import instrumentation
+import jobs
+import result_cache
+import sinks
+import video_io
+from backends import BACKENDS
+from jobs import JobCancelled, JobQueue
+
+# =============================================
+# CONFIGURAÇÕES PADRÃO
+# =============================================
+
+SLOTS = 1               # Trabalhos simultâneos por worker
+POLL_INTERVAL = 1.0     # Intervalo de consulta à fila quando ela está vazia (segundos)
+HEARTBEAT_INTERVAL = 5  # Intervalo entre sinais de vida e varreduras de trabalhos órfãos (segundos)
+
+
+class _Interrompido(Exception):
+    """O worker está sendo encerrado: o trabalho em andamento volta para a fila."""
+
+
+class LockedBackend:
+    """
+    Compartilha um backend entre os slots do worker.
+
+    O modelo é carregado uma única vez e as chamadas de inferência são serializadas;
+    decodificação, rastreamento e codificação dos vídeos continuam em paralelo.
+    """
+
+    def __init__(self, backend):
+        self._backend = backend
+        self._lock = threading.Lock()
+
+    def detect(self, frames, **kwargs):
+        with self._lock:
+            return self._backend.detect(frames, **kwargs)
+
+    def predict(self, frames, **kwargs):
+        with self._lock:
+            return self._backend.predict(frames, **kwargs)
+
+    def __getattr__(self, nome):
+        return getattr(self._backend, nome)
+
+
+# =============================================
+# EXECUÇÃO DE UM TRABALHO
+# =============================================
+
+def run_video_job(queue, backend, cache, job, stop):
+    """
+    Processa um trabalho de vídeo e retorna o resultado gravado na fila.
+
+    O callback de progresso publica o andamento e interrompe o motor (levantando uma
+    exceção, que encerra as threads do pipeline) quando o cancelamento é solicitado.
+    """
+    from counting import VehicleCounter
+    from tracker import IoUKalmanTracker
+
+    params = job["params"]
+    instr = instrumentation.make(params.get("metrics", False) or params.get("profile", False))
+    if instr.enabled:
+        backend = instrumentation.InstrumentedBackend(backend, instr)
+    if params.get("tiling"):
+        from tiling import TiledBackend
+        backend = TiledBackend(backend, **params["tiling"])
+    tracker = counter = None
+    if params.get("track"):
+        tracker = IoUKalmanTracker(len(backend.names))
+        counter = VehicleCounter.from_config(backend.names)
+
+    def progresso(frames_processados, total_frames):
+        cancelado = queue.progress(job["id"], min(frames_processados / total_frames, 1.0))
+        if cancelado:
+            raise JobCancelled(job["id"])
+        if stop.is_set():
+            raise _Interrompido(job["id"])
+
+    # Somente dados: sem desenho nem codificação do vídeo anotado
+    output_path = None if params.get("data_only") else tempfile.NamedTemporaryFile(suffix=".mp4", delete=False).name
+    # Exportação das detecções (jsonl, parquet ou coco), gravada em blocos ao longo do vídeo
+    export = params.get("export")
+    export_path = tempfile.NamedTemporaryFile(suffix=sinks.EXTENSIONS[export], delete=False).name if export else None
+    sink = sinks.open_sink(export_path, backend.names, export) if export else None
+    try:
+        frame_callback = None
+        if sink is not None:
+            frame_callback = sinks.frame_writer(sink, video_io.probe_video(job["input_path"]).fps)
+        with instr.profiling(params.get("profile", False)) as profiler:
+            stats, hit = result_cache.run_video(
+                cache, backend, job["input_path"], output_path, params["conf"],
+                stride=params.get("stride", 1), motion_threshold=params.get("motion_threshold", 0.0),
+                progress_callback=progresso, batch_size=params.get("batch_size", 8),
+                queue_size=params.get("queue_size", 32), tracker=tracker, counter=counter,
+                input_hash=job["input_hash"], instrumentation=instr, frame_callback=frame_callback,
+            )
+        video_url = video_io.publish(output_path, "detection_result.mp4") if output_path else None
+        export_url = None
+        if sink is not None:
+            sink.close()
+            export_url = video_io.publish(export_path, f"detections{sinks.EXTENSIONS[export]}")
+    except BaseException:
+        if sink is not None:
+            sink.abort()
+        raise
+    finally:
+        for caminho in (output_path, export_path):
+            if caminho and os.path.exists(caminho):
+                os.unlink(caminho)
+
+    return {
+        "video_url": video_url,
+        "export_url": export_url,
+        "stats": stats.resumo(),
+        "counts": counter.snapshot() if counter is not None else None,
+        "cache_hit": hit,
+        "metrics": instr.snapshot() or None,
+        "profile": profiler.top() if profiler is not None else None,
+    }
+
+
+RUNNERS = {"video": run_video_job}
+
+
+def run_job(queue, backend, cache, job, stop):
+    """Executa um trabalho reivindicado e registra o estado final na fila."""
+    try:
+        result = RUNNERS[job["kind"]](queue, backend, cache, job, stop)
+    except JobCancelled:
+        queue.finish(job["id"], jobs.CANCELLED)
+        print(f"🛑 Trabalho {job['id']} cancelado")
+    except _Interrompido:
+        queue.release(job["id"])
+        print(f"↩️  Trabalho {job['id']} devolvido à fila")
+        return
+    except Exception as e:
+        traceback.print_exc()
+        queue.finish(job["id"], jobs.FAILED, error=str(e))
+        print(f"❌ Trabalho {job['id']} falhou: {e}")
+    else:
+        queue.finish(job["id"], jobs.DONE, result=result)
+        print(f"✅ Trabalho {job['id']} concluído")
+
+    # A entrada enviada pelo app só é necessária até o estado final
+    if os.path.exists(job["input_path"]) and \
+            os.path.dirname(os.path.abspath(job["input_path"])) == os.path.abspath(jobs.UPLOADS_DIR):
+        os.unlink(job["input_path"])
+
+
+def slot_loop(queue, backend, cache, worker_id, stop, poll_interval):
+    """Um slot de execução: reivindica e processa trabalhos até o encerramento do worker."""
+    while not stop.is_set():
+        job = queue.claim(worker_id)
+        if job is None:
+            stop.wait(poll_interval)
+            continue
+        print(f"▶️  Trabalho {job['id']} ({job['kind']}) iniciado")
+        run_job(queue, backend, cache, job, stop)
+
+
+# =============================================
+# EXECUÇÃO DIRETA DO SCRIPT
+# =============================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker da fila de trabalhos do app (vídeos em segundo plano).")
+    parser.add_argument("--slots", type=int, default=SLOTS, help="Trabalhos simultâneos neste worker")
+    parser.add_argument("--db", default=jobs.JOBS_DB, help="Banco SQLite da fila")
+    parser.add_argument("--backend", default=None, choices=BACKENDS, help="Padrão: configs/inference.yaml")
+    parser.add_argument("--weights", default=None)
+    parser.add_argument("--threads", type=int, default=None, help="Threads do PyTorch")
+    parser.add_argument("--poll", type=float, default=POLL_INTERVAL, help="Intervalo de consulta à fila (s)")
+    parser.add_argument("--cache-dir", default="../cache/detections", help="Cache de detecções em disco")
+    args = parser.parse_args()
+
+    if args.slots < 1:
+        parser.error("--slots deve ser maior ou igual a 1")
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    from backends import load_backend
+
+    queue = JobQueue(args.db)
+    # A inferência em blocos é escolhida por trabalho, sobre o mesmo modelo; a cascata fica
+    # de fora, como no app que enfileira os trabalhos (ver model_registry.py)
+    backend = LockedBackend(load_backend(args.backend, weights=args.weights, tiling=False, cascade=False))
+    cache = result_cache.DetectionCache(args.cache_dir)
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+
+    stop = threading.Event()
+    for sinal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sinal, lambda *_: stop.set())
+
+    slots = [threading.Thread(target=slot_loop, args=(queue, backend, cache, worker_id, stop, args.poll),
+                              name=f"slot-{i}", daemon=True) for i in range(args.slots)]
+    for t in slots:
+        t.start()
+    print(f"👷 Worker {worker_id} ativo com {args.slots} slot(s) | backend: {backend.name}")
+
+    try:
+        while not stop.is_set():
+            queue.heartbeat(worker_id, args.slots)
+            orfaos = queue.requeue_stale()
+            if orfaos:
+                print(f"↩️  {orfaos} trabalho(s) órfão(s) devolvido(s) à fila")
+            stop.wait(HEARTBEAT_INTERVAL)
+    finally:
+        stop.set()
+        for t in slots:
+            t.join()
+        queue.unregister(worker_id)
+        print("👋 Worker encerrado")
+
+
+if __name__ == "__main__":
+    main()
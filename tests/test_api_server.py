@@ -0,0 +1,60 @@
+import asyncio
+
+import numpy as np
+import pytest
+
+import api_server
+from detections import Detections
+
+
+class FakeBackend:
+    """Backend que falha com frames vazios e registra o tamanho de cada lote."""
+    names = {0: "car"}
+    params = {"conf": 0.25}
+
+    def __init__(self):
+        self.lotes = []
+
+    def detect(self, frames, conf=0.25):
+        self.lotes.append(len(frames))
+        if any(f.size == 0 for f in frames):
+            raise ValueError("frame vazio")
+        return [Detections(np.array([[0, 0, 4, 4], [1, 1, 3, 3]], np.float32), np.array([0.9, 0.3], np.float32),
+                           np.zeros(2, np.int32)) for _ in frames]
+
+
+def roda(backend, frames, confs, **kwargs):
+    async def main():
+        batcher = api_server.MicroBatcher(backend, **kwargs)
+        batcher.start()
+        return batcher, await asyncio.gather(*(batcher.detect(f, c) for f, c in zip(frames, confs)),
+                                             return_exceptions=True)
+    return asyncio.run(main())
+
+
+def test_pedido_ruim_nao_derruba_o_lote():
+    backend = FakeBackend()
+    ok, ruim = np.zeros((4, 4, 3), np.uint8), np.zeros((0, 4, 3), np.uint8)
+    _, resultados = roda(backend, [ok, ruim, ok], [0.25, 0.25, 0.5], max_batch=4, max_wait_ms=50)
+
+    assert isinstance(resultados[1], ValueError)
+    assert len(resultados[0]) == 2 and len(resultados[2]) == 1   # Cada pedido filtrado na própria confiança
+    assert backend.lotes == [3, 1, 1, 1]   # O lote falhou e foi refeito item a item
+
+
+def test_junta_pedidos_concorrentes_ate_o_lote_maximo():
+    backend = FakeBackend()
+    batcher, resultados = roda(backend, [np.zeros((4, 4, 3), np.uint8)] * 5, [None] * 5, max_batch=2,
+                               max_wait_ms=50)
+    assert all(len(r) == 2 for r in resultados)
+    assert backend.lotes == [2, 2, 1] and dict(batcher.metrics.lotes) == {2: 2, 1: 1}
+
+
+def test_lote_maximo_invalido():
+    with pytest.raises(ValueError):
+        api_server.MicroBatcher(FakeBackend(), max_batch=0)
+
+
+def test_rota_de_deteccao_exige_decode():
+    assert api_server.DetectHandler.__abstractmethods__ == {"decode"}
+    assert not api_server.ImageHandler.__abstractmethods__ and not api_server.FrameHandler.__abstractmethods__
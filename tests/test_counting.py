@@ -0,0 +1,48 @@
+import numpy as np
+
+from counting import VehicleCounter
+from detections import Detections
+
+NAMES = {0: "car", 1: "truck"}
+SHAPE = (100, 100, 3)
+LINHA = {"name": "meio", "points": [[0.5, 0.0], [0.5, 1.0]]}
+ZONA = {"name": "zona", "polygon": [[0.7, 0.0], [1.0, 0.0], [1.0, 1.0], [0.7, 1.0]]}
+
+
+def rastreadas(*caixas):
+    """Detecções já rastreadas a partir de (track_id, classe, cx, cy)."""
+    if not caixas:
+        return Detections(np.zeros((0, 4), np.float32), np.zeros(0, np.float32), np.zeros(0, np.int32),
+                          np.zeros(0, np.int64))
+    ids, cls, cx, cy = map(np.array, zip(*caixas))
+    xyxy = np.stack([cx - 2, cy - 2, cx + 2, cy + 2], axis=1).astype(np.float32)
+    return Detections(xyxy, np.full(len(ids), 0.9, np.float32), cls.astype(np.int32), ids.astype(np.int64))
+
+
+def test_conta_cada_trilha_uma_vez_por_regiao_e_sentido():
+    contador = VehicleCounter(NAMES, [LINHA], [ZONA])
+    eventos = []
+    # Trilha 1 (carro) vai da esquerda até a zona e volta a cruzar a linha; trilha 2 (caminhão) cruza ao contrário
+    trajeto_1 = [10, 30, 49, 51, 60, 80, 60, 40]
+    trajeto_2 = [90, 60, 40, 20, 20, 20, 20, 20]
+    for frame, (x1, x2) in enumerate(zip(trajeto_1, trajeto_2)):
+        eventos += contador.update(frame, rastreadas((1, 0, x1, 50), (2, 1, x2, 50)), SHAPE)
+
+    assert [(e.track_id, e.region, e.direction) for e in eventos] == [
+        (2, "zona", "enter"), (2, "meio", "in"), (1, "meio", "out"), (1, "zona", "enter")]
+    assert contador.snapshot() == {"meio": {"car": 1, "truck": 1}, "zona": {"car": 1, "truck": 1}}
+    assert contador.totals() == {"car": 2, "truck": 2}
+
+
+def test_memoria_acompanha_so_as_trilhas_ativas():
+    contador = VehicleCounter(NAMES, [LINHA], [ZONA], memory=5)
+    # Trilhas novas a cada frame (ids nunca se repetem), todas contadas ao entrar na zona
+    for frame in range(500):
+        contador.update(frame, rastreadas((frame + 1, 0, 90, 50)), SHAPE)
+    assert contador.totals() == {"car": 500}
+    assert len(contador._prev_ids) <= 6
+
+    # Uma trilha ainda lembrada não é contada de novo ao voltar à zona
+    contador.update(500, rastreadas(), SHAPE)
+    contador.update(501, rastreadas((500, 0, 90, 50)), SHAPE)
+    assert contador.totals() == {"car": 500}
@@ -0,0 +1,64 @@
+import numpy as np
+
+from detections import Detections, box_iou, box_ios, fuse_boxes, nms
+
+
+def aleatorias(rng, n=60):
+    xy = rng.uniform(0, 200, (n, 2))
+    return Detections(np.hstack([xy, xy + rng.uniform(10, 60, (n, 2))]).astype(np.float32),
+                      rng.random(n).astype(np.float32), rng.integers(0, 3, n).astype(np.int32))
+
+
+def nms_referencia(d, threshold, class_agnostic=False):
+    """NMS clássico, uma caixa por vez e a IoU recalculada a cada passo."""
+    restantes = list(np.argsort(-d.conf, kind="stable"))
+    keep = []
+    while restantes:
+        i = restantes.pop(0)
+        keep.append(i)
+        restantes = [j for j in restantes
+                     if box_iou(d.xyxy[i:i + 1], d.xyxy[j:j + 1])[0, 0] <= threshold
+                     or (not class_agnostic and d.cls[i] != d.cls[j])]
+    return keep
+
+
+def test_nms_igual_ao_laco_classico():
+    rng = np.random.default_rng(0)
+    for _ in range(20):
+        d = aleatorias(rng)
+        for agnostico in (False, True):
+            saida = nms(d, 0.4, class_agnostic=agnostico)
+            esperado = d.select(np.array(nms_referencia(d, 0.4, agnostico), np.int64))
+            np.testing.assert_array_equal(saida.xyxy, esperado.xyxy)
+            np.testing.assert_array_equal(saida.cls, esperado.cls)
+    assert len(nms(Detections.empty(), 0.5)) == 0
+
+
+def test_ios_suprime_caixa_cortada_contida_na_completa():
+    d = Detections(np.array([[0, 0, 100, 50], [60, 0, 100, 50]], np.float32), np.array([0.9, 0.8], np.float32),
+                   np.zeros(2, np.int32))
+    assert box_iou(d.xyxy[:1], d.xyxy[1:])[0, 0] < 0.5 and box_ios(d.xyxy[:1], d.xyxy[1:])[0, 0] == 1
+    assert len(nms(d, 0.5)) == 2 and len(nms(d, 0.5, metric="ios")) == 1
+
+
+def test_wbf_media_ponderada_pela_confianca():
+    d = Detections(np.array([[0, 0, 10, 10], [2, 2, 12, 12], [50, 50, 60, 60], [1, 1, 11, 11]], np.float32),
+                   np.array([0.6, 0.2, 0.5, 0.7], np.float32), np.array([0, 0, 0, 1], np.int32))
+    fundidas = fuse_boxes(d, 0.3)
+    assert fundidas.conf.tolist() == np.float32([0.7, 0.6, 0.5]).tolist()
+    np.testing.assert_allclose(fundidas.xyxy, [[1, 1, 11, 11], [0.5, 0.5, 10.5, 10.5], [50, 50, 60, 60]], atol=1e-5)
+
+    # Sem distinguir classes, a caixa mais confiante absorve as outras duas
+    agnostica = fuse_boxes(d, 0.3, class_agnostic=True)
+    assert len(agnostica) == 2
+    deslocamento = (0.6 * 0 + 0.2 * 2 + 0.7 * 1) / (0.6 + 0.2 + 0.7)
+    np.testing.assert_allclose(agnostica.xyxy[0], deslocamento + np.array([0, 0, 10, 10]), atol=1e-5)
+
+
+def test_wbf_mantem_os_grupos_do_nms():
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        d = aleatorias(rng)
+        mantidas, fundidas = nms(d, 0.5), fuse_boxes(d, 0.5)
+        np.testing.assert_array_equal(mantidas.conf, fundidas.conf)
+        np.testing.assert_array_equal(mantidas.cls, fundidas.cls)
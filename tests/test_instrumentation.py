@@ -0,0 +1,38 @@
+import numpy as np
+
+from detections import Detections
+from instrumentation import Instrumentation, InstrumentedBackend
+from tiling import TiledBackend
+
+
+class FakeBackend:
+    """Backend com ``predict`` próprio (como o ``InferenceBackend``) que registra os lotes recebidos."""
+
+    name = "fake"
+    names = {0: "car"}
+    params = {"conf": 0.25, "iou": 0.7, "imgsz": 640}
+
+    def __init__(self):
+        self.lotes = []
+
+    def predict(self, frames, **kwargs):
+        raise AssertionError("predict do modelo chamado diretamente: os blocos foram pulados")
+
+    def detect(self, frames, **kwargs):
+        self.lotes.append([f.shape[:2] for f in frames])
+        return [Detections(np.array([[0, 0, 10, 10]], np.float32), np.array([0.9], np.float32), np.array([0]))
+                for _ in frames]
+
+
+def test_instrumented_tiled_backend_still_tiles():
+    modelo = FakeBackend()
+    tiled = TiledBackend(modelo, tile_size=640)
+    instr = Instrumentation()
+    frame = np.zeros((1080, 1920, 3), np.uint8)
+
+    resultado = InstrumentedBackend(tiled, instr).detect([frame])
+
+    assert len(resultado) == 1
+    assert tiled.blocos_processados > 1
+    assert len(modelo.lotes[0]) == 1 + tiled.blocos_processados  # Frame inteiro + blocos em um único lote
+    assert instr.snapshot()["estagios"]["modelo"]["itens"] == 1
@@ -0,0 +1,54 @@
+import numpy as np
+
+from metrics import RECALL_POINTS, ap_per_class
+
+
+def ap_referencia(tp, conf, pred_cls, n_gt):
+    """AP (C, T) com um laço por classe e por limiar, como na avaliação do COCO."""
+    ap = np.zeros((len(n_gt), tp.shape[1]))
+    for c in range(len(n_gt)):
+        sel = pred_cls == c
+        if not sel.any():
+            continue
+        ordem = np.argsort(-conf[sel], kind="stable")
+        for t in range(tp.shape[1]):
+            acertos = np.cumsum(tp[sel, t][ordem])
+            precisao = acertos / np.arange(1, len(acertos) + 1)
+            recall = acertos / max(n_gt[c], 1)
+            envoltoria = np.maximum.accumulate(precisao[::-1])[::-1]
+            idx = np.searchsorted(recall, RECALL_POINTS, side="left")
+            ap[c, t] = np.where(idx < len(recall), envoltoria[np.minimum(idx, len(recall) - 1)], 0.0).mean()
+    return ap
+
+
+def test_ap_per_class_igual_ao_laco_por_classe():
+    rng = np.random.default_rng(0)
+    for _ in range(50):
+        num_classes = int(rng.integers(1, 40))
+        n = int(rng.integers(0, 400))
+        pred_cls = rng.integers(0, num_classes, n)
+        # Confianças distintas: com empates a ordem entre predições empatadas é arbitrária
+        conf = rng.permutation(n) / max(n, 1)
+        tp = rng.random((n, 3)) < [0.8, 0.5, 0.2]
+        n_gt = rng.integers(0, 30, num_classes)
+        # Classes com predições precisam de rótulos suficientes para os acertos
+        n_gt = np.maximum(n_gt, np.bincount(pred_cls, minlength=num_classes))
+        np.testing.assert_allclose(ap_per_class(tp, conf, pred_cls, n_gt)["ap"],
+                                   ap_referencia(tp, conf, pred_cls, n_gt), atol=1e-12)
+
+
+def test_ap_per_class_recall_exato_nos_pontos_de_interpolacao():
+    # Recall caindo exatamente em k/100 (ex.: 7/100 em uma classe de índice alto), onde um
+    # deslocamento em ponto flutuante por classe arredonda para o ponto vizinho
+    num_classes = 90
+    n_gt = np.full(num_classes, 100)
+    pred_cls = np.repeat(np.arange(num_classes), 100)
+    conf = np.tile(np.linspace(1, 0.01, 100), num_classes)
+    tp = np.zeros((len(pred_cls), 1), bool)
+    for c in range(num_classes):
+        # A partir do acerto de número c os acertos vêm intercalados com erros: a precisão cai
+        # e a envoltória muda justamente nos pontos de recall exatos
+        tp[c * 100:c * 100 + c % 50, 0] = True
+        tp[c * 100 + c % 50:(c + 1) * 100:2, 0] = True
+    np.testing.assert_allclose(ap_per_class(tp, conf, pred_cls, n_gt)["ap"],
+                               ap_referencia(tp, conf, pred_cls, n_gt), atol=1e-12)
@@ -0,0 +1,87 @@
+import json
+import os
+
+import cv2
+import numpy as np
+import pytest
+
+import organizer
+from result_cache import hash_bytes
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(organizer.__file__))
+
+
+def imagem(semente):
+    """Bytes PNG de uma imagem pequena e determinística."""
+    img = np.random.default_rng(semente).integers(0, 256, (16, 16, 3), dtype=np.uint8)
+    return cv2.imencode(".png", img)[1].tobytes()
+
+
+def imagem_com_split(split):
+    """Primeira imagem cujo hash sorteia ``split``."""
+    for semente in range(1000):
+        dados = imagem(semente)
+        if organizer.assign_split(hash_bytes(dados)) == split:
+            return dados
+    raise AssertionError(split)
+
+
+def grava(dataset, pasta, nome, dados):
+    os.makedirs(os.path.join(dataset, pasta, "images"), exist_ok=True)
+    os.makedirs(os.path.join(dataset, pasta, "labels"), exist_ok=True)
+    with open(os.path.join(dataset, pasta, "images", nome), "wb") as f:
+        f.write(dados)
+    with open(os.path.join(dataset, pasta, "labels", os.path.splitext(nome)[0] + ".txt"), "w") as f:
+        f.write("0 0.5 0.5 0.2 0.2\n")
+
+
+@pytest.fixture
+def organiza(tmp_path, monkeypatch):
+    # write_split_files lê as classes de ../configs/data.yaml, relativo a scripts/
+    monkeypatch.chdir(SCRIPTS_DIR)
+    dataset = str(tmp_path / "dataset")
+
+    def roda(**kwargs):
+        organizer.process_and_split(dataset, workers=1, split_config=str(tmp_path / "data_split.yaml"), **kwargs)
+        return organizer.load_manifest(dataset)
+    return dataset, roda
+
+
+def test_copia_de_imagem_com_split_fixo_herda_o_split(organiza):
+    dataset, roda = organiza
+    treino = imagem_com_split("valid")   # Adotada como treino na migração, embora o hash sorteie valid
+    validacao = imagem_com_split("train")
+    grava(dataset, "train", "adotada.png", treino)
+    grava(dataset, "valid", "fixa.png", validacao)
+    manifesto = roda()
+    assert manifesto["adotada.png"]["split"] == "train" and manifesto["fixa.png"]["split"] == "valid"
+
+    grava(dataset, "train", "copia_adotada.png", treino)
+    grava(dataset, "train", "copia_fixa.png", validacao)
+    manifesto = roda()
+    assert manifesto["copia_adotada.png"]["split"] == "train"
+    assert manifesto["copia_fixa.png"]["split"] == "valid"
+    with open(os.path.join(dataset, "valid.txt")) as f:
+        assert "./train/images/copia_fixa.png\n" in f.readlines()
+
+
+def test_execucao_incremental_so_processa_o_que_mudou(organiza, capsys):
+    dataset, roda = organiza
+    for i in range(20):
+        grava(dataset, "train", f"img{i:02d}.png", imagem(i))
+    manifesto = roda(ratios={"flip": 1.0})
+    aumentadas = {n: e for n, e in manifesto.items() if e.get("augmentation")}
+    assert aumentadas and all(e["split"] == "train" for e in aumentadas.values())
+    capsys.readouterr()
+
+    assert roda(ratios={"flip": 1.0}) == manifesto
+    assert "novas ou alteradas: 0" in capsys.readouterr().out
+
+    # Removida a original, a aumentada derivada dela sai do disco e do manifesto
+    origem, aumentada = next((e["source"], n) for n, e in aumentadas.items())
+    os.unlink(os.path.join(dataset, "train", "images", origem))
+    manifesto = roda(ratios={"flip": 1.0})
+    assert origem not in manifesto and aumentada not in manifesto
+    assert not os.path.exists(os.path.join(dataset, "train", "images", aumentada))
+    with open(os.path.join(dataset, organizer.MANIFEST_NAME)) as f:
+        assert len(list(map(json.loads, f))) == len(manifesto)
@@ -0,0 +1,97 @@
+import os
+
+import numpy as np
+import pytest
+
+import result_cache
+from detections import Detections, nms
+
+
+class FakeBackend:
+    """Detector determinístico: caixas sobrepostas por frame, com NMS na confiança pedida."""
+    names = {0: "car", 1: "truck"}
+
+    def __init__(self, weights, merge=None):
+        self.name = "torch"
+        self.weights = weights
+        self.params = {"conf": 0.25, "iou": 0.5, "imgsz": 640}
+        self.chamadas = []
+        if merge:
+            self.merge = merge
+
+    def detect(self, frames, conf=0.25, **kwargs):
+        self.chamadas.append((len(frames), conf))
+        saida = []
+        for frame in frames:
+            rng = np.random.default_rng(int(frame.sum()))
+            xy = rng.uniform(0, 80, (40, 2))
+            bruto = Detections(np.hstack([xy, xy + rng.uniform(10, 30, (40, 2))]).astype(np.float32),
+                               rng.random(40).astype(np.float32), rng.integers(0, 2, 40).astype(np.int32))
+            saida.append(nms(bruto.filter_conf(conf), self.params["iou"]))
+        return saida
+
+
+@pytest.fixture
+def pesos(tmp_path):
+    caminho = tmp_path / "best.pt"
+    caminho.write_bytes(b"pesos")
+    return str(caminho)
+
+
+def test_chave_depende_da_entrada_dos_pesos_e_dos_parametros(pesos, tmp_path):
+    backend = FakeBackend(pesos)
+    chave = result_cache.cache_key("abc", backend, conf=0.1, iou=0.5)
+    assert chave == result_cache.cache_key("abc", backend, iou=0.5, conf=0.1)
+    assert chave != result_cache.cache_key("abd", backend, conf=0.1, iou=0.5)
+    assert chave != result_cache.cache_key("abc", backend, conf=0.1, iou=0.6)
+
+    outros = tmp_path / "outros.pt"
+    outros.write_bytes(b"outros pesos")
+    assert chave != result_cache.cache_key("abc", FakeBackend(str(outros)), conf=0.1, iou=0.5)
+
+
+def test_filtrar_o_piso_do_cache_igual_a_inferir_no_limiar(pesos, tmp_path):
+    backend = FakeBackend(pesos)
+    cache = result_cache.DetectionCache(str(tmp_path / "cache"))
+    frames = [np.full((4, 4, 3), i, np.uint8) for i in range(5)]
+    hashes = [str(i) for i in range(5)]
+
+    _, hits = result_cache.detect_images(cache, backend, frames, hashes, conf=0.5)
+    assert hits == 0 and backend.chamadas == [(5, result_cache.CACHE_CONF_FLOOR)]
+    for conf in (0.5, 0.3, 0.8):
+        detections, hits = result_cache.detect_images(cache, backend, frames, hashes, conf=conf)
+        assert hits == 5
+        for d, direta in zip(detections, backend.detect(frames, conf=conf)):
+            np.testing.assert_array_equal(d.xyxy, direta.xyxy)
+            np.testing.assert_array_equal(d.conf, direta.conf)
+
+
+def test_uniao_wbf_infere_no_proprio_limiar(pesos, tmp_path):
+    backend = FakeBackend(pesos, merge="wbf")
+    cache = result_cache.DetectionCache(str(tmp_path / "cache"))
+    frames, hashes = [np.zeros((4, 4, 3), np.uint8)], ["0"]
+    assert result_cache.conf_floor(0.5, backend) == 0.5
+    result_cache.detect_images(cache, backend, frames, hashes, conf=0.5)
+    _, hits = result_cache.detect_images(cache, backend, frames, hashes, conf=0.6)
+    assert hits == 0 and [c for _, c in backend.chamadas] == [0.5, 0.6]
+
+
+def test_gravacao_leitura_e_remocao_lru(tmp_path):
+    cache = result_cache.DetectionCache(str(tmp_path / "cache"), max_bytes=10 ** 9)
+    d = Detections(np.array([[1, 2, 3, 4]], np.float32), np.array([0.9], np.float32), np.array([1], np.int32))
+    cache.put("aa" * 32, [0, 3], [d, Detections.empty()], {"x": 1})
+    indices, frames, meta = cache.get("aa" * 32)
+    assert indices.tolist() == [0, 3] and meta == {"x": 1} and len(frames[1]) == 0
+    np.testing.assert_array_equal(frames[0].xyxy, d.xyxy)
+    assert cache.get("bb" * 32) is None
+
+    tamanho = os.path.getsize(cache._path("aa" * 32))
+    cache.max_bytes = int(tamanho * 2.5)
+    for i, key in enumerate(["bb" * 32, "cc" * 32]):
+        cache.put(key, [0], [d])
+        os.utime(cache._path(key), (1000 + i, 1000 + i))   # Mais antigas que "aa", lida agora há pouco
+    cache.put("dd" * 32, [0], [d])
+    restantes = {os.path.basename(p)[:4] for _, _, p in cache._entradas()}
+    assert "bbbb" not in restantes and {"aaaa", "dddd"} <= restantes
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["evictions"] >= 1
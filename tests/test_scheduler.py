@@ -0,0 +1,73 @@
+import time
+
+import pytest
+
+from scheduler import Scheduler
+
+
+def simula(scheduler, pendentes, lotes, duracao=0.05):
+    """Roda ``lotes`` lotes seguidos em tempo simulado, com todos os streams sempre pendentes; retorna a duração."""
+    inicio = agora = time.monotonic()   # O escalonador mede a carga a partir do relógio real
+    for _ in range(lotes):
+        escolhidos, espera = scheduler.select(pendentes, now=agora)
+        agora += duracao if escolhidos else espera
+        if escolhidos:
+            scheduler.done(escolhidos, duracao, now=agora)
+    return agora - inicio
+
+
+def test_prioridade_2_recebe_o_dobro_dos_slots_sob_contencao():
+    scheduler = Scheduler(max_batch=2, degrade=False)
+    for nome in ("a", "b"):
+        scheduler.register(nome)
+    scheduler.register("vip", priority=2)
+    simula(scheduler, dict.fromkeys(["a", "b", "vip"], 30.0), 600)
+
+    servidos = {nome: slot.served for nome, slot in scheduler.slots.items()}
+    assert servidos == {"a": 300, "b": 300, "vip": 600}   # O vip em todo lote, os outros dois alternando
+
+    # Um slot por lote: o vip fica com o dobro de cada um dos outros
+    scheduler = Scheduler(max_batch=1, degrade=False)
+    for nome in ("a", "b"):
+        scheduler.register(nome)
+    scheduler.register("vip", priority=2)
+    simula(scheduler, dict.fromkeys(["a", "b", "vip"], 30.0), 600)
+
+    servidos = {nome: slot.served for nome, slot in scheduler.slots.items()}
+    assert abs(servidos["a"] - servidos["b"]) <= 1
+    assert servidos["vip"] == pytest.approx(2 * servidos["a"], abs=2)
+    # Cada lote deixa dois streams de fora: os adiamentos somam dois por lote
+    assert sum(slot.deferred for slot in scheduler.slots.values()) == 2 * 600
+
+
+def test_orcamento_limita_sem_contar_como_adiado():
+    scheduler = Scheduler(max_batch=4, degrade=False)
+    scheduler.register("limitado", max_fps=5)
+    scheduler.register("livre")
+    duracao = simula(scheduler, {"limitado": 30.0, "livre": 30.0}, 400)
+
+    limitado, livre = scheduler.slots["limitado"], scheduler.slots["livre"]
+    assert limitado.served / duracao == pytest.approx(5, rel=0.1)
+    assert livre.served == 400 and limitado.deferred == livre.deferred == 0
+
+
+def test_degrada_sob_carga_e_recupera_com_folga():
+    scheduler = Scheduler(max_batch=1, degrade=True, adjust_interval=1.0)
+    scheduler.register("a")
+    scheduler.register("b")
+    # Modelo sempre ocupado e cada stream recebendo metade dos 30 FPS da fonte
+    simula(scheduler, {"a": 30.0, "b": 30.0}, 200, duracao=1 / 30)
+    assert scheduler.level > 0 and scheduler.fraction < 1.0
+
+    nivel = scheduler.level
+    scheduler.done([], 0.0, now=time.monotonic() + 1e6)   # Ocioso desde a última reavaliação
+    assert scheduler.level == nivel - 1
+
+
+def test_registro_invalido():
+    scheduler = Scheduler()
+    scheduler.register("a")
+    with pytest.raises(ValueError):
+        scheduler.register("a")
+    with pytest.raises(ValueError):
+        scheduler.register("b", priority=0)
@@ -0,0 +1,91 @@
+import json
+
+import numpy as np
+import pytest
+
+import sinks
+from detections import Detections
+
+NAMES = {0: "car", 1: "truck"}
+
+
+def frames(n=5):
+    """Detecções determinísticas por frame, com frames vazios e ``track_id``."""
+    rng = np.random.default_rng(0)
+    saida = []
+    for i in range(n):
+        k = i % 3
+        xy = rng.uniform(0, 100, (k, 2))
+        saida.append(Detections(np.hstack([xy, xy + 20]).astype(np.float32), rng.random(k).astype(np.float32),
+                                rng.integers(0, 2, k).astype(np.int32), np.arange(k, dtype=np.int64) + 10 * i))
+    return saida
+
+
+def test_base_abstrata_exige_write_block(tmp_path):
+    with pytest.raises(TypeError):
+        sinks.DetectionSink(str(tmp_path / "x.bin"), NAMES)
+
+
+def test_jsonl_ida_e_volta(tmp_path):
+    caminho = str(tmp_path / "saida.jsonl")
+    dados = frames()
+    with sinks.open_sink(caminho, NAMES, buffer_frames=2) as sink:
+        for i, d in enumerate(dados):
+            sink.write(d, frame=i, timestamp=i / 10, source="video.mp4", inferred=i % 2 == 0)
+
+    with open(caminho) as f:
+        linhas = [json.loads(linha) for linha in f]
+    assert [linha["frame"] for linha in linhas] == list(range(len(dados)))
+    for i, (linha, d) in enumerate(zip(linhas, dados)):
+        assert linha["source"] == "video.mp4" and linha["timestamp"] == i / 10 and linha["inferido"] == (i % 2 == 0)
+        caixas = linha["detections"]
+        assert [c["class_id"] for c in caixas] == d.cls.tolist()
+        assert [c["class_name"] for c in caixas] == [NAMES[c] for c in d.cls.tolist()]
+        assert [c["track_id"] for c in caixas] == d.track_id.tolist()
+        np.testing.assert_allclose([c["box"] for c in caixas] or np.zeros((0, 4)), d.xyxy, atol=0.05)
+        np.testing.assert_allclose([c["confidence"] for c in caixas], d.conf, atol=5e-5)
+
+
+def test_coco_ida_e_volta(tmp_path):
+    caminho = str(tmp_path / "saida.json")
+    dados = frames()
+    with sinks.open_sink(caminho, NAMES, buffer_frames=2, category_offset=1) as sink:
+        for i, d in enumerate(dados):
+            sink.write(d, source=f"imagens/{i:04d}.jpg")
+
+    with open(caminho) as f:
+        resultados = json.load(f)
+    assert len(resultados) == sum(len(d) for d in dados)
+    for i, d in enumerate(dados):
+        deste = [r for r in resultados if r["image_id"] == i]
+        assert [r["category_id"] for r in deste] == (d.cls + 1).tolist()
+        xywh = np.array([r["bbox"] for r in deste]).reshape(-1, 4)
+        np.testing.assert_allclose(np.hstack([xywh[:, :2], xywh[:, :2] + xywh[:, 2:]]), d.xyxy, atol=0.02)
+        np.testing.assert_allclose([r["score"] for r in deste], d.conf, atol=5e-6)
+
+
+def test_parquet_ida_e_volta(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    caminho = str(tmp_path / "saida.parquet")
+    dados = frames()
+    dados[1] = Detections(dados[1].xyxy, dados[1].conf, dados[1].cls)   # Frame sem rastreamento
+    with sinks.open_sink(caminho, NAMES, buffer_frames=2) as sink:
+        for i, d in enumerate(dados):
+            sink.write(d, frame=i, timestamp=None if i == 0 else i / 10, source="video.mp4")
+
+    tabela = pq.read_table(caminho).to_pydict()
+    assert tabela["frame"] == [i for i, d in enumerate(dados) for _ in range(len(d))]
+    assert tabela["class_name"] == [NAMES[c] for d in dados for c in d.cls.tolist()]
+    esperado = [d.track_id.tolist() if d.track_id is not None else [None] * len(d) for d in dados]
+    assert tabela["track_id"] == sum(esperado, [])
+    np.testing.assert_allclose(np.column_stack([tabela[k] for k in ("x1", "y1", "x2", "y2")]),
+                               np.concatenate([d.xyxy for d in dados]))
+
+
+def test_erro_descarta_a_saida_parcial(tmp_path):
+    caminho = tmp_path / "saida.jsonl"
+    with pytest.raises(RuntimeError):
+        with sinks.open_sink(str(caminho), NAMES) as sink:
+            sink.write(frames(1)[0])
+            raise RuntimeError("falha no meio do vídeo")
+    assert not caminho.exists() and not (tmp_path / "saida.jsonl.tmp").exists()
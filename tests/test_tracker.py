@@ -0,0 +1,47 @@
+import numpy as np
+
+from detections import Detections
+from tracker import IoUKalmanTracker, associate
+
+
+def associacao_gulosa(iou, threshold):
+    """Associação gulosa clássica: o par de maior IoU primeiro, um de cada vez."""
+    custo = np.where(iou >= threshold, iou, 0.0)
+    pares = []
+    while custo.size and custo.max() > 0:
+        t, d = np.unravel_index(custo.argmax(), custo.shape)
+        pares.append((int(t), int(d)))
+        custo[t, :] = 0.0
+        custo[:, d] = 0.0
+    return sorted(pares)
+
+
+def test_pares_mutuamente_melhores_igual_a_gulosa():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        # IoU aleatórios (sem empates): com empates a gulosa clássica depende da ordem de varredura
+        iou = rng.random((int(rng.integers(0, 12)), int(rng.integers(0, 12))))
+        trilhas, dets = associate(iou, 0.3)
+        assert sorted(zip(trilhas.tolist(), dets.tolist())) == associacao_gulosa(iou, 0.3)
+
+
+def test_associacao_respeita_o_limiar():
+    iou = np.array([[0.9, 0.2], [0.25, 0.1]])
+    trilhas, dets = associate(iou, 0.3)
+    assert trilhas.tolist() == [0] and dets.tolist() == [0]
+
+
+def test_rastreador_mantem_o_id_de_caixas_em_movimento():
+    tracker = IoUKalmanTracker(num_classes=2, min_hits=1)
+    ids = []
+    for frame in range(10):
+        # Dois veículos andando em sentidos opostos, detectados em ordem trocada a cada frame
+        a = [10 + 3 * frame, 10, 30 + 3 * frame, 30]
+        b = [80 - 3 * frame, 50, 100 - 3 * frame, 70]
+        caixas = [a, b] if frame % 2 == 0 else [b, a]
+        saida = tracker.update(Detections(np.array(caixas, np.float32), np.array([0.9, 0.8], np.float32),
+                                          np.array([0, 1] if frame % 2 == 0 else [1, 0], np.int32)))
+        ordem = [0, 1] if frame % 2 == 0 else [1, 0]
+        ids.append(saida.track_id[ordem].tolist())
+        assert saida.cls[ordem].tolist() == [0, 1]
+    assert all(par == ids[0] for par in ids) and ids[0][0] != ids[0][1]